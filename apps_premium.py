@@ -2,10 +2,25 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.preprocessing import StandardScaler
 import warnings
 import math
+import io
+import os
+import functools
 from datetime import datetime, timedelta
+from preprocessing import DATASET_PATH, load_dataset, fit_scaler, encode_features, to_model_frame
+from similarity_index import load_or_build_index
+from risk_lookup import load_or_build_lookup_table
+from risk_analysis import SESSION_KEY, build_analysis, risk_factor_mask
+from export import amortization_schedule_frame, write_csv, write_xlsx
+from calibration import load_or_fit_calibrator, predict_default_proba
+from scoring import model_version, risk_band
+from audit_log import AuditLog, build_audit_record
+from finance import calculate_financial_indicators
+from recommendations import OPTIMAL_DEBT_RATIO, MAX_SAFE_DEBT_RATIO, get_risk_recommendations
+from shadow import ShadowScorer, load_challengers
+from refresh import BUNDLE_PATH, load_bundle, delta_paths
+from cohort import DIMENSIONS, refresh_cube
 warnings.filterwarnings('ignore')
 
 # Configuration de la page
@@ -117,54 +132,80 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Fonctions utilitaires
-@st.cache_resource
-def load_model_and_data():
+def bundle_stamp():
+    """Date de modification du modèle rafraîchi publié (None s'il n'y en a pas)"""
+    try:
+        return os.stat(BUNDLE_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource(max_entries=2)
+def load_model_and_data(stamp=None):
+    # `stamp` sert de clé: une nouvelle publication est chargée au rerun suivant
+    bundle = load_bundle() if stamp is not None else None
+    if bundle is not None:
+        return bundle['model'], bundle['scaler'], bundle['version'], True
     try:
         model = joblib.load('tree_model.pkl')
-        data = pd.read_csv('credit_risk_dataset.csv', sep=';')
-        
-        numeric_features = ['person_age', 'person_income', 'person_emp_length', 
-                           'loan_amnt', 'loan_int_rate', 'loan_percent_income', 
-                           'cb_person_cred_hist_length']
-        
-        scaler = StandardScaler()
-        scaler.fit(data[numeric_features].fillna(data[numeric_features].median()))
+        data = load_dataset()
+        scaler = fit_scaler(data)
         
-        return model, scaler, True
+        return model, scaler, model_version(), True
     except FileNotFoundError:
         st.error("⚠️ Modèle non trouvé. Mode simulation intelligent activé.")
-        return None, None, False
+        return None, None, 'simulation', False
+
+@st.cache_resource(max_entries=2)
+def load_similarity_index(_scaler, model_id, deltas=()):
+    """Index des profils historiques similaires (construit une fois puis persisté)
+
+    `deltas` sert de clé: un nouveau lot étiqueté est inséré au rerun suivant.
+    """
+    try:
+        return load_or_build_index(load_dataset(), _scaler)
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource
+def load_calibrator(_model, _scaler, model_id):
+    """Calibration des probabilités du modèle (ajustée une fois puis persistée)"""
+    return load_or_fit_calibrator(_model, load_dataset(), _scaler, model_id)
+
+@st.cache_resource
+def get_audit_log():
+    """Journal d'audit des décisions, partagé par toutes les sessions"""
+    return AuditLog()
+
+@st.cache_resource(max_entries=1)
+def get_shadow_scorer(_calibrator, model_id):
+    """Score fantôme des challengers déposés dans challengers/ (None s'il n'y en a pas)
+
+    Champion et challengers sont comparés après la calibration du champion.
+    """
+    challengers = load_challengers()
+    return ShadowScorer(challengers, calibrator=_calibrator) if challengers else None
+
+def cohort_stamp():
+    """Taille et date du jeu de données et lots déposés: change dès qu'il y a de nouveaux dossiers"""
+    try:
+        stat = os.stat(DATASET_PATH)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, tuple(delta_paths())
+
+@st.cache_resource(max_entries=1)
+def load_cohort_cube(stamp):
+    """Cube de cohortes persisté, complété des seuls nouveaux dossiers"""
+    return refresh_cube() if stamp is not None else None
+
+@st.cache_resource
+def load_risk_lookup_table():
+    """Table des scores du mode simulation (exportée une fois puis rechargée)"""
+    return load_or_build_lookup_table()
 
 def preprocess_input(input_data, scaler):
     df = pd.DataFrame([input_data])
-    
-    numeric_features = ['person_age', 'person_income', 'person_emp_length', 
-                       'loan_amnt', 'loan_int_rate', 'loan_percent_income', 
-                       'cb_person_cred_hist_length']
-    
-    df[numeric_features] = scaler.transform(df[numeric_features])
-    
-    cat_cols = ['person_home_ownership', 'loan_intent', 'loan_grade', 'cb_person_default_on_file']
-    df_encoded = pd.get_dummies(df, columns=cat_cols, drop_first=False)
-    
-    expected_columns = [
-        'person_age', 'person_income', 'person_emp_length', 'loan_amnt',
-        'loan_int_rate', 'loan_percent_income', 'cb_person_cred_hist_length',
-        'person_home_ownership_MORTGAGE', 'person_home_ownership_OTHER',
-        'person_home_ownership_OWN', 'person_home_ownership_RENT',
-        'loan_intent_DEBTCONSOLIDATION', 'loan_intent_EDUCATION',
-        'loan_intent_HOMEIMPROVEMENT', 'loan_intent_MEDICAL',
-        'loan_intent_PERSONAL', 'loan_intent_VENTURE',
-        'loan_grade_A', 'loan_grade_B', 'loan_grade_C', 'loan_grade_D',
-        'loan_grade_E', 'loan_grade_F', 'loan_grade_G',
-        'cb_person_default_on_file_N', 'cb_person_default_on_file_Y'
-    ]
-    
-    for col in expected_columns:
-        if col not in df_encoded.columns:
-            df_encoded[col] = 0
-    
-    return df_encoded[expected_columns]
+    return to_model_frame(encode_features(df, scaler))
 
 def calculate_amortization_schedule(principal, annual_rate, years, start_date=None):
     """Calcul détaillé du tableau d'amortissement"""
@@ -212,72 +253,19 @@ def calculate_amortization_schedule(principal, annual_rate, years, start_date=No
     
     return schedule
 
-def calculate_financial_indicators(principal, annual_rate, years, monthly_income):
-    """Calcul d'indicateurs financiers avancés"""
-    monthly_rate = annual_rate / 100 / 12
-    num_payments = years * 12
-    
-    if monthly_rate > 0:
-        monthly_payment = principal * (monthly_rate * (1 + monthly_rate)**num_payments) / ((1 + monthly_rate)**num_payments - 1)
-    else:
-        monthly_payment = principal / num_payments
-    
-    total_payment = monthly_payment * num_payments
-    total_interest = total_payment - principal
-    
-    # Ratios financiers
-    debt_to_income_ratio = (monthly_payment / monthly_income) * 100 if monthly_income > 0 else 0
-    interest_rate_effectiveness = (total_interest / principal) * 100
-    
-    # Coût d'opportunité (estimation)
-    opportunity_cost_rate = 0.03  # 3% rendement alternatif
-    opportunity_cost = principal * ((1 + opportunity_cost_rate)**years - 1)
-    
-    return {
-        'monthly_payment': monthly_payment,
-        'total_payment': total_payment,
-        'total_interest': total_interest,
-        'debt_to_income_ratio': debt_to_income_ratio,
-        'interest_rate_effectiveness': interest_rate_effectiveness,
-        'opportunity_cost': opportunity_cost,
-        'break_even_months': years * 12
-    }
-
-def get_risk_recommendations(risk_score, loan_data):
-    """Génère des recommandations personnalisées"""
-    recommendations = []
-    
-    if risk_score < 0.3:
-        recommendations.extend([
-            "✅ Profil excellent - Négociez un taux préférentiel",
-            "💰 Envisagez un montant légèrement supérieur si nécessaire",
-            "📈 Profitez de votre bon profil pour de futurs crédits"
-        ])
-    elif risk_score < 0.6:
-        recommendations.extend([
-            "⚠️ Réduisez le montant demandé de 10-20%",
-            "📊 Améliorez votre ancienneté dans l'emploi",
-            "💳 Remboursez vos dettes existantes avant la demande"
-        ])
-    else:
-        recommendations.extend([
-            "🚨 Reportez votre demande de 6-12 mois",
-            "💪 Augmentez vos revenus ou réduisez vos charges",
-            "🏦 Consultez un conseiller financier",
-            "📋 Constituez un apport personnel plus important"
-        ])
-    
-    # Recommandations spécifiques
-    if loan_data['loan_percent_income'] > 0.4:
-        recommendations.append("📉 Réduisez le ratio dette/revenu sous 40%")
-    
-    if loan_data['person_emp_length'] < 2:
-        recommendations.append("⏰ Stabilisez votre emploi (>2 ans recommandé)")
-    
-    return recommendations
+def export_schedule(file_format, principal, annual_rate, years, start_date):
+    """Échéancier complet en xlsx ou csv, généré seulement au clic (téléchargement différé)"""
+    schedule_export = amortization_schedule_frame(principal, annual_rate, years, start_date)
+    if file_format == 'xlsx':
+        xlsx_buffer = io.BytesIO()
+        write_xlsx(schedule_export, xlsx_buffer, sheet_name="Échéancier")
+        return xlsx_buffer.getvalue()
+    csv_buffer = io.StringIO()
+    write_csv(schedule_export, csv_buffer)
+    return csv_buffer.getvalue().encode('utf-8')
 
 # Chargement du modèle
-model, scaler, model_available = load_model_and_data()
+model, scaler, model_id, model_available = load_model_and_data(bundle_stamp())
 
 # Header principal avec design avancé
 st.markdown("""
@@ -407,10 +395,25 @@ cb_person_cred_hist_length = st.sidebar.slider("📜 Ancienneté historique cré
                                               0, 30, 5,
                                               help="Nombre d'années d'historique de crédit")
 
-# Zone principale avec onglets
-tab1, tab2, tab3, tab4 = st.tabs(["🎯 Analyse Risque", "💰 Simulation Remboursement", "📊 Tableaux Détaillés", "🔍 Recommandations"])
+# Dossier saisi (partagé par les onglets)
+input_data = {
+    'person_age': person_age,
+    'person_income': person_income,
+    'person_home_ownership': person_home_ownership,
+    'person_emp_length': person_emp_length,
+    'loan_intent': loan_intent,
+    'loan_grade': loan_grade,
+    'loan_amnt': loan_amnt,
+    'loan_int_rate': loan_int_rate,
+    'loan_percent_income': loan_percent_income,
+    'cb_person_default_on_file': cb_person_default_on_file,
+    'cb_person_cred_hist_length': cb_person_cred_hist_length
+}
 
-with tab1:
+# Contenu des onglets: chaque onglet est une fonction appelée uniquement s'il est ouvert.
+# Les fragments limitent les reruns déclenchés par leurs propres widgets à l'onglet concerné.
+@st.fragment
+def render_analysis_tab():
     st.header("💎 ANALYSE DU RISQUE DE CRÉDIT")
     
     # Métriques principales avec design doré
@@ -452,7 +455,7 @@ with tab1:
     st.markdown("<br>", unsafe_allow_html=True)
     col_button = st.columns([1, 2, 1])
     with col_button[1]:
-        if st.button("🔍 ANALYSER LE RISQUE MAINTENANT", type="primary", use_container_width=True):
+        if st.button("🔍 ANALYSER LE RISQUE MAINTENANT", type="primary", width="stretch"):
             
             # Animation de chargement
             progress_text = st.empty()
@@ -461,66 +464,41 @@ with tab1:
             progress_text.text("🤖 Initialisation de l'IA...")
             progress_bar.progress(20)
             
-            # Préparation des données
-            input_data = {
-                'person_age': person_age,
-                'person_income': person_income,
-                'person_home_ownership': person_home_ownership,
-                'person_emp_length': person_emp_length,
-                'loan_intent': loan_intent,
-                'loan_grade': loan_grade,
-                'loan_amnt': loan_amnt,
-                'loan_int_rate': loan_int_rate,
-                'loan_percent_income': loan_percent_income,
-                'cb_person_default_on_file': cb_person_default_on_file,
-                'cb_person_cred_hist_length': cb_person_cred_hist_length
-            }
-            
             progress_text.text("📊 Analyse des données...")
             progress_bar.progress(50)
             
             # Prédiction avec modèle IA ou simulation avancée
             risk_score = None
+            score_source = 'simulation'
             if model_available and model is not None and scaler is not None:
                 try:
                     processed_data = preprocess_input(input_data, scaler)
-                    risk_score = model.predict_proba(processed_data)[0][1]
+                    raw_score = predict_default_proba(model, processed_data)
+                    calibrator = load_calibrator(model, scaler, model_id)
+                    risk_score = float(calibrator.apply(raw_score)[0])
+                    score_source = 'model'
+                    # Challengers scorés en arrière-plan: la décision reste celle du champion
+                    shadow_scorer = get_shadow_scorer(calibrator, model_id)
+                    if shadow_scorer is not None:
+                        shadow_scorer.submit(processed_data, raw_score)
                     progress_text.text("✅ Modèle IA activé avec succès!")
                 except Exception as e:
                     progress_text.text("⚠️ Basculement vers simulation avancée...")
                     risk_score = None
             
             if risk_score is None:
-                # Simulation avancée avec plus de facteurs
-                risk_factors = 0
-                if person_age < 25: risk_factors += 0.12
-                elif person_age > 65: risk_factors += 0.08
-                
-                if person_income < 20000: risk_factors += 0.25
-                elif person_income < 30000: risk_factors += 0.15
-                elif person_income < 40000: risk_factors += 0.05
-                
-                if loan_percent_income > 0.5: risk_factors += 0.3
-                elif loan_percent_income > 0.4: risk_factors += 0.2
-                elif loan_percent_income > 0.3: risk_factors += 0.1
-                
-                grade_risk = {'A': 0, 'B': 0.05, 'C': 0.1, 'D': 0.15, 'E': 0.2, 'F': 0.25, 'G': 0.3}
-                risk_factors += grade_risk.get(loan_grade, 0.15)
-                
-                if cb_person_default_on_file == 'Y': risk_factors += 0.35
-                if loan_int_rate > 18: risk_factors += 0.2
-                elif loan_int_rate > 15: risk_factors += 0.1
-                
-                if person_emp_length < 1: risk_factors += 0.15
-                elif person_emp_length < 2: risk_factors += 0.08
-                
-                if cb_person_cred_hist_length < 2: risk_factors += 0.1
-                
-                # Facteurs par motif de crédit
-                intent_risk = {'VENTURE': 0.1, 'MEDICAL': 0.05, 'PERSONAL': 0.02}
-                risk_factors += intent_risk.get(loan_intent, 0)
-                
-                risk_score = min(risk_factors, 0.98)
+                # Simulation avancée par table de correspondance précalculée
+                risk_score = load_risk_lookup_table().score_one(input_data)
+            
+            # Mémorisation de l'analyse dans la session de l'utilisateur
+            analysis = build_analysis(input_data, risk_score, score_source)
+            st.session_state[SESSION_KEY] = analysis
+            
+            # Traçabilité: chaque décision est inscrite au journal d'audit
+            get_audit_log().append(build_audit_record(
+                input_data, risk_score, risk_band(risk_score), risk_factor_mask(input_data),
+                model_id if score_source == 'model' else 'simulation', score_source
+            ))
             
             progress_bar.progress(80)
             progress_text.text("🎯 Finalisation de l'analyse...")
@@ -595,39 +573,8 @@ with tab1:
             # Analyse détaillée des facteurs
             st.subheader("🔍 Analyse Détaillée des Facteurs")
             
-            factors_analysis = []
-            factor_impacts = []
-            
-            if person_age < 25:
-                factors_analysis.append("👶 Âge jeune - Manque d'expérience financière")
-                factor_impacts.append(0.12)
-            elif person_age > 65:
-                factors_analysis.append("👴 Âge avancé - Revenus potentiellement décroissants")
-                factor_impacts.append(0.08)
-            
-            if person_income < 30000:
-                factors_analysis.append("💸 Revenus insuffisants pour le montant demandé")
-                factor_impacts.append(0.2)
-            
-            if loan_percent_income > 0.4:
-                factors_analysis.append("📊 Ratio dette/revenu critique (>40%)")
-                factor_impacts.append(0.25)
-            
-            if loan_grade in ['E', 'F', 'G']:
-                factors_analysis.append(f"⚠️ Grade de crédit défavorable ({loan_grade})")
-                factor_impacts.append(0.2)
-            
-            if cb_person_default_on_file == 'Y':
-                factors_analysis.append("🚨 Historique de défaut de paiement")
-                factor_impacts.append(0.35)
-            
-            if loan_int_rate > 15:
-                factors_analysis.append(f"📈 Taux d'intérêt élevé ({loan_int_rate}%)")
-                factor_impacts.append(0.15)
-            
-            if person_emp_length < 2:
-                factors_analysis.append("⏰ Ancienneté emploi insuffisante")
-                factor_impacts.append(0.1)
+            factors_analysis = analysis.factor_labels
+            factor_impacts = analysis.factor_impacts
             
             col_factors1, col_factors2 = st.columns(2)
             
@@ -649,12 +596,49 @@ with tab1:
                     })
                     st.bar_chart(factors_df.set_index('Facteur'))
 
-with tab2:
+            # Comparaison avec les dossiers historiques similaires
+            similarity_index = (load_similarity_index(scaler, model_id, tuple(delta_paths()))
+                                if scaler is not None else None)
+            if similarity_index is not None:
+                st.subheader("👥 Profils Historiques Similaires")
+
+                neighbours, distances, outcomes = similarity_index.query(
+                    encode_features(pd.DataFrame([input_data]), scaler)[0], k=25
+                )
+                if len(neighbours) == 0:
+                    st.caption("Aucun profil historique comparable trouvé.")
+                else:
+                    neighbour_default_rate = outcomes.mean()
+
+                    col_sim_a, col_sim_b, col_sim_c = st.columns(3)
+                    with col_sim_a:
+                        st.metric("🎯 Score du modèle", f"{risk_score:.1%}")
+                    with col_sim_b:
+                        st.metric("📉 Défaut observé (voisins)", f"{neighbour_default_rate:.1%}",
+                                 delta=f"{(neighbour_default_rate - risk_score) * 100:+.1f} pts",
+                                 delta_color="inverse")
+                    with col_sim_c:
+                        st.metric("👥 Dossiers comparés", f"{len(neighbours)}",
+                                 help=f"Distance moyenne: {distances.mean():.2f}")
+
+@st.fragment
+def render_repayment_tab():
     st.header("💰 SIMULATEUR DE REMBOURSEMENT AVANCÉ")
     
+    # Frais annexes pris en compte dans le TAEG
+    col_fee1, col_fee2 = st.columns(2)
+    with col_fee1:
+        # Des frais égaux au capital ne laisseraient rien à débloquer: pas de TAEG
+        loan_fees = st.number_input("🧾 Frais de dossier (€)", 0, min(50000, loan_amnt - 1), 0, step=50,
+                                    help="Frais prélevés au déblocage du prêt (inférieurs au montant)")
+    with col_fee2:
+        insurance_rate = st.number_input("🛡️ Assurance emprunteur (% annuel du capital)", 0.0, 5.0, 0.0, 0.05,
+                                         help="Taux annuel appliqué au capital initial")
+    
     # Calculs financiers avancés
     financial_indicators = calculate_financial_indicators(
-        loan_amnt, loan_int_rate, loan_duration_years, monthly_income
+        loan_amnt, loan_int_rate, loan_duration_years, monthly_income,
+        fees=loan_fees, insurance_rate=insurance_rate
     )
     
     # Métriques principales de remboursement
@@ -685,7 +669,22 @@ with tab2:
     # Indicateurs financiers avancés
     st.subheader("📊 Indicateurs Financiers Avancés")
     
-    col_ind1, col_ind2, col_ind3 = st.columns(3)
+    col_ind0, col_ind1, col_ind2, col_ind3 = st.columns(4)
+    
+    with col_ind0:
+        if np.isfinite(financial_indicators['apr']):
+            apr_text = f"{financial_indicators['apr']:.2f}%"
+            apr_caption = f"Coût total du crédit: {financial_indicators['total_credit_cost']:,.0f} €"
+        else:
+            apr_text = "n/d"
+            apr_caption = "TAEG non calculable: les frais absorbent le capital débloqué"
+        st.markdown(f"""
+        <div class="info-card">
+            <h4>🏷️ TAEG</h4>
+            <h3>{apr_text}</h3>
+            <p>{apr_caption}</p>
+        </div>
+        """, unsafe_allow_html=True)
     
     with col_ind1:
         st.markdown(f"""
@@ -742,7 +741,8 @@ with tab2:
         })
         st.line_chart(income_scenarios.set_index('Revenu Mensuel'))
 
-with tab3:
+@st.fragment
+def render_schedule_tab():
     st.header("📊 TABLEAUX D'AMORTISSEMENT DÉTAILLÉS")
     
     # Options d'affichage
@@ -800,7 +800,7 @@ with tab3:
     
     st.dataframe(
         df_schedule, 
-        use_container_width=True,
+        width="stretch",
         hide_index=True,
         column_config={
             "Mois": st.column_config.NumberColumn("Mois", format="%d"),
@@ -809,6 +809,22 @@ with tab3:
         }
     )
     
+    # Export de l'échéancier complet (valeurs numériques typées), construit au clic
+    export_inputs = (loan_amnt, loan_int_rate, loan_duration_years,
+                     datetime.combine(start_date, datetime.min.time()))
+    col_export1, col_export2 = st.columns(2)
+    
+    with col_export1:
+        st.download_button("📥 Exporter en Excel", functools.partial(export_schedule, 'xlsx', *export_inputs),
+                           file_name="echeancier.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                           width="stretch")
+    
+    with col_export2:
+        st.download_button("📥 Exporter en CSV", functools.partial(export_schedule, 'csv', *export_inputs),
+                           file_name="echeancier.csv", mime="text/csv",
+                           width="stretch")
+    
     # Résumé statistique
     if schedule:
         total_payments = len(schedule)
@@ -849,15 +865,21 @@ with tab3:
         
         st.line_chart(evolution_df.set_index('Mois'))
 
-with tab4:
+@st.fragment
+def render_recommendations_tab():
     st.header("🔍 RECOMMANDATIONS PERSONNALISÉES")
     
-    # Génération des recommandations si une analyse a été effectuée
-    if 'risk_score' in locals():
-        recommendations = get_risk_recommendations(risk_score, input_data)
+    # Génération des recommandations si une analyse a été effectuée dans cette session
+    last_analysis = st.session_state.get(SESSION_KEY)
+    if last_analysis is not None:
+        risk_score = last_analysis.risk_score
+        recommendations = get_risk_recommendations(risk_score, last_analysis.inputs)
         
         st.subheader(f"📋 Conseils pour votre profil (Risque: {risk_score:.1%})")
         
+        if not last_analysis.matches(input_data):
+            st.caption("ℹ️ Paramètres modifiés depuis la dernière analyse - relancez l'analyse pour actualiser le score.")
+        
         # Affichage des recommandations par catégorie
         if risk_score < 0.3:
             st.markdown("""
@@ -888,12 +910,15 @@ with tab4:
         # Recommandations spécifiques par montant
         st.subheader("💰 Optimisation du Montant")
         
-        current_ratio = loan_percent_income
-        optimal_ratio = 0.35  # Ratio optimal recommandé
+        # Montants du dossier analysé, cohérents avec le score affiché
+        analysed_income = last_analysis.inputs['person_income']
+        analysed_amount = last_analysis.inputs['loan_amnt']
+        current_ratio = last_analysis.inputs['loan_percent_income']
+        optimal_ratio = OPTIMAL_DEBT_RATIO  # Ratio optimal recommandé
         
         if current_ratio > optimal_ratio:
-            optimal_amount = person_income * optimal_ratio
-            reduction = loan_amnt - optimal_amount
+            optimal_amount = analysed_income * optimal_ratio
+            reduction = analysed_amount - optimal_amount
             st.warning(f"""
             **💡 Suggestion:** Réduisez votre demande de **{reduction:,.0f} €** 
             pour atteindre un ratio optimal de {optimal_ratio:.0%}.
@@ -901,8 +926,8 @@ with tab4:
             **Nouveau montant recommandé:** {optimal_amount:,.0f} €
             """)
         else:
-            max_safe_amount = person_income * 0.4
-            additional_capacity = max_safe_amount - loan_amnt
+            max_safe_amount = analysed_income * MAX_SAFE_DEBT_RATIO
+            additional_capacity = max_safe_amount - analysed_amount
             if additional_capacity > 0:
                 st.info(f"""
                 **💰 Capacité supplémentaire:** Vous pourriez emprunter jusqu'à 
@@ -917,20 +942,20 @@ with tab4:
         with col_sim1:
             st.write("**Scénario d'amélioration des revenus:**")
             income_increase = st.slider("Augmentation de revenus (%)", 0, 50, 10)
-            new_income = person_income * (1 + income_increase/100)
-            new_ratio = loan_amnt / new_income
+            new_income = analysed_income * (1 + income_increase/100)
+            new_ratio = analysed_amount / new_income
             
             st.metric("Nouveau ratio dette/revenu", f"{new_ratio:.1%}", 
-                     delta=f"{new_ratio - loan_percent_income:.1%}")
+                     delta=f"{new_ratio - current_ratio:.1%}")
         
         with col_sim2:
             st.write("**Scénario de réduction du montant:**")
             amount_reduction = st.slider("Réduction du montant (%)", 0, 50, 10)
-            new_amount = loan_amnt * (1 - amount_reduction/100)
-            new_ratio_amount = new_amount / person_income if person_income > 0 else 0
+            new_amount = analysed_amount * (1 - amount_reduction/100)
+            new_ratio_amount = new_amount / analysed_income if analysed_income > 0 else 0
             
             st.metric("Nouveau montant", f"{new_amount:,.0f} €", 
-                     delta=f"-{loan_amnt - new_amount:,.0f} €")
+                     delta=f"-{analysed_amount - new_amount:,.0f} €")
             st.metric("Nouveau ratio", f"{new_ratio_amount:.1%}")
     
     else:
@@ -953,6 +978,106 @@ with tab4:
     for tip in general_tips:
         st.write(f"• {tip}")
 
+# Libellés des dimensions du cube de cohortes
+COHORT_DIMENSION_LABELS = {
+    'loan_grade': "Grade",
+    'loan_intent': "Motif",
+    'person_home_ownership': "Logement",
+    'age_band': "Tranche d'âge",
+    'income_band': "Tranche de revenu",
+}
+
+@st.fragment
+def render_cohort_tab():
+    st.header("📈 ANALYSE DU PORTEFEUILLE PAR COHORTES")
+    
+    cube = load_cohort_cube(cohort_stamp())
+    if cube is None:
+        st.info("Jeu de données historique introuvable: analyse par cohortes indisponible.")
+        return
+    
+    # Cohorte du dossier saisi (même grade, motif, logement, tranches d'âge et de revenu)
+    cohort = cube.cohort_of(input_data)
+    st.subheader("👥 Votre cohorte")
+    col_c1, col_c2, col_c3, col_c4 = st.columns(4)
+    with col_c1:
+        st.metric("Dossiers comparables", f"{int(cohort['dossiers']):,}")
+    with col_c2:
+        st.metric("Taux de défaut observé", f"{cohort['taux_défaut']:.1%}" if cohort['dossiers'] else "n/d")
+    with col_c3:
+        st.metric("Montant médian", f"{cohort['loan_amnt_p50']:,.0f} €" if cohort['dossiers'] else "n/d")
+    with col_c4:
+        st.metric("Taux médian", f"{cohort['loan_int_rate_p50']:.2f}%" if cohort['dossiers'] else "n/d")
+    
+    # Exploration du portefeuille
+    st.subheader("🔎 Exploration")
+    dimensions = list(COHORT_DIMENSION_LABELS)
+    col_q1, col_q2 = st.columns(2)
+    with col_q1:
+        by = st.selectbox("Regrouper par", dimensions, format_func=COHORT_DIMENSION_LABELS.get)
+    with col_q2:
+        cross = st.selectbox("Croiser avec", [None] + [name for name in dimensions if name != by],
+                             format_func=lambda name: "—" if name is None else COHORT_DIMENSION_LABELS[name])
+    
+    filter_columns = st.columns(3)
+    where = {}
+    for column, name in zip(filter_columns, ['loan_intent', 'person_home_ownership', 'loan_grade']):
+        with column:
+            selected = st.multiselect(f"Filtrer: {COHORT_DIMENSION_LABELS[name]}", DIMENSIONS[name][:-1])
+        if selected:
+            where[name] = selected
+    
+    start = datetime.now()
+    result = cube.query([by] if cross is None else [by, cross], where)
+    elapsed_ms = (datetime.now() - start).total_seconds() * 1000
+    
+    if cross is None:
+        result = result[result['dossiers'] > 0]
+        st.bar_chart(result['taux_défaut'])
+        st.dataframe(
+            result,
+            width='stretch',
+            column_config={
+                "taux_défaut": st.column_config.NumberColumn("Taux de défaut", format="percent"),
+                "dossiers": st.column_config.NumberColumn("Dossiers", format="%d"),
+                "défauts": st.column_config.NumberColumn("Défauts", format="%d"),
+            }
+        )
+    else:
+        st.write("**Taux de défaut par cohorte**")
+        rates = result['taux_défaut'].unstack(cross).dropna(how='all').dropna(axis=1, how='all')
+        st.dataframe(rates.style.format("{:.1%}", na_rep="—"), width='stretch')
+        st.write("**Nombre de dossiers**")
+        counts = result['dossiers'].unstack(cross).loc[rates.index, rates.columns]
+        st.dataframe(counts, width='stretch')
+    
+    st.caption(f"{cube.n_rows:,} dossiers agrégés • requête en {elapsed_ms:.1f} ms • "
+               f"quantiles à la précision d'un intervalle d'histogramme")
+
+# Zone principale avec onglets (seul l'onglet ouvert est calculé à chaque rerun)
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["🎯 Analyse Risque", "💰 Simulation Remboursement", "📊 Tableaux Détaillés", "🔍 Recommandations", "📈 Cohortes"],
+                                 key="active_tab", on_change="rerun")
+
+with tab1:
+    if tab1.open:
+        render_analysis_tab()
+
+with tab2:
+    if tab2.open:
+        render_repayment_tab()
+
+with tab3:
+    if tab3.open:
+        render_schedule_tab()
+
+with tab4:
+    if tab4.open:
+        render_recommendations_tab()
+
+with tab5:
+    if tab5.open:
+        render_cohort_tab()
+
 # Performance du modèle et footer
 st.divider()
 st.header("📊 PERFORMANCE DU SYSTÈME D'ANALYSE")
@@ -984,6 +1109,7 @@ with st.expander("🛠️ Informations Techniques Détaillées"):
         - StandardScaler pour variables numériques
         - One-hot encoding variables catégorielles
         - Gestion valeurs manquantes par médiane
+        - Calibration isotonique des probabilités (échantillon réservé)
         """)
     
     with col_tech2:
@@ -1000,6 +1126,15 @@ with st.expander("🛠️ Informations Techniques Détaillées"):
         - Respect RGPD
         - Auditabilité des décisions
         """)
+    
+    shadow_scorer = (get_shadow_scorer(load_calibrator(model, scaler, model_id), model_id)
+                     if model_available and model is not None and scaler is not None else None)
+    if shadow_scorer is not None:
+        shadow_stats = shadow_scorer.snapshot()
+        st.markdown(f"**🥊 Challengers en score fantôme** "
+                    f"({shadow_stats['traités']} dossiers, {shadow_stats['abandonnés']} abandonnés, "
+                    f"bandes et écarts sur l'échelle {shadow_stats['échelle']} du champion)")
+        st.dataframe(pd.DataFrame(shadow_stats['challengers']).T, width='stretch')
 
 # Footer stylé
 st.markdown("""
@@ -0,0 +1,150 @@
+from typing import NamedTuple
+import numpy as np
+
+# Tolérance sur le taux mensuel et nombre maximal d'itérations de Newton
+APR_TOLERANCE = 1e-12
+MAX_NEWTON_ITERATIONS = 30
+
+# Intervalle de recherche du taux mensuel pour le repli par encadrement
+FALLBACK_BRACKET = (-0.99, 10.0)
+
+
+class AprResult(NamedTuple):
+    """TAEG d'un ensemble de prêts et statistiques de convergence du solveur"""
+    apr: np.ndarray               # TAEG actuariel annuel, en %
+    monthly_payment: np.ndarray   # mensualité hors assurance
+    total_cost: np.ndarray        # coût total du crédit (intérêts + frais + assurance)
+    iterations: int               # itérations de Newton effectuées
+    newton_converged: int         # prêts résolus par Newton
+    fallback_solved: int          # prêts résolus par le repli (brentq)
+    failed: int                   # prêts non résolus malgré le repli
+    skipped: int                  # prêts non calculables (taux manquant, frais >= capital)
+    max_residual: float           # plus grand écart résiduel sur le capital net
+
+    def convergence_stats(self):
+        return {
+            'prêts': int(self.apr.size),
+            'itérations Newton': self.iterations,
+            'résolus Newton': self.newton_converged,
+            'résolus repli': self.fallback_solved,
+            'échecs': self.failed,
+            'ignorés': self.skipped,
+            'résidu max (€)': self.max_residual,
+        }
+
+
+def monthly_payments(principals, annual_rates, num_payments):
+    """Mensualité constante (même formule que calculate_financial_indicators), vectorisée"""
+    principals = np.asarray(principals, dtype=np.float64)
+    monthly_rates = np.asarray(annual_rates, dtype=np.float64) / 100 / 12
+    num_payments = np.asarray(num_payments, dtype=np.float64)
+    positive = monthly_rates > 0
+    safe_rates = np.where(positive, monthly_rates, 1.0)
+    growth = (1 + safe_rates) ** num_payments
+    return np.where(positive, principals * (safe_rates * growth) / (growth - 1),
+                    principals / num_payments)
+
+
+def _annuity_factor(rates, num_payments):
+    # Valeur actuelle de n versements unitaires et sa dérivée par rapport au taux.
+    # Près de zéro, la forme fermée perd sa précision: développement limité.
+    small = np.abs(rates) < 1e-7
+    safe = np.where(small, 1.0, rates)
+    discount = (1 + safe) ** -num_payments
+    factor = np.where(small, num_payments * (1 - (num_payments + 1) / 2 * rates),
+                      (1 - discount) / safe)
+    derivative = np.where(small, -num_payments * (num_payments + 1) / 2,
+                          (num_payments * discount / (1 + safe) - factor) / safe)
+    return factor, derivative
+
+
+def _brentq_fallback(net_amounts, instalments, num_payments):
+    from scipy.optimize import brentq
+
+    low, high = FALLBACK_BRACKET
+    roots = np.full(net_amounts.shape, np.nan)
+    for i, (net, instalment, n) in enumerate(zip(net_amounts.tolist(), instalments.tolist(),
+                                                 num_payments.tolist())):
+        # Scalaires Python: brentq appelle la fonction des dizaines de fois par prêt
+        def residual(rate):
+            factor = n if rate == 0 else (1 - (1 + rate) ** -n) / rate
+            return instalment * factor - net
+
+        try:
+            # Le facteur d'annuité est décroissant: une racine au plus dans l'intervalle
+            if residual(low) * residual(high) <= 0:
+                roots[i] = brentq(residual, low, high, xtol=APR_TOLERANCE, maxiter=200)
+        except (ValueError, RuntimeError):
+            pass
+    return roots
+
+
+def solve_apr(principals, annual_rates, years, fees=0.0, insurance_rate=0.0,
+              tol=APR_TOLERANCE, max_iter=MAX_NEWTON_ITERATIONS):
+    """TAEG de tous les prêts à la fois (taux de rendement interne des flux)
+
+    Flux de l'emprunteur: capital moins frais de dossier reçu au départ, puis
+    mensualité plus assurance pendant toute la durée. `fees` est un montant en
+    euros et `insurance_rate` un taux annuel en % du capital initial (scalaires
+    ou tableaux). Le taux mensuel est résolu par Newton vectorisé; les prêts qui
+    ne convergent pas sont repris un par un par brentq sur un intervalle encadré.
+    Le TAEG est le taux actuariel annuel équivalent: (1 + i)^12 - 1.
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    annual_rates = np.asarray(annual_rates, dtype=np.float64)
+    shape = np.broadcast(principals, annual_rates, np.asarray(years), np.asarray(fees),
+                         np.asarray(insurance_rate)).shape
+    principals = np.broadcast_to(principals, shape).ravel()
+    annual_rates = np.broadcast_to(annual_rates, shape).ravel()
+    num_payments = np.broadcast_to(np.asarray(years, dtype=np.float64) * 12, shape).ravel()
+    fees = np.broadcast_to(np.asarray(fees, dtype=np.float64), shape).ravel()
+    insurance_rate = np.broadcast_to(np.asarray(insurance_rate, dtype=np.float64), shape).ravel()
+
+    payments = monthly_payments(principals, annual_rates, num_payments)
+    insurance = principals * insurance_rate / 100 / 12
+    instalments = payments + insurance
+    net_amounts = principals - fees
+    total_cost = instalments * num_payments - net_amounts
+
+    valid = (np.isfinite(annual_rates) & np.isfinite(instalments) & np.isfinite(net_amounts)
+             & (net_amounts > 0) & (num_payments > 0))
+    # Point de départ: taux nominal mensuel majoré des frais étalés sur la durée
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(valid, annual_rates / 100 / 12 + 2 * fees / (net_amounts * num_payments), 0.0)
+    active = valid.copy()
+    converged = np.zeros(shape=rates.shape, dtype=bool)
+    iterations = 0
+    while active.any() and iterations < max_iter:
+        iterations += 1
+        index = np.flatnonzero(active)
+        factor, derivative = _annuity_factor(rates[index], num_payments[index])
+        step = (instalments[index] * factor - net_amounts[index]) / (instalments[index] * derivative)
+        updated = rates[index] - step
+        # Newton sort du domaine (taux <= -100 %): la valeur est laissée au repli
+        diverged = ~np.isfinite(updated) | (updated <= FALLBACK_BRACKET[0])
+        rates[index] = np.where(diverged, rates[index], updated)
+        done = (np.abs(step) < tol) & ~diverged
+        converged[index[done]] = True
+        active[index[done | diverged]] = False
+
+    fallback = valid & ~converged
+    if fallback.any():
+        rates[fallback] = _brentq_fallback(net_amounts[fallback], instalments[fallback], num_payments[fallback])
+    rates[~valid] = np.nan
+    total_cost[~valid] = np.nan
+
+    solved = np.isfinite(rates)
+    factor, _ = _annuity_factor(np.where(solved, rates, 0.0), num_payments)
+    residual = np.abs(instalments * factor - net_amounts)[solved]
+
+    return AprResult(
+        apr=(((1 + rates) ** 12 - 1) * 100).reshape(shape),
+        monthly_payment=payments.reshape(shape),
+        total_cost=total_cost.reshape(shape),
+        iterations=iterations,
+        newton_converged=int(converged.sum()),
+        fallback_solved=int((fallback & solved).sum()),
+        failed=int((valid & ~solved).sum()),
+        skipped=int((~valid).sum()),
+        max_residual=float(residual.max()) if residual.size else 0.0,
+    )
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import numpy as np
+
+
+def atomic_write(path, write):
+    """Écrit `path` atomiquement: write(fichier binaire) dans un temporaire unique, puis os.replace
+
+    Le temporaire est créé dans le répertoire cible (même système de fichiers)
+    sous un nom propre à chaque appel: deux processus qui publient le même
+    fichier en même temps ne se marchent pas dessus, le dernier remplace
+    l'autre en entier.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    descriptor, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                            dir=directory or '.')
+    try:
+        with os.fdopen(descriptor, 'wb') as target:
+            write(target)
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_npz(path, compressed=False, **arrays):
+    """Archive npz publiée atomiquement (voir atomic_write)"""
+    savez = np.savez_compressed if compressed else np.savez
+    atomic_write(path, lambda target: savez(target, **arrays))
@@ -0,0 +1,342 @@
+import os
+import json
+import glob
+import time
+import zlib
+import struct
+import threading
+import numpy as np
+import pandas as pd
+
+from preprocessing import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+
+AUDIT_DIR = 'audit_logs'
+
+# Trame: longueur (uint32) + CRC32 (uint32) + nombre d'enregistrements (uint32)
+# + type (uint8), suivie de la charge utile: un enregistrement JSON UTF-8, ou
+# un lot d'enregistrements en flux Arrow IPC (scoring par lot)
+HEADER = struct.Struct('<IIIB')
+KIND_JSON = 0
+KIND_ARROW = 1
+SEGMENT_PATTERN = 'audit-{:06d}.log'
+
+INPUT_FIELDS = NUMERIC_FEATURES + list(CATEGORICAL_FEATURES)
+
+
+def _frame_payload(payload, count, kind):
+    return HEADER.pack(len(payload), zlib.crc32(payload), count, kind) + payload
+
+
+def _arrow_payload(frame):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _arrow_frame(payload):
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+def _segment_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN.replace('{:06d}', '[0-9]' * 6))))
+
+
+def _segment_number(path):
+    return int(os.path.basename(path)[6:12])
+
+
+def build_audit_record(input_data, risk_score, band, factor_mask, model_version, source):
+    """Enregistrement d'audit à plat: entrées du dossier + décision"""
+    record = {field: input_data[field] for field in INPUT_FIELDS}
+    record.update({
+        'ts': time.time(),
+        'model': model_version,
+        'source': source,
+        'score': float(risk_score),
+        'band': int(band),
+        'factors': int(factor_mask),
+    })
+    return record
+
+
+def audit_frame(data, scores, bands, factor_masks, model_version, source):
+    """Enregistrements d'audit d'un lot, au même format que build_audit_record"""
+    frame = data[INPUT_FIELDS].copy()
+    frame['ts'] = time.time()
+    frame['model'] = model_version
+    frame['source'] = source
+    frame['score'] = np.asarray(scores, dtype=np.float64)
+    frame['band'] = np.asarray(bands, dtype=np.int64)
+    frame['factors'] = np.asarray(factor_masks, dtype=np.int64)
+    return frame
+
+
+class AuditLog:
+    """Journal d'audit des décisions en ajout seul
+
+    Les enregistrements sont tamponnés en mémoire puis écrits par un thread de
+    fond qui regroupe les fsync (group commit): un fsync par lot, au plus
+    toutes les `commit_interval` secondes ou dès que `max_pending_bytes` est
+    atteint. Les segments tournent au-delà de `segment_bytes`; à la fermeture
+    d'un segment, un index (position, nombre d'enregistrements) de ses trames
+    est écrit à côté (.idx.npy).
+    """
+
+    def __init__(self, directory=AUDIT_DIR, segment_bytes=64 * 1024 * 1024,
+                 commit_interval=0.05, max_pending_bytes=1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        self.max_pending_bytes = max_pending_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        existing = _segment_paths(directory)
+        # Chaque ouverture démarre un nouveau segment: aucun segment n'est rouvert
+        self._segment_number = _segment_number(existing[-1]) + 1 if existing else 1
+        self._file = None
+        self._index = []
+        self._size = 0
+
+        self._cond = threading.Condition()
+        self._buffer = bytearray()
+        self._frames = []
+        self._appended = 0
+        self._durable = 0
+        self._closed = False
+        self.fsync_count = 0
+        self._error = None
+
+        self._open_segment()
+        self._thread = threading.Thread(target=self._flush_loop, name='audit-log-flusher', daemon=True)
+        self._thread.start()
+
+    # Écriture
+
+    def append(self, record, wait=False):
+        """Ajoute un enregistrement; avec wait=True, attend son fsync"""
+        payload = json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        return self._append_framed(_frame_payload(payload, 1, KIND_JSON), 1, wait)
+
+    def append_frame(self, frame, wait=False):
+        """Ajoute un lot d'enregistrements (une ligne par score) en une seule trame Arrow"""
+        if len(frame) == 0:
+            return self._appended
+        return self._append_framed(_frame_payload(_arrow_payload(frame), len(frame), KIND_ARROW),
+                                   len(frame), wait)
+
+    def _append_framed(self, framed, count, wait):
+        with self._cond:
+            if self._closed:
+                raise ValueError("journal d'audit fermé")
+            if self._error is not None:
+                raise self._error
+            self._buffer += framed
+            self._frames.append((len(framed), count))
+            self._appended += count
+            sequence = self._appended
+            if len(self._buffer) >= self.max_pending_bytes:
+                self._cond.notify_all()
+            if wait:
+                self._cond.notify_all()
+                while self._durable < sequence and self._error is None:
+                    self._cond.wait()
+                if self._error is not None:
+                    raise self._error
+        return sequence
+
+    @property
+    def segment_number(self):
+        """Numéro du segment en cours: les trames ajoutées ensuite y sont écrites, ou plus loin"""
+        return self._segment_number
+
+    def flush(self):
+        """Attend que tout ce qui a été ajouté soit durable sur disque"""
+        with self._cond:
+            target = self._appended
+            self._cond.notify_all()
+            while self._durable < target and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._close_segment()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Thread de fond
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                if not self._buffer and not self._closed:
+                    self._cond.wait(self.commit_interval)
+                elif len(self._buffer) < self.max_pending_bytes and not self._closed:
+                    # Laisse le lot grossir jusqu'à l'échéance du commit groupé
+                    self._cond.wait(self.commit_interval)
+                if not self._buffer:
+                    if self._closed:
+                        return
+                    continue
+                batch, frames, sequence = bytes(self._buffer), self._frames, self._appended
+                self._buffer = bytearray()
+                self._frames = []
+            try:
+                self._write_batch(batch, frames)
+            except OSError as error:
+                with self._cond:
+                    self._error = error
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._durable = sequence
+                self._cond.notify_all()
+
+    def _write_batch(self, batch, frames):
+        if self._size and self._size + len(batch) > self.segment_bytes:
+            self._close_segment()
+            self._segment_number += 1
+            self._open_segment()
+        self._file.write(batch)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsync_count += 1
+        for size, count in frames:
+            self._index.append((self._size, count))
+            self._size += size
+
+    def _open_segment(self):
+        # Création exclusive: un autre écrivain du même répertoire (application
+        # et batch_score.py) a pu réserver ce numéro depuis; on prend le suivant
+        while True:
+            path = os.path.join(self.directory, SEGMENT_PATTERN.format(self._segment_number))
+            try:
+                self._file = open(path, 'xb')
+                break
+            except FileExistsError:
+                existing = _segment_paths(self.directory)
+                self._segment_number = max(self._segment_number, _segment_number(existing[-1])) + 1
+        self._index = []
+        self._size = 0
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        path = self._file.name
+        self._file.close()
+        self._file = None
+        np.save(path + '.idx.npy', np.asarray(self._index, dtype=np.uint64).reshape(-1, 2))
+
+
+class AuditReader:
+    """Relecture rapide du journal d'audit (segments + index des trames)"""
+
+    def __init__(self, directory=AUDIT_DIR, verify=True):
+        self.directory = directory
+        self.verify = verify
+
+    def segments(self, first_segment=1):
+        """Segments du journal, à partir du numéro `first_segment`"""
+        return [path for path in _segment_paths(self.directory) if _segment_number(path) >= first_segment]
+
+    def segment_index(self, path):
+        """Tableau (position, nombre d'enregistrements) des trames d'un segment
+
+        Utilise l'index persisté à la fermeture du segment, sinon balaie les
+        en-têtes (segment actif ou arrêt brutal).
+        """
+        index_path = path + '.idx.npy'
+        if os.path.exists(index_path):
+            return np.load(index_path)
+        with open(path, 'rb') as segment:
+            data = segment.read()
+        index = []
+        position = 0
+        # Une trame tronquée en fin de segment (arrêt brutal) est ignorée
+        while position + HEADER.size <= len(data):
+            length, _, count, _ = HEADER.unpack_from(data, position)
+            if position + HEADER.size + length > len(data):
+                break
+            index.append((position, count))
+            position += HEADER.size + length
+        return np.asarray(index, dtype=np.uint64).reshape(-1, 2)
+
+    def _read_frame(self, data, offset, path):
+        length, crc, count, kind = HEADER.unpack_from(data, offset)
+        payload = data[offset + HEADER.size:offset + HEADER.size + length]
+        if self.verify and zlib.crc32(payload) != crc:
+            raise ValueError(f"trame corrompue: {path} @ {offset}")
+        return kind, payload
+
+    def iter_frames(self, first_segment=1):
+        """Trames brutes (type, charge utile), dans l'ordre d'écriture"""
+        for path in self.segments(first_segment):
+            index = self.segment_index(path)
+            with open(path, 'rb') as segment:
+                data = segment.read()
+            for offset in index[:, 0].tolist():
+                yield self._read_frame(data, offset, path)
+
+    def replay(self):
+        """Enregistrements décodés (dict), dans l'ordre d'écriture"""
+        for kind, payload in self.iter_frames():
+            if kind == KIND_ARROW:
+                yield from _arrow_frame(payload).to_dict('records')
+            else:
+                yield json.loads(payload)
+
+    def to_frame(self):
+        """Tout le journal dans un DataFrame"""
+        singles, parts = [], []
+        for kind, payload in self.iter_frames():
+            if kind == KIND_ARROW:
+                if singles:
+                    parts.append(pd.DataFrame(singles))
+                    singles = []
+                parts.append(_arrow_frame(payload))
+            else:
+                singles.append(json.loads(payload))
+        if singles:
+            parts.append(pd.DataFrame(singles))
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    def __len__(self):
+        return int(sum(self.segment_index(path)[:, 1].sum() for path in self.segments()))
+
+    def read(self, position):
+        """Accès direct au n-ième enregistrement via l'index des trames"""
+        for path in self.segments():
+            index = self.segment_index(path)
+            counts = index[:, 1].astype(np.int64)
+            total = int(counts.sum())
+            if position < total:
+                frame_number = int(np.searchsorted(np.cumsum(counts), position, side='right'))
+                row = position - int(counts[:frame_number].sum())
+                offset = int(index[frame_number, 0])
+                with open(path, 'rb') as segment:
+                    segment.seek(offset)
+                    length = HEADER.unpack(segment.read(HEADER.size))[0]
+                    segment.seek(offset)
+                    data = segment.read(HEADER.size + length)
+                kind, payload = self._read_frame(data, 0, path)
+                if kind == KIND_ARROW:
+                    return _arrow_frame(payload).iloc[row].to_dict()
+                return json.loads(payload)
+            position -= total
+        raise IndexError(position)
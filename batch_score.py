@@ -0,0 +1,330 @@
+"""Scoring par lot d'un fichier de dossiers, avec reprise sur point de contrôle
+
+Chaque bloc de lignes est scoré par scoring.iter_scored_portfolio (modèle
+rafraîchi, tree_model.pkl ou simulation), complété des indicateurs de
+calculate_financial_indicators puis écrit par export.export_frames dans son
+propre fichier part-NNNNNN (Parquet, CSV ou Excel). Un point de contrôle est enregistré
+atomiquement tous les `--checkpoint-every` blocs, avec la position (en
+octets) de la fin du dernier bloc validé: une exécution interrompue reprend
+directement à cette position, sans relire le début du fichier. Les blocs sont
+déterministes, donc réécrire un bloc déjà produit donne le même fichier
+(sortie idempotente).
+
+Chaque score est consigné dans le journal d'audit des décisions (une trame
+par bloc, estampillée de la version du modèle, de l'identifiant du travail et
+du numéro de bloc). Les trames des blocs non encore validés restent en
+mémoire: elles sont écrites et rendues durables juste avant le point de
+contrôle qui valide leurs blocs. Une exécution arrêtée entre ces deux
+écritures rescore des blocs déjà consignés: à la reprise, les blocs du travail
+présents dans les segments écrits depuis le dernier point de contrôle ne sont
+pas réécrits, si bien qu'une reprise ne perd ni ne duplique d'enregistrement.
+
+Usage: python batch_score.py dossiers.csv sortie/ [--chunk-size 50000] [--years 5]
+"""
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import itertools
+import warnings
+import numpy as np
+import pandas as pd
+
+from preprocessing import NUMERIC_FEATURES, load_dataset, fit_scaler
+from calibration import load_or_fit_calibrator
+from scoring import MODEL_PATH, iter_scored_portfolio, model_version
+from finance import calculate_financial_indicators
+from recommendations import RecommendationBatch
+from refresh import load_bundle
+from audit_log import AUDIT_DIR, KIND_ARROW, AuditLog, AuditReader
+from export import EXPORT_WRITERS, export_frames
+from atomic_file import atomic_write
+
+CHECKPOINT_FILE = '_checkpoint.json'
+SUCCESS_FILE = '_SUCCESS'
+PART_PATTERN = 'part-{:06d}'
+PART_FORMATS = sorted(extension.lstrip('.') for extension in EXPORT_WRITERS)
+
+# Paramètres qui doivent être identiques pour reprendre une exécution
+JOB_KEYS = ('input', 'input_size', 'input_mtime_ns', 'chunk_size', 'years', 'fees',
+            'insurance_rate', 'format', 'recommendation_text', 'model_version')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scoring par lot avec reprise sur point de contrôle")
+    parser.add_argument('input', help="fichier CSV au schéma du jeu de données (séparateur ';')")
+    parser.add_argument('output', help="répertoire de sortie (blocs, point de contrôle)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="lignes par bloc (défaut: 50000)")
+    parser.add_argument('--checkpoint-every', type=int, default=1,
+                        help="blocs entre deux points de contrôle (défaut: 1)")
+    parser.add_argument('--years', type=float, default=5, help="durée des prêts en années (défaut: 5)")
+    parser.add_argument('--fees', type=float, default=0.0, help="frais de dossier en euros (défaut: 0)")
+    parser.add_argument('--insurance-rate', type=float, default=0.0,
+                        help="assurance en %% annuel du capital (défaut: 0)")
+    parser.add_argument('--format', choices=PART_FORMATS, default='parquet')
+    parser.add_argument('--recommendation-text', action='store_true',
+                        help="ajoute le texte des recommandations (sinon seul leur masque est écrit)")
+    parser.add_argument('--audit-dir', default=AUDIT_DIR,
+                        help=f"répertoire du journal d'audit des décisions (défaut: {AUDIT_DIR})")
+    parser.add_argument('--restart', action='store_true',
+                        help="ignore le point de contrôle et repart du début")
+    return parser.parse_args(argv)
+
+
+def load_scoring_context():
+    """Modèle, scaler, valeurs de remplissage, calibrateur et version (comme l'application)"""
+    data = load_dataset()
+    bundle = load_bundle()
+    if bundle is not None:
+        model, scaler, fill_values, version = (bundle['model'], bundle['scaler'],
+                                               bundle['fill_values'], bundle['version'])
+    elif os.path.exists(MODEL_PATH):
+        import joblib
+
+        model, scaler, version = joblib.load(MODEL_PATH), fit_scaler(data), model_version()
+        fill_values = data[NUMERIC_FEATURES].median()
+    else:
+        return None, None, None, None, 'simulation'
+    calibrator = load_or_fit_calibrator(model, data, scaler, version)
+    return model, scaler, fill_values, calibrator, version
+
+
+def count_rows(path, block_size=1 << 20):
+    """Nombre de lignes de données (en-tête exclu), par simple comptage des sauts de ligne"""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as source:
+        while True:
+            block = source.read(block_size)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    return max(0, lines + (last != b'\n') - 1)
+
+
+def iter_csv_chunks(path, chunk_size, offset=None):
+    """Blocs de `chunk_size` lignes du CSV, avec la position (octets) de fin de chaque bloc
+
+    La lecture commence à `offset` (début des données si None): une reprise
+    se positionne directement sur le premier bloc non validé.
+    """
+    with open(path, 'rb') as source:
+        header = source.readline().decode('utf-8').strip().split(';')
+        if offset is not None:
+            source.seek(offset)
+        while True:
+            lines = b''.join(itertools.islice(source, chunk_size))
+            if not lines:
+                return
+            yield pd.read_csv(io.BytesIO(lines), sep=';', header=None, names=header), source.tell()
+
+
+def _offset_after_rows(path, rows):
+    # Point de contrôle sans position: on saute les lignes validées sans les analyser
+    with open(path, 'rb') as source:
+        for _ in itertools.islice(source, rows + 1):
+            pass
+        return source.tell()
+
+
+def _write_atomic(path, payload):
+    atomic_write(path, lambda target: target.write(json.dumps(payload, indent=2).encode('utf-8')))
+
+
+def _fsync(path):
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class AuditFrames(list):
+    """Trames d'audit retenues en mémoire (même interface append_frame qu'AuditLog)"""
+
+    def append_frame(self, frame):
+        self.append(frame)
+
+
+def score_chunk(chunk, context, args, audit_log=None):
+    """Scores, bandes et indicateurs financiers d'un bloc
+
+    Le scoring, les bandes et l'audit sont ceux de iter_scored_portfolio;
+    `audit_log` reçoit la trame d'audit du bloc.
+    """
+    model, scaler, fill_values, calibrator, version = context
+    result = next(iter_scored_portfolio(chunk.reset_index(drop=True), model, scaler, chunk_size=max(1, len(chunk)),
+                                        fill_values=fill_values, calibrator=calibrator, audit_log=audit_log,
+                                        version=version))
+    scores = result['risk_score'].to_numpy()
+    income = chunk['person_income'].to_numpy(dtype=np.float64)
+    indicators = calculate_financial_indicators(
+        chunk['loan_amnt'].to_numpy(dtype=np.float64), chunk['loan_int_rate'].to_numpy(dtype=np.float64),
+        args.years, np.where(income > 0, income / 12, 0.0), fees=args.fees, insurance_rate=args.insurance_rate
+    )
+    for name, values in indicators.items():
+        result[name] = values
+    # Masque des recommandations (bits de RECOMMENDATION_BITS); texte seulement sur demande
+    recommendations = RecommendationBatch.from_portfolio(scores, chunk)
+    result['recommendations'] = recommendations.masks
+    if args.recommendation_text:
+        result['recommendations_text'] = list(recommendations.iter_texts())
+    return result
+
+
+def logged_chunks(audit_dir, job_id, first_segment):
+    """Numéros des blocs de ce travail consignés dans les segments >= `first_segment`
+
+    `first_segment` est le segment en cours au dernier point de contrôle:
+    seules les trames écrites depuis (blocs non validés) sont examinées.
+    """
+    import pyarrow as pa
+
+    if not os.path.isdir(audit_dir):
+        return set()
+    chunks = set()
+    for kind, payload in AuditReader(audit_dir).iter_frames(first_segment):
+        if kind != KIND_ARROW:
+            continue
+        reader = pa.ipc.open_stream(payload)
+        if 'job' not in reader.schema.names:
+            continue
+        # Une trame par bloc: la première ligne du premier lot suffit à l'identifier
+        batch = reader.read_next_batch()
+        if batch.num_rows and batch.column('job')[0].as_py() == job_id:
+            chunks.add(batch.column('chunk')[0].as_py())
+    return chunks
+
+
+def commit_checkpoint(checkpoint_path, state, audit_log, pending_audit):
+    """Rend durables les trames d'audit des blocs à valider, puis écrit le point de contrôle"""
+    for frame in pending_audit:
+        audit_log.append_frame(frame)
+    audit_log.flush()
+    pending_audit.clear()
+    # Les trames des blocs suivants iront dans ce segment ou au-delà
+    state['audit_segment'] = audit_log.segment_number
+    _write_atomic(checkpoint_path, state)
+
+
+def run(args):
+    os.makedirs(args.output, exist_ok=True)
+    checkpoint_path = os.path.join(args.output, CHECKPOINT_FILE)
+    context = load_scoring_context()
+    stat = os.stat(args.input)
+    job = {
+        'input': os.path.abspath(args.input),
+        'input_size': stat.st_size,
+        'input_mtime_ns': stat.st_mtime_ns,
+        'chunk_size': args.chunk_size,
+        'years': args.years,
+        'fees': args.fees,
+        'insurance_rate': args.insurance_rate,
+        'format': args.format,
+        'recommendation_text': args.recommendation_text,
+        'model_version': context[-1],
+    }
+
+    state = None
+    if os.path.exists(checkpoint_path) and not args.restart:
+        with open(checkpoint_path, encoding='utf-8') as source:
+            state = json.load(source)
+        if any(state.get(key) != job[key] for key in JOB_KEYS):
+            changed = [key for key in JOB_KEYS if state.get(key) != job[key]]
+            raise SystemExit(f"Point de contrôle incompatible ({', '.join(changed)}): "
+                             f"relancez avec --restart pour repartir du début")
+        if state['completed']:
+            print(f"Déjà terminé: {state['rows_done']:,} lignes dans {args.output}", file=sys.stderr)
+            return state
+    fresh = state is None
+    if fresh:
+        # Nouveau départ: les blocs d'une exécution précédente sont supprimés
+        for name in os.listdir(args.output):
+            if name.startswith('part-') or name in (SUCCESS_FILE, CHECKPOINT_FILE):
+                os.remove(os.path.join(args.output, name))
+        state = dict(job, job_id=uuid.uuid4().hex, next_chunk=0, rows_done=0, offset=None,
+                     audit_segment=None, completed=False)
+        _write_atomic(checkpoint_path, state)
+        already_logged = set()
+    else:
+        # Point de contrôle antérieur à l'identifiant de travail: aucun bloc n'est reconnaissable
+        state.setdefault('job_id', uuid.uuid4().hex)
+        if state.get('offset') is None and state['next_chunk']:
+            state['offset'] = _offset_after_rows(args.input, state['next_chunk'] * args.chunk_size)
+        # Sans segment connu (aucun point de contrôle validé), tout le journal est examiné
+        already_logged = logged_chunks(args.audit_dir, state['job_id'], state.get('audit_segment') or 1)
+
+    total_rows = count_rows(args.input)
+    n_chunks = max(1, -(-total_rows // args.chunk_size))
+    if state['next_chunk']:
+        print(f"Reprise au bloc {state['next_chunk'] + 1}/{n_chunks} "
+              f"({state['rows_done']:,} lignes déjà validées)", file=sys.stderr)
+
+    reader = iter_csv_chunks(args.input, args.chunk_size, state.get('offset'))
+    started = time.perf_counter()
+    rows_this_run = 0
+    chunk_number = state['next_chunk']
+    # Trames d'audit des blocs écrits depuis le dernier point de contrôle
+    pending_audit = []
+    with AuditLog(args.audit_dir) as audit_log:
+        if fresh:
+            # Premier segment de ce travail: une reprise n'examine rien d'antérieur
+            state['audit_segment'] = audit_log.segment_number
+            _write_atomic(checkpoint_path, state)
+        for chunk, offset in reader:
+            part_path = os.path.join(args.output, PART_PATTERN.format(chunk_number) + '.' + args.format)
+            # Le temporaire garde l'extension: export_frames choisit le format d'après elle
+            tmp_path = os.path.join(args.output, PART_PATTERN.format(chunk_number) + '.tmp.' + args.format)
+            frames = AuditFrames() if chunk_number not in already_logged else None
+            result = score_chunk(chunk, context, args, frames)
+            for frame in frames or ():
+                # Estampille du travail et du bloc: une reprise reconnaît les blocs déjà consignés
+                frame['job'] = state['job_id']
+                frame['chunk'] = chunk_number
+                pending_audit.append(frame)
+            export_frames(result, tmp_path)
+            _fsync(tmp_path)
+            os.replace(tmp_path, part_path)
+
+            chunk_number += 1
+            rows_this_run += len(chunk)
+            state['next_chunk'] = chunk_number
+            state['rows_done'] += len(chunk)
+            state['offset'] = offset
+            if chunk_number % args.checkpoint_every == 0:
+                commit_checkpoint(checkpoint_path, state, audit_log, pending_audit)
+
+            elapsed = time.perf_counter() - started
+            throughput = rows_this_run / elapsed if elapsed > 0 else 0.0
+            remaining = (total_rows - state['rows_done']) / throughput if throughput else 0.0
+            print(f"[bloc {chunk_number}/{n_chunks}] {state['rows_done']:,}/{total_rows:,} lignes "
+                  f"({state['rows_done'] / max(total_rows, 1):.1%}) - {throughput:,.0f} lignes/s - "
+                  f"reste ~{remaining:,.0f} s", file=sys.stderr, flush=True)
+
+        state['completed'] = True
+        commit_checkpoint(checkpoint_path, state, audit_log, pending_audit)
+    _write_atomic(os.path.join(args.output, SUCCESS_FILE),
+                  {'rows': state['rows_done'], 'parts': chunk_number, 'model_version': job['model_version']})
+    print(f"Terminé: {state['rows_done']:,} lignes, {chunk_number} blocs dans {args.output}", file=sys.stderr)
+    return state
+
+
+def main(argv=None):
+    warnings.filterwarnings('ignore')
+    args = parse_args(argv)
+    if args.chunk_size <= 0 or args.checkpoint_every <= 0:
+        raise SystemExit("--chunk-size et --checkpoint-every doivent être positifs")
+    try:
+        run(args)
+    except KeyboardInterrupt:
+        print("Interrompu: relancez la même commande pour reprendre", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Débit et précision du solveur de TAEG sur tout le jeu de données
+
+Résout le TAEG (frais de dossier et assurance inclus) de chaque prêt du jeu de
+données pour plusieurs durées, compare à une résolution prêt par prêt avec
+scipy (brentq) et au repli seul, puis affiche les statistiques de convergence.
+
+Usage: python benchmarks/bench_apr.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import load_dataset
+from apr import solve_apr, monthly_payments
+
+
+def reference_apr(principals, annual_rates, years, fees, insurance_rate):
+    """TAEG prêt par prêt (boucle Python + scipy.optimize.brentq)"""
+    from scipy.optimize import brentq
+
+    n = years * 12
+    payments = monthly_payments(principals, annual_rates, n)
+    result = np.full(len(principals), np.nan)
+    for i, (principal, rate, payment, fee) in enumerate(zip(principals, annual_rates, payments, fees)):
+        if np.isnan(rate):
+            continue
+        instalment = payment + principal * insurance_rate / 100 / 12
+        net = principal - fee
+
+        def residual(monthly_rate):
+            return instalment * (1 - (1 + monthly_rate) ** -n) / monthly_rate - net
+
+        monthly_rate = brentq(residual, 1e-9, 1.0, xtol=1e-12)
+        result[i] = ((1 + monthly_rate) ** 12 - 1) * 100
+    return result
+
+
+def main():
+    data = load_dataset()
+    principals = data['loan_amnt'].to_numpy(dtype=np.float64)
+    annual_rates = data['loan_int_rate'].to_numpy(dtype=np.float64)
+    fees = np.minimum(0.01 * principals, 1500)
+    insurance_rate = 0.3
+
+    for years in (1, 5, 20):
+        runs = []
+        for _ in range(5):
+            start = time.perf_counter()
+            result = solve_apr(principals, annual_rates, years, fees=fees, insurance_rate=insurance_rate)
+            runs.append(time.perf_counter() - start)
+        elapsed = min(runs)
+        assert elapsed < 1.0, f"solveur trop lent: {elapsed:.2f} s"
+        print(f"Durée {years} an(s): {len(principals):,} prêts en {elapsed * 1000:.1f} ms "
+              f"({len(principals) / elapsed:,.0f} prêts/s) - {result.convergence_stats()}")
+
+    # Précision: référence prêt par prêt sur un échantillon
+    sample = np.random.default_rng(0).choice(len(principals), 3000, replace=False)
+    start = time.perf_counter()
+    expected = reference_apr(principals[sample], annual_rates[sample], 5, fees[sample], insurance_rate)
+    loop_time = time.perf_counter() - start
+    start = time.perf_counter()
+    result = solve_apr(principals[sample], annual_rates[sample], 5, fees=fees[sample], insurance_rate=insurance_rate)
+    vector_time = time.perf_counter() - start
+    gap = np.nanmax(np.abs(result.apr - expected))
+    assert np.array_equal(np.isnan(result.apr), np.isnan(expected)) and gap < 1e-6
+    print(f"Référence brentq prêt par prêt: {len(sample) / loop_time:,.0f} prêts/s, "
+          f"vectorisé {len(sample) / vector_time:,.0f} prêts/s (x{loop_time / vector_time:.0f}), "
+          f"écart max {gap:.1e} pt")
+
+    # Repli seul (Newton désactivé): mêmes TAEG
+    full = solve_apr(principals, annual_rates, 5, fees=fees, insurance_rate=insurance_rate)
+    start = time.perf_counter()
+    fallback = solve_apr(principals, annual_rates, 5, fees=fees, insurance_rate=insurance_rate, max_iter=0)
+    fallback_time = time.perf_counter() - start
+    assert np.nanmax(np.abs(full.apr - fallback.apr)) < 1e-6
+    print(f"Repli seul: {fallback.fallback_solved:,} prêts en {fallback_time:.2f} s, TAEG identiques")
+
+
+if __name__ == '__main__':
+    main()
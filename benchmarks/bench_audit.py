@@ -0,0 +1,128 @@
+"""Débit du journal d'audit: écritures, commit groupé, scoring par lot, relecture
+
+Usage: python benchmarks/bench_audit.py [lignes_portefeuille]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import warnings
+import joblib
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+from preprocessing import NUMERIC_FEATURES, TARGET, load_dataset, fit_scaler
+from calibration import load_or_fit_calibrator
+import scoring
+from scoring import model_version, iter_scored_portfolio
+from audit_log import AuditLog, AuditReader, build_audit_record
+
+
+def consume(chunks):
+    rows = 0
+    for chunk in chunks:
+        rows += len(chunk)
+    return rows
+
+
+def main(n_rows=1000000):
+    data = load_dataset()
+    records = data.drop(columns=[TARGET]).to_dict('records')
+    directory = tempfile.mkdtemp(prefix='audit-bench-')
+    try:
+        # 1. Ajouts unitaires sans attente (fsync groupés en arrière-plan)
+        n = 100000
+        with AuditLog(directory) as log:
+            start = time.perf_counter()
+            for i in range(n):
+                log.append(build_audit_record(records[i % len(records)], 0.1, 0, 0, 'bench', 'model'))
+            log.flush()
+            elapsed = time.perf_counter() - start
+            print(f"Ajouts unitaires: {n / elapsed:,.0f} écritures/s, {log.fsync_count} fsync")
+
+        # 2. Ajouts durables concurrents (wait=True): un fsync sert plusieurs écrivains
+        n_threads, per_thread = 16, 300
+        with AuditLog(directory, commit_interval=0.005) as log:
+            def writer(offset):
+                for i in range(per_thread):
+                    log.append(build_audit_record(records[offset + i], 0.1, 0, 0, 'bench', 'model'), wait=True)
+
+            threads = [threading.Thread(target=writer, args=(t * per_thread,)) for t in range(n_threads)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            total = n_threads * per_thread
+            print(f"Ajouts durables ({n_threads} threads): {total / elapsed:,.0f} écritures/s, "
+                  f"{log.fsync_count} fsync ({total / log.fsync_count:.0f} enregistrements/fsync)")
+
+        # 3. Scoring par lot avec et sans journal
+        model = joblib.load('tree_model.pkl')
+        scaler = fit_scaler(data)
+        calibrator = load_or_fit_calibrator(model, data, scaler, model_version())
+        portfolio = pd.concat([data] * (n_rows // len(data) + 1), ignore_index=True).iloc[:n_rows]
+        fill_values = data[NUMERIC_FEATURES].median()
+
+        start = time.perf_counter()
+        consume(iter_scored_portfolio(portfolio, model, scaler, fill_values=fill_values, calibrator=calibrator))
+        plain = time.perf_counter() - start
+        with AuditLog(directory, segment_bytes=32 * 1024 * 1024) as log:
+            start = time.perf_counter()
+            consume(iter_scored_portfolio(portfolio, model, scaler, fill_values=fill_values,
+                                          calibrator=calibrator, audit_log=log, version=model_version()))
+            log.flush()
+            audited = time.perf_counter() - start
+        print(f"Scoring de {n_rows:,} lignes: {n_rows / plain:,.0f} lignes/s sans journal, "
+              f"{n_rows / audited:,.0f} lignes/s avec journal")
+
+        # Version du modèle estampillée: empreinte sha256 recalculée seulement si le fichier change
+        scoring._MODEL_DIGESTS.clear()
+        start = time.perf_counter()
+        version = model_version()
+        first_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(1000):
+            assert model_version() == version
+        cached_time = (time.perf_counter() - start) / 1000
+        print(f"Version du modèle: {first_time * 1e6:,.0f} µs au premier appel, {cached_time * 1e6:.1f} µs en cache")
+
+        # 4. Relecture
+        reader = AuditReader(directory)
+        start = time.perf_counter()
+        count = len(reader)
+        index_time = time.perf_counter() - start
+        start = time.perf_counter()
+        frames = sum(1 for _ in reader.iter_frames())
+        raw_time = time.perf_counter() - start
+        start = time.perf_counter()
+        frame = reader.to_frame()
+        frame_time = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = sum(1 for _ in reader.replay())
+        replay_time = time.perf_counter() - start
+        assert count == decoded == len(frame)
+        print(f"Relecture de {count:,} enregistrements, {frames:,} trames ({len(reader.segments())} segments): "
+              f"index {index_time * 1000:.0f} ms, trames+CRC {frames / raw_time:,.0f}/s, "
+              f"DataFrame {count / frame_time:,.0f}/s, dict {decoded / replay_time:,.0f}/s")
+
+        # 5. Fin de segment tronquée (arrêt brutal): la trame partielle est ignorée
+        last = reader.segments()[-1]
+        last_count = int(reader.segment_index(last)[-1, 1])
+        os.remove(last + '.idx.npy')
+        with open(last, 'r+b') as segment:
+            segment.truncate(os.path.getsize(last) - 5)
+        assert len(AuditReader(directory)) == count - last_count
+        print("Segment tronqué: relecture jusqu'à la dernière trame complète")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
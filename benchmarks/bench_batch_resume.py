@@ -0,0 +1,109 @@
+"""Interruption et reprise du scoring par lot (batch_score.py)
+
+Réplique le jeu de données dans un CSV temporaire, produit une sortie de
+référence sans interruption, puis lance la même commande, la tue (SIGKILL)
+à plusieurs reprises après des points de contrôle et la relance jusqu'au
+bout. Vérifie que les blocs produits sont identiques octet pour octet à la
+référence, que le journal d'audit contient chaque score exactement une fois
+(ni perte ni doublon malgré les interruptions) et qu'une relance d'un
+travail terminé ne refait rien.
+
+Usage: python benchmarks/bench_batch_resume.py [copies] [lignes_par_bloc]
+"""
+import os
+import sys
+import json
+import time
+import signal
+import shutil
+import filecmp
+import tempfile
+import subprocess
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from preprocessing import load_dataset
+from batch_score import CHECKPOINT_FILE, SUCCESS_FILE
+from audit_log import AuditReader
+
+
+def command(input_path, output, chunk_size):
+    # Points de contrôle tous les deux blocs: des trames d'audit restent en attente entre deux
+    return [sys.executable, os.path.join(ROOT, 'batch_score.py'), input_path, output,
+            '--chunk-size', str(chunk_size), '--checkpoint-every', '2', '--years', '5', '--fees', '150',
+            '--insurance-rate', '0.3', '--audit-dir', os.path.join(output, 'audit')]
+
+
+def committed_chunks(output):
+    try:
+        with open(os.path.join(output, CHECKPOINT_FILE), encoding='utf-8') as source:
+            return json.load(source)['next_chunk']
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
+
+
+def run_and_kill(cmd, output, after_chunks):
+    """Lance la commande et la tue dès que `after_chunks` blocs sont validés"""
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while process.poll() is None and committed_chunks(output) < after_chunks:
+        time.sleep(0.05)
+    if process.poll() is None:
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+        return True
+    return False
+
+
+def main(copies=20, chunk_size=50000):
+    directory = tempfile.mkdtemp(prefix='batch-bench-')
+    try:
+        input_path = os.path.join(directory, 'portefeuille.csv')
+        data = load_dataset()
+        pd.concat([data] * copies, ignore_index=True).to_csv(input_path, sep=';', index=False)
+        n_rows = len(data) * copies
+        print(f"Portefeuille répliqué: {n_rows:,} lignes, blocs de {chunk_size:,}")
+
+        reference = os.path.join(directory, 'reference')
+        start = time.perf_counter()
+        subprocess.run(command(input_path, reference, chunk_size), check=True, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        print(f"Référence sans interruption: {elapsed:.1f} s ({n_rows / elapsed:,.0f} lignes/s, chargement compris)")
+
+        resumed = os.path.join(directory, 'reprise')
+        cmd = command(input_path, resumed, chunk_size)
+        n_chunks = -(-n_rows // chunk_size)
+        kills = 0
+        for target in (2, n_chunks // 2, n_chunks - 3):
+            kills += run_and_kill(cmd, resumed, target)
+            print(f"  tué après {committed_chunks(resumed)}/{n_chunks} blocs validés")
+        result = subprocess.run(cmd, check=True, stderr=subprocess.PIPE, text=True)
+        print(f"  reprise: {result.stderr.splitlines()[0]}")
+        assert kills > 0 and os.path.exists(os.path.join(resumed, SUCCESS_FILE))
+
+        parts = sorted(name for name in os.listdir(reference) if name.startswith('part-'))
+        assert parts == sorted(name for name in os.listdir(resumed) if name.startswith('part-'))
+        match, mismatch, errors = filecmp.cmpfiles(reference, resumed, parts, shallow=False)
+        assert not mismatch and not errors, f"blocs différents: {mismatch + errors}"
+        rows = sum(len(pd.read_parquet(os.path.join(resumed, name))) for name in parts)
+        assert rows == n_rows
+        print(f"{kills} interruptions: {len(parts)} blocs identiques octet pour octet à la référence, {rows:,} lignes")
+
+        expected = AuditReader(os.path.join(reference, 'audit')).to_frame()
+        audited = AuditReader(os.path.join(resumed, 'audit')).to_frame()
+        assert len(expected) == len(audited) == n_rows, f"{len(audited):,} enregistrements d'audit"
+        assert (audited['score'].to_numpy() == expected['score'].to_numpy()).all()
+        assert audited['model'].nunique() == 1
+        print(f"Journal d'audit: {len(audited):,} enregistrements, un par score, version {audited['model'].iloc[0]}")
+
+        again = subprocess.run(cmd, check=True, stderr=subprocess.PIPE, text=True)
+        assert again.stderr.startswith('Déjà terminé')
+        print(f"Relance d'un travail terminé: {again.stderr.strip()}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
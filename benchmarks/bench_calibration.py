@@ -0,0 +1,74 @@
+"""Qualité et coût de la calibration des scores
+
+Mesure l'ECE et le score de Brier avant/après calibration sur la moitié
+d'évaluation de l'échantillon réservé, puis le surcoût par ligne de
+l'application de la table par morceaux face à predict_proba. Vérifie que
+score_batch calibre par défaut (calibration persistée) et ne renvoie les
+scores bruts qu'avec calibrate=False.
+
+Usage: python benchmarks/bench_calibration.py
+"""
+import os
+import sys
+import time
+import warnings
+import joblib
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+from preprocessing import NUMERIC_FEATURES, load_dataset, fit_scaler, encode_features, to_model_frame
+from calibration import fit_calibration, predict_default_proba
+from scoring import model_version, persisted_calibrator, score_batch
+
+
+def best_of(function, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(n_rows=1000000):
+    model = joblib.load('tree_model.pkl')
+    data = load_dataset()
+    scaler = fit_scaler(data)
+
+    for method in ('isotonic', 'platt'):
+        calibrator, metrics = fit_calibration(model, data, scaler, method=method)
+        print(f"{method:<9} {len(calibrator.x):>4} points  "
+              f"ECE {metrics['ece_raw']:.4f} -> {metrics['ece_calibrated']:.4f}  "
+              f"Brier {metrics['brier_raw']:.4f} -> {metrics['brier_calibrated']:.4f}  "
+              f"(n={metrics['n_evaluation']})")
+
+    calibrator, _ = fit_calibration(model, data, scaler)
+    portfolio = pd.concat([data] * (n_rows // len(data) + 1)).iloc[:n_rows]
+    features = to_model_frame(encode_features(portfolio, scaler, data[NUMERIC_FEATURES].median()))
+    raw = predict_default_proba(model, features)
+
+    predict_time = best_of(lambda: predict_default_proba(model, features), repeat=3)
+    calibrate_time = best_of(lambda: calibrator.apply(raw))
+    print(f"Lot de {n_rows:,} lignes: predict_proba {predict_time / n_rows * 1e9:.0f} ns/ligne, "
+          f"calibration {calibrate_time / n_rows * 1e9:.1f} ns/ligne "
+          f"({calibrate_time / predict_time:.2%} du temps de prédiction)")
+
+    single = features.iloc[:1]
+    predict_one = best_of(lambda: predict_default_proba(model, single), repeat=50)
+    calibrate_one = best_of(lambda: calibrator.apply(raw[:1]), repeat=50)
+    print(f"Dossier unitaire: predict_proba {predict_one * 1e6:.0f} µs, calibration {calibrate_one * 1e6:.1f} µs")
+
+    fill_values = data[NUMERIC_FEATURES].median()
+    sample = portfolio.iloc[:10000]
+    raw_sample = raw[:len(sample)]
+    persisted = persisted_calibrator(model, scaler, model_version())
+    assert (score_batch(sample, model, scaler, fill_values) == persisted.apply(raw_sample)).all()
+    assert (score_batch(sample, model, scaler, fill_values, calibrate=False) == raw_sample).all()
+    print("score_batch: calibration persistée par défaut, scores bruts avec calibrate=False")
+
+
+if __name__ == '__main__':
+    main()
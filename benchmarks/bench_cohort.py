@@ -0,0 +1,161 @@
+"""Cube de cohortes précalculé contre agrégation à la volée sur le CSV
+
+Mesure la construction du cube (une passe vectorisée), la latence des
+requêtes du tableau de bord face à un groupby pandas sur le jeu complet, et
+le rafraîchissement incrémental (lignes ajoutées au CSV, lots de `deltas/`)
+face à une reconstruction. Vérifie que comptages et défauts sont exacts, que
+le cube rafraîchi est identique au cube reconstruit, et mesure l'écart des
+quantiles (précision d'un intervalle d'histogramme).
+
+Usage: python benchmarks/bench_cohort.py [lots] [lignes_par_lot]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+from preprocessing import DATASET_PATH, TARGET, load_dataset
+from refresh import append_delta, delta_paths
+from cohort import AGE_EDGES, AGE_LABELS, INCOME_EDGES, INCOME_LABELS, MEASURE_EDGES, CohortCube, refresh_cube
+
+# Requêtes type du tableau de bord: (dimensions de regroupement, filtre)
+DASHBOARD_QUERIES = [
+    ((), None),
+    (('loan_grade',), None),
+    (('loan_intent',), {'person_home_ownership': ['RENT']}),
+    (('loan_grade', 'loan_intent'), None),
+    (('income_band', 'loan_grade'), {'loan_intent': ['EDUCATION', 'MEDICAL']}),
+    (('age_band', 'person_home_ownership'), None),
+]
+
+
+def with_bands(data):
+    """Tranches d'âge et de revenu pour l'agrégation pandas de référence"""
+    data = data.copy()
+    data['age_band'] = pd.cut(data['person_age'], [-np.inf] + AGE_EDGES + [np.inf], right=False, labels=AGE_LABELS)
+    data['income_band'] = pd.cut(data['person_income'], [-np.inf] + INCOME_EDGES + [np.inf], right=False,
+                                 labels=INCOME_LABELS)
+    return data
+
+
+def pandas_query(by, where):
+    """Référence à la volée: lecture du CSV, filtre, groupby et quantiles exacts"""
+    data = with_bands(load_dataset())
+    for name, values in (where or {}).items():
+        data = data[data[name].isin(values)]
+    groups = data.groupby(list(by), observed=True) if by else data.groupby(np.zeros(len(data)))
+    result = groups[TARGET].agg(['size', 'sum', 'mean'])
+    for name in MEASURE_EDGES:
+        result = result.join(groups[name].quantile([0.25, 0.5, 0.75]).unstack().add_prefix(f"{name}_"))
+    return result
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return np.median(timings) * 1000, np.percentile(timings, 95) * 1000
+
+
+def main(n_deltas=6, rows_per_delta=20000):
+    data = load_dataset()
+    start = time.perf_counter()
+    cube = CohortCube.from_frame(data)
+    print(f"Construction du cube ({len(data):,} dossiers, {cube.counts.size:,} cellules): "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    print(f"{'requête':<58} | {'cube p50':>8} | {'cube p95':>8} | {'pandas':>8}")
+    banded = with_bands(data)
+    for by, where in DASHBOARD_QUERIES:
+        cube_p50, cube_p95 = timed(lambda: cube.query(by, where), 100)
+        pandas_p50, _ = timed(lambda: pandas_query(by, where), 5)
+        label = f"{' × '.join(by) or 'total'}{' | ' + str(where) if where else ''}"
+        print(f"{label[:58]:<58} | {cube_p50:>5.1f} ms | {cube_p95:>5.1f} ms | {pandas_p50:>5.0f} ms")
+
+        # Comptages et défauts exacts
+        result = cube.query(by, where)
+        subset = banded
+        for name, values in (where or {}).items():
+            subset = subset[subset[name].isin(values)]
+        if by:
+            expected = subset.groupby(list(by), observed=True)[TARGET].agg(['size', 'sum'])
+            observed = result[result['dossiers'] > 0]
+            observed.index = observed.index.set_names(expected.index.names)
+            expected = expected.reindex(observed.index)
+            assert (observed['dossiers'].to_numpy() == expected['size'].to_numpy()).all()
+            assert (observed['défauts'].to_numpy() == expected['sum'].to_numpy()).all()
+        else:
+            assert result['dossiers'].iloc[0] == len(subset) and result['défauts'].iloc[0] == subset[TARGET].sum()
+    assert_quantile_error(cube, banded)
+
+    directory = tempfile.mkdtemp(prefix='cohort-bench-')
+    try:
+        dataset_path = os.path.join(directory, 'dataset.csv')
+        delta_dir = os.path.join(directory, 'deltas')
+        cube_path = os.path.join(directory, 'cohort_cube.npz')
+        shutil.copyfile(DATASET_PATH, dataset_path)
+        refresh_cube(cube_path, dataset_path, delta_dir)
+
+        start = time.perf_counter()
+        refresh_cube(cube_path, dataset_path, delta_dir)
+        print(f"Rechargement sans nouveauté: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        for i in range(n_deltas):
+            rows = data.sample(rows_per_delta, replace=True, random_state=i)
+            if i % 2:
+                append_delta(rows, delta_dir)
+                source = 'lot deltas/'
+            else:
+                with open(dataset_path, 'a', encoding='utf-8', newline='') as target:
+                    rows.to_csv(target, sep=';', index=False, header=False)
+                source = 'ajout au CSV'
+            start = time.perf_counter()
+            refreshed = refresh_cube(cube_path, dataset_path, delta_dir)
+            incremental_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            history = pd.concat([pd.read_csv(dataset_path, sep=';')] +
+                                [pd.read_csv(path, sep=';') for path in delta_paths(delta_dir)], ignore_index=True)
+            rebuilt = CohortCube.from_frame(history)
+            rebuild_time = time.perf_counter() - start
+            print(f"{source:<13} {refreshed.n_rows:>7,} dossiers: incrémental {incremental_time * 1000:>4.0f} ms, "
+                  f"reconstruction {rebuild_time * 1000:>4.0f} ms")
+
+            assert np.array_equal(refreshed.counts, rebuilt.counts)
+            assert np.array_equal(refreshed.defaults, rebuilt.defaults)
+            assert all(np.array_equal(refreshed.histograms[name], rebuilt.histograms[name]) for name in MEASURE_EDGES)
+        print("Cube rafraîchi identique au cube reconstruit")
+    finally:
+        shutil.rmtree(directory)
+
+
+def assert_quantile_error(cube, banded):
+    """Écart des quantiles du cube aux quantiles exacts, rapporté à la largeur d'intervalle"""
+    result = cube.query('loan_grade')
+    groups = banded.groupby('loan_grade')
+    for name, edges in MEASURE_EDGES.items():
+        exact = groups[name].quantile([0.25, 0.5, 0.75]).unstack()
+        approx = result.loc[exact.index, [f"{name}_p25", f"{name}_p50", f"{name}_p75"]].to_numpy()
+        # Largeur de l'intervalle contenant chaque quantile exact. Le quantile
+        # exact interpole entre deux valeurs voisines qui peuvent se trouver de
+        # part et d'autre d'une borne: l'écart reste inférieur à deux intervalles.
+        position = np.clip(np.searchsorted(edges, exact.to_numpy(), side='right') - 1, 0, len(edges) - 2)
+        widths = edges[position + 1] - edges[position]
+        error = np.abs(approx - exact.to_numpy()) / widths
+        assert (error < 2).all(), f"quantiles de {name} trop éloignés des quantiles exacts"
+        print(f"Quantiles {name}: écart max {np.abs(approx - exact.to_numpy()).max():.4g} "
+              f"({error.max():.2f} largeur d'intervalle)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,74 @@
+"""Débit et mémoire des exports (xlsx streaming, CSV, Parquet)
+
+Exporte un portefeuille scoré répliqué et les échéanciers de tous les prêts
+(environ 1M de lignes chacun) par blocs. Chaque format est mesuré dans un
+sous-processus pour isoler le pic de mémoire (RSS).
+
+Usage: python benchmarks/bench_export.py [lignes]
+"""
+import os
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+FORMATS = ('.csv', '.parquet', '.xlsx')
+
+
+def portfolio_chunks(n_rows, chunk_size=100000):
+    """Portefeuille scoré (simulation) répliqué jusqu'à n_rows lignes"""
+    from preprocessing import load_dataset
+    from scoring import iter_scored_portfolio
+
+    data = load_dataset()
+    remaining = n_rows
+    while remaining > 0:
+        block = data.iloc[:min(remaining, len(data))]
+        remaining -= len(block)
+        yield from iter_scored_portfolio(block, chunk_size=chunk_size)
+
+
+def schedule_chunks(n_rows, years=5):
+    from preprocessing import load_dataset
+    from export import iter_portfolio_schedules
+    import pandas as pd
+
+    data = load_dataset()
+    loans = data[data['loan_int_rate'].notna()]
+    n_loans = n_rows // (years * 12)
+    loans = pd.concat([loans] * (n_loans // len(loans) + 1)).iloc[:n_loans].reset_index(drop=True)
+    return iter_portfolio_schedules(loans, years, rows_per_chunk=120000)
+
+
+def run_one(kind, extension, n_rows):
+    from export import export_frames
+
+    chunks = portfolio_chunks(n_rows) if kind == 'portefeuille' else schedule_chunks(n_rows)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'export' + extension)
+        start = time.perf_counter()
+        rows = export_frames(chunks, path)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"  {kind:<13} {extension:<9} {rows:>9,} lignes  {rows / elapsed:>11,.0f} lignes/s  "
+          f"{size / 1e6:7.1f} Mo  pic RSS {peak:6.0f} Mo", flush=True)
+
+
+def main(n_rows=1000000):
+    print(f"Export de {n_rows:,} lignes par format")
+    for kind in ('portefeuille', 'echeanciers'):
+        for extension in FORMATS:
+            subprocess.run([sys.executable, __file__, '--run', kind, extension, str(n_rows)], check=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run_one(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
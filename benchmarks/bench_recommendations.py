@@ -0,0 +1,99 @@
+"""Recommandations de portefeuille: masques vectorisés contre boucle par dossier
+
+Sur un portefeuille répliqué (1 million de dossiers par défaut, scores du
+mode simulation), compare la boucle sur get_risk_recommendations suivie de
+l'optimisation du montant (textes produits pour chaque dossier) au moteur
+par masques: calcul des masques uint16, puis rendu paresseux des textes.
+Vérifie que les textes sont identiques pour chaque dossier et mesure la
+mémoire (tracemalloc) des deux représentations.
+
+Usage: python benchmarks/bench_recommendations.py [dossiers]
+"""
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+from preprocessing import load_dataset
+from scoring import score_batch
+from recommendations import (MESSAGES, OPTIMAL_DEBT_RATIO, MAX_SAFE_DEBT_RATIO, RecommendationBatch,
+                             amount_parameters, get_risk_recommendations)
+
+
+def loop_recommendations(scores, data):
+    """Référence: une liste de textes par dossier, comme l'application pour un seul dossier"""
+    results = []
+    columns = zip(scores.tolist(), data['loan_percent_income'].tolist(), data['person_emp_length'].tolist(),
+                  data['person_income'].tolist(), data['loan_amnt'].tolist())
+    for score, ratio, emp_length, income, amount in columns:
+        texts = get_risk_recommendations(score, {'loan_percent_income': ratio, 'person_emp_length': emp_length})
+        # Optimisation du montant (onglet recommandations)
+        if ratio > OPTIMAL_DEBT_RATIO:
+            texts.append(MESSAGES['montant_reduction'].format(**amount_parameters(income, amount)))
+        elif income * MAX_SAFE_DEBT_RATIO - amount > 0:
+            texts.append(MESSAGES['montant_capacite'].format(**amount_parameters(income, amount)))
+        results.append(texts)
+    return results
+
+
+def traced(function):
+    """Résultat, durée et pic de mémoire Python alloué pendant l'appel"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main(n_rows=1000000):
+    data = load_dataset()
+    portfolio = pd.concat([data] * -(-n_rows // len(data)), ignore_index=True).iloc[:n_rows]
+    scores = score_batch(portfolio)
+    print(f"Portefeuille de {len(portfolio):,} dossiers (scores du mode simulation)")
+
+    start = time.perf_counter()
+    expected = loop_recommendations(scores, portfolio)
+    loop_time = time.perf_counter() - start
+    del expected
+    _, _, loop_memory = traced(lambda: loop_recommendations(scores, portfolio))
+
+    start = time.perf_counter()
+    batch = RecommendationBatch.from_portfolio(scores, portfolio)
+    mask_time = time.perf_counter() - start
+    _, _, mask_memory = traced(lambda: RecommendationBatch.from_portfolio(scores, portfolio))
+
+    start = time.perf_counter()
+    rendered = sum(1 for _ in batch.iter_texts())
+    render_time = time.perf_counter() - start
+
+    print(f"{'méthode':<36} | {'temps':>8} | {'dossiers/s':>12} | {'mémoire':>9}")
+    print(f"{'boucle get_risk_recommendations':<36} | {loop_time:>6.2f} s | {n_rows / loop_time:>12,.0f} | "
+          f"{loop_memory:>6.0f} Mo")
+    print(f"{'masques vectorisés':<36} | {mask_time:>6.2f} s | {n_rows / mask_time:>12,.0f} | "
+          f"{batch.masks.nbytes / 2**20:>6.1f} Mo (pic {mask_memory:.0f} Mo)")
+    print(f"{'rendu paresseux des textes':<36} | {render_time:>6.2f} s | {rendered / render_time:>12,.0f} | "
+          f"{'en flux':>9}")
+    print(f"Masques x{loop_time / mask_time:.0f} plus rapides que la boucle; "
+          f"{len(np.unique(batch.masks))} combinaisons distinctes de recommandations")
+
+    # Textes identiques dossier par dossier (rendu en flux et accès unitaire)
+    for row, (texts, joined) in enumerate(zip(loop_recommendations(scores, portfolio), batch.iter_texts())):
+        assert joined == '\n'.join(texts), f"écart au dossier {row}"
+        if row % 97 == 0:
+            assert batch.texts(row) == texts, f"écart au dossier {row}"
+    print("Textes identiques à la boucle pour chaque dossier")
+    counts = pd.Series(batch.counts())
+    print((counts / n_rows).map('{:.1%}'.format).to_string())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
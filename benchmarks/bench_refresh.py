@@ -0,0 +1,83 @@
+"""Temps de rafraîchissement du modèle à mesure que l'historique grandit
+
+Dépose des lots étiquetés successifs, puis mesure le rafraîchissement
+incrémental (intégration du lot, réentraînement sur la matrice en cache,
+publication atomique) face à une reconstruction complète (relecture de tous
+les CSV, scaler, encodage, entraînement). Vérifie que la matrice en cache est
+identique à un encodage complet et que le scaler glissant rejoint un scaler
+ajusté sur tout l'historique, et qu'aucun modèle n'est publié tant
+qu'aucun nouveau lot n'est à intégrer.
+
+Usage: python benchmarks/bench_refresh.py [lots] [lignes_par_lot]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+from preprocessing import TARGET, load_dataset, fit_scaler, encode_features, numeric_matrix, to_model_frame
+from refresh import FeatureCache, append_delta, delta_paths, refresh_model, untrained_copy
+
+
+def full_rebuild(base_model, delta_dir):
+    """Reconstruction de référence: tout relire et tout réencoder"""
+    start = time.perf_counter()
+    history = pd.concat([load_dataset()] + [pd.read_csv(path, sep=';') for path in delta_paths(delta_dir)],
+                        ignore_index=True)
+    scaler = fit_scaler(history)
+    features = encode_features(history, scaler, fill_values=history.median(numeric_only=True))
+    model = untrained_copy(base_model)
+    model.fit(to_model_frame(features), history[TARGET])
+    return time.perf_counter() - start
+
+
+def main(n_deltas=10, rows_per_delta=20000):
+    data = load_dataset()
+    base_model = joblib.load('tree_model.pkl')
+    directory = tempfile.mkdtemp(prefix='refresh-bench-')
+    paths = {
+        'delta_dir': os.path.join(directory, 'deltas'),
+        'cache_path': os.path.join(directory, 'feature_cache.npz'),
+        'bundle_path': os.path.join(directory, 'model_bundle.pkl'),
+    }
+    try:
+        start = time.perf_counter()
+        assert refresh_model(base_model, **paths) is None
+        assert not os.path.exists(paths['bundle_path']), "modèle publié sans nouveau lot"
+        print(f"Initialisation ({len(data):,} dossiers, aucun lot, rien de publié): "
+              f"{time.perf_counter() - start:.2f} s")
+        print(f"{'historique':>11} | {'intégration':>11} | {'entraînement':>12} | {'publication':>11} | "
+              f"{'incrémental':>11} | {'complet':>8}")
+        for i in range(n_deltas):
+            append_delta(data.sample(rows_per_delta, replace=True, random_state=i), paths['delta_dir'])
+            result = refresh_model(base_model, **paths)
+            rebuild_time = full_rebuild(base_model, paths['delta_dir'])
+            print(f"{result.n_rows:>11,} | {result.ingest_time:>9.2f} s | {result.train_time:>10.2f} s | "
+                  f"{result.publish_time * 1000:>8.1f} ms | {result.total_time:>9.2f} s | {rebuild_time:>6.2f} s")
+
+        assert refresh_model(base_model, **paths) is None, "modèle republié sans nouveau lot"
+
+        cache = FeatureCache.load(paths['cache_path'])
+        history = pd.concat([data] + [pd.read_csv(path, sep=';') for path in delta_paths(paths['delta_dir'])],
+                            ignore_index=True)
+        assert np.array_equal(cache.matrix(), encode_features(history, cache.scaler, cache.fill_values))
+        reference = StandardScaler().fit(numeric_matrix(history, cache.fill_values))
+        assert np.allclose(reference.mean_, cache.scaler.mean_, rtol=1e-12)
+        assert np.allclose(reference.scale_, cache.scaler.scale_, rtol=1e-12)
+        print("Matrice en cache identique à un encodage complet, scaler glissant = scaler complet")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,74 @@
+"""Débit de la table de correspondance du mode simulation
+
+Compare les règles (simulate_risk_score) à la table, en lot et pour un
+dossier unitaire. La parité exacte et la reconstruction de la table exportée
+sont vérifiées par tests/test_risk_lookup.py.
+
+Usage: python benchmarks/bench_risk_lookup.py
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import load_dataset
+from risk_lookup import RiskLookupTable, GRADES, INTENTS, simulate_risk_score
+
+
+def random_portfolio(n, seed=0):
+    """Dossiers aléatoires concentrés autour des seuils des règles"""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'person_age': rng.choice([18, 24, 25, 26, 64, 65, 66, 80], n),
+        'person_income': rng.choice([0, 19999, 20000, 29999, 30000, 39999.5, 40000, 90000], n),
+        'loan_percent_income': rng.choice([0.0, 0.3, 0.30001, 0.4, 0.41, 0.5, 0.5000001, 0.9], n),
+        'loan_grade': rng.choice(GRADES + ['Z'], n),
+        'cb_person_default_on_file': rng.choice(['N', 'Y'], n),
+        'loan_int_rate': rng.choice([1.0, 15.0, 15.01, 18.0, 18.5, np.nan], n),
+        'person_emp_length': rng.choice([0, 0.99, 1, 1.5, 2, np.nan], n),
+        'cb_person_cred_hist_length': rng.choice([0, 1, 2, 30], n),
+        'loan_intent': rng.choice(INTENTS + ['EDUCATION', 'DEBTCONSOLIDATION'], n),
+    })
+    return frame
+
+
+def main():
+    start = time.perf_counter()
+    table = RiskLookupTable.build()
+    print(f"Construction: {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{table.codes.size} combinaisons, palette {len(table.palette)} valeurs, "
+          f"{table.codes.nbytes + table.palette.nbytes} octets")
+
+    for name, frame in [('jeu de données', load_dataset()), ('grille aux seuils', random_portfolio(200000))]:
+        records = frame.to_dict('records')
+        start = time.perf_counter()
+        expected = np.array([simulate_risk_score(record) for record in records])
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = table.score(frame)
+        table_time = time.perf_counter() - start
+
+        mismatches = int((scores != expected).sum())
+        print(f"{name}: {len(frame)} lignes, {mismatches} écarts, conditions {len(frame) / loop_time:,.0f} lignes/s, "
+              f"table {len(frame) / table_time:,.0f} lignes/s (x{loop_time / table_time:.0f})")
+
+    single = records[0]
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        simulate_risk_score(single)
+    rules_one = (time.perf_counter() - start) / n
+    start = time.perf_counter()
+    for _ in range(n):
+        table.score_one(single)
+    table_one = (time.perf_counter() - start) / n
+    print(f"Dossier unitaire: conditions {rules_one * 1e6:.1f} µs/appel, table {table_one * 1e6:.1f} µs/appel")
+
+
+if __name__ == '__main__':
+    main()
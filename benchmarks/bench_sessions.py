@@ -0,0 +1,109 @@
+"""Test de charge multi-sessions de l'application (AppTest headless)
+
+Chaque session simulée exécute l'application, lance une analyse, modifie un
+curseur et le montant du prêt puis vérifie que l'onglet recommandations
+relit bien sa propre analyse, y compris pour l'optimisation du montant
+(montants du dossier analysé, pas ceux de la barre latérale). Les sessions sont réparties sur plusieurs processus exécutés en
+parallèle; dans un processus, les sessions sont entrelacées étape par étape
+et partagent le modèle et le scaler (st.cache_resource), comme sur un
+serveur Streamlit. AppTest n'étant pas sûr entre threads, le parallélisme
+passe par les processus.
+
+Usage: python benchmarks/bench_sessions.py [sessions] [processus]
+"""
+import os
+import sys
+import time
+import pickle
+import multiprocessing
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+APP_PATH = os.path.join(ROOT, 'apps_premium.py')
+STEPS = ('initial', 'slider', 'analyse', 'rerun_apres_analyse')
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def timed_run(app, timings, step):
+    start = time.perf_counter()
+    app.run()
+    timings[step].append(time.perf_counter() - start)
+
+
+def run_worker(session_ids):
+    """Sessions entrelacées dans un processus; retourne latences et mémoire"""
+    from streamlit.testing.v1 import AppTest
+    from risk_analysis import SESSION_KEY
+    from recommendations import MAX_SAFE_DEBT_RATIO, OPTIMAL_DEBT_RATIO
+
+    # Préchauffage: chargement unique des ressources partagées
+    AppTest.from_file(APP_PATH, default_timeout=120).run()
+    rss_before = rss_mb()
+
+    timings = {step: [] for step in STEPS}
+    apps = {session_id: AppTest.from_file(APP_PATH, default_timeout=120) for session_id in session_ids}
+    ages = {session_id: 20 + session_id % 50 for session_id in session_ids}
+
+    for app in apps.values():
+        timed_run(app, timings, 'initial')
+    for session_id, app in apps.items():
+        app.sidebar.slider[0].set_value(ages[session_id])
+        timed_run(app, timings, 'slider')
+    for app in apps.values():
+        app.button[0].click()
+        timed_run(app, timings, 'analyse')
+    for session_id, app in apps.items():
+        # Rerun sur l'onglet recommandations: l'analyse doit survivre dans la session
+        app.sidebar.slider[0].set_value(ages[session_id] + 1)
+        loan_amount = next(widget for widget in app.sidebar.number_input if widget.label.startswith("💸"))
+        loan_amount.set_value(loan_amount.value * 2)
+        app.session_state['active_tab'] = "🔍 Recommandations"
+        timed_run(app, timings, 'rerun_apres_analyse')
+
+    state_sizes = []
+    for session_id, app in apps.items():
+        analysis = app.session_state[SESSION_KEY]
+        assert analysis.inputs['person_age'] == ages[session_id], "analyse d'une autre session"
+        assert any('Conseils pour votre profil' in h.value for h in app.subheader)
+        inputs = analysis.inputs
+        if inputs['loan_percent_income'] > OPTIMAL_DEBT_RATIO:
+            expected = f"{inputs['loan_amnt'] - inputs['person_income'] * OPTIMAL_DEBT_RATIO:,.0f} €"
+            assert any(expected in element.value for element in app.warning), "montant hors dossier analysé"
+        else:
+            expected = f"{inputs['person_income'] * MAX_SAFE_DEBT_RATIO - inputs['loan_amnt']:,.0f} €"
+            assert any(expected in element.value for element in app.info), "montant hors dossier analysé"
+        assert not app.exception
+        state_sizes.append(len(pickle.dumps(analysis)))
+
+    return timings, state_sizes, (rss_mb() - rss_before) / len(session_ids)
+
+
+def main(n_sessions=8, n_processes=4):
+    n_processes = min(n_processes, n_sessions)
+    groups = [list(range(n_sessions))[worker::n_processes] for worker in range(n_processes)]
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(n_processes) as pool:
+        outcomes = pool.map(run_worker, groups)
+    elapsed = time.perf_counter() - start
+
+    print(f"{n_sessions} sessions sur {n_processes} processus en {elapsed:.1f} s")
+    for step in STEPS:
+        values = np.concatenate([timings[step] for timings, _, _ in outcomes]) * 1000
+        print(f"  {step:<22} p50 {np.percentile(values, 50):7.0f} ms   p95 {np.percentile(values, 95):7.0f} ms")
+    state_sizes = np.concatenate([sizes for _, sizes, _ in outcomes])
+    print(f"État d'analyse par session: {state_sizes.mean():.0f} octets (sérialisé)")
+    print(f"RSS: +{np.mean([rss for _, _, rss in outcomes]):.1f} Mo par session "
+          f"(arbre d'éléments AppTest inclus)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4)
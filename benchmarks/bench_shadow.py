@@ -0,0 +1,126 @@
+"""Latence du champion avec et sans score fantôme des challengers
+
+Rejoue des demandes unitaires sur le chemin du champion (encodage, modèle,
+calibration) puis dépose la matrice encodée et le score brut au
+ShadowScorer. Compare les latences p50/p99 du champion sans challenger et
+avec challengers, par blocs alternés pour neutraliser la dérive de la
+machine: deux challengers réels, puis une surcharge (challenger lent, file
+minuscule: demandes abandonnées).
+
+Usage: python benchmarks/bench_shadow.py [demandes]
+"""
+import os
+import sys
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+from preprocessing import NUMERIC_FEATURES, TARGET, load_dataset, fit_scaler, encode_features, to_model_frame
+from calibration import load_or_fit_calibrator, predict_default_proba
+from scoring import model_version
+from shadow import ShadowScorer
+
+
+class SlowModel:
+    """Challenger volontairement lent (10 ms par appel)"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict_proba(self, features):
+        time.sleep(0.01)
+        return self.model.predict_proba(features)
+
+
+def train_challengers(data, scaler, fill_values):
+    # Même découpage que le modèle d'origine: les challengers ne voient pas l'échantillon réservé
+    train, _ = train_test_split(data, test_size=0.2, random_state=42)
+    features = to_model_frame(encode_features(train, scaler, fill_values))
+    labels = train[TARGET]
+    return {
+        'arbre_profondeur_8': DecisionTreeClassifier(max_depth=8, random_state=0).fit(features, labels),
+        'foret_50': RandomForestClassifier(n_estimators=50, max_depth=12, random_state=0).fit(features, labels),
+    }
+
+
+def replay(records, model, scaler, calibrator, shadow=None):
+    latencies = np.empty(len(records))
+    for i, record in enumerate(records):
+        start = time.perf_counter()
+        features = to_model_frame(encode_features(pd.DataFrame([record]), scaler))
+        raw_score = predict_default_proba(model, features)
+        calibrator.apply(raw_score)
+        if shadow is not None:
+            shadow.submit(features, raw_score)
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def report(name, latencies, shadow=None):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    line = f"{name}: p50 {p50:.3f} ms, p99 {p99:.3f} ms"
+    if shadow is not None:
+        snapshot = shadow.snapshot()
+        line += (f" - soumis {snapshot['soumis']}, abandonnés {snapshot['abandonnés']}, "
+                 f"traités {snapshot['traités']}")
+    print(line)
+    return p50
+
+
+def compare(name, records, model, scaler, calibrator, shadow, rounds=4):
+    """Blocs alternés sans / avec score fantôme; retourne le surcoût p50 (ms)"""
+    block = len(records) // rounds
+    plain, shadowed = [], []
+    for r in range(rounds):
+        chunk = records[r * block:(r + 1) * block]
+        plain.append(replay(chunk, model, scaler, calibrator))
+        shadowed.append(replay(chunk, model, scaler, calibrator, shadow))
+    print(name)
+    baseline = report("  champion seul", np.concatenate(plain))
+    return report("  champion + score fantôme", np.concatenate(shadowed), shadow) - baseline
+
+
+def main(n_requests=4000):
+    data = load_dataset()
+    model = joblib.load('tree_model.pkl')
+    scaler = fit_scaler(data)
+    fill_values = data[NUMERIC_FEATURES].median()
+    calibrator = load_or_fit_calibrator(model, data, scaler, model_version())
+    records = data.drop(columns=[TARGET]).sample(n_requests, replace=True, random_state=0).to_dict('records')
+    challengers = train_challengers(data, scaler, fill_values)
+    replay(records[:200], model, scaler, calibrator)
+
+    shadow = ShadowScorer(challengers, calibrator=calibrator)
+    overhead = compare("Deux challengers (processus séparé, lots de 50 ms)",
+                       records, model, scaler, calibrator, shadow)
+    shadow.wait()
+    snapshot = shadow.snapshot()
+    shadow.close()
+    assert snapshot['traités'] == snapshot['soumis'] - snapshot['abandonnés']
+    for name, summary in snapshot['challengers'].items():
+        print(f"  {name}: accord {summary['accord']:.1%}, {summary['basculements de bande']} basculements, "
+              f"écart moyen {summary['écart moyen']:+.3f} (écart type {summary['écart type']:.3f}, "
+              f"échelle {snapshot['échelle']})")
+
+    # Surcharge: challenger lent, lots unitaires et file de 8 demandes
+    slow = {'lent': SlowModel(challengers['arbre_profondeur_8'])}
+    shadow = ShadowScorer(slow, calibrator=calibrator, max_queue=8, max_batch=1, linger=0)
+    overloaded = compare("Challenger lent (surcharge)", records, model, scaler, calibrator, shadow)
+    assert shadow.snapshot()['abandonnés'] > 0
+    shadow.close()
+
+    print(f"Surcoût p50 du champion: {overhead * 1000:+.0f} µs avec challengers, "
+          f"{overloaded * 1000:+.0f} µs en surcharge")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4000)
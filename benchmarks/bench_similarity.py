@@ -0,0 +1,56 @@
+"""Benchmark de l'index des profils similaires (latence, rappel, insertions)
+
+Usage: python benchmarks/bench_similarity.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import NUMERIC_FEATURES, TARGET, load_dataset, fit_scaler, encode_features
+from similarity_index import SimilarityIndex
+
+
+def main(k=25, n_queries=500):
+    data = load_dataset()
+    scaler = fit_scaler(data)
+    features = encode_features(data, scaler, fill_values=data[NUMERIC_FEATURES].median())
+    labels = data[TARGET].to_numpy()
+
+    start = time.perf_counter()
+    index = SimilarityIndex.build(features, labels, scaler)
+    print(f"Construction: {time.perf_counter() - start:.2f} s ({len(index)} dossiers, "
+          f"{len(index.centroids)} listes)")
+
+    rng = np.random.default_rng(1)
+    queries = features[rng.choice(len(features), n_queries, replace=False)].astype(np.float32)
+    vectors = features.astype(np.float32)
+
+    latencies, recalls = [], []
+    for x in queries:
+        start = time.perf_counter()
+        found, _, _ = index.query(x, k=k)
+        latencies.append(time.perf_counter() - start)
+        exact = np.argpartition(((vectors - x) ** 2).sum(axis=1), k - 1)[:k]
+        recalls.append(len(np.intersect1d(found, exact)) / k)
+
+    latencies = np.array(latencies) * 1000
+    print(f"Requête k={k}: p50 {np.percentile(latencies, 50):.2f} ms, "
+          f"p99 {np.percentile(latencies, 99):.2f} ms, rappel@{k} {np.mean(recalls):.3f}")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        index.add(queries[i % n_queries], labels[i])
+    print(f"Insertion unitaire: {(time.perf_counter() - start):.3f} ms/ligne (moyenne sur 1000)")
+
+    start = time.perf_counter()
+    index.query(queries[0], k=k)
+    print(f"Première requête après insertions (reconstruction des listes): "
+          f"{(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
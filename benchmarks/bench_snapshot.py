@@ -0,0 +1,138 @@
+"""Chargement du jeu de données: instantané projeté en mémoire contre read_csv
+
+Pour le jeu d'origine (x1) et une réplique (x100 par défaut), mesure dans
+un processus neuf le temps de chargement et la mémoire résidente (pic et
+après chargement) de:
+- read_csv (relecture texte du CSV);
+- l'instantané complet (to_frame, sans copie);
+- l'instantané en accès paresseux (deux colonnes lues);
+- l'instantané après lecture de toutes les colonnes numériques.
+Vérifie que l'instantané redonne exactement le DataFrame de read_csv et
+qu'il est reconstruit quand le contenu du CSV change. Le cache de pages est
+chaud (fichiers venant d'être écrits); les pages projetées comptées dans le
+résident sont partagées avec le cache, pas des copies privées.
+
+Usage: python benchmarks/bench_snapshot.py [réplication]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing import DATASET_PATH, NUMERIC_FEATURES
+from snapshot import DatasetSnapshot, build_snapshot, load_snapshot
+
+MODES = {
+    'read_csv': "read_csv",
+    'snapshot': "instantané (to_frame)",
+    'lazy': "instantané (2 colonnes)",
+    'touched': "instantané (colonnes numériques lues)",
+}
+
+
+def _memory_mb():
+    """Résident courant et pic (VmRSS, VmHWM) du processus, en Mo
+
+    ru_maxrss n'est pas utilisable ici: il hérite du pic du processus parent.
+    """
+    with open('/proc/self/status') as status:
+        fields = dict(line.split(':', 1) for line in status)
+    return tuple(int(fields[name].split()[0]) / 1024 for name in ('VmRSS', 'VmHWM'))
+
+
+def measure(mode, csv_path, snapshot):
+    """Exécuté dans un processus neuf: temps, pic et résident au-delà de la base"""
+    resident_before, peak_before = _memory_mb()
+    start = time.perf_counter()
+    if mode == 'read_csv':
+        frame = pd.read_csv(csv_path, sep=';')
+        total = frame['loan_amnt'].sum() + frame['loan_status'].sum()
+    elif mode == 'snapshot':
+        frame = load_snapshot(csv_path, snapshot).to_frame()
+        total = len(frame)
+    elif mode == 'lazy':
+        data = load_snapshot(csv_path, snapshot)
+        total = data['loan_amnt'].sum() + data['loan_status'].sum()
+    else:
+        frame = load_snapshot(csv_path, snapshot).to_frame()
+        total = sum(frame[name].sum() for name in NUMERIC_FEATURES)
+    elapsed = time.perf_counter() - start
+    resident, peak = _memory_mb()
+    print(json.dumps({
+        'time': elapsed,
+        'peak': peak - max(peak_before, resident_before),
+        'resident': resident - resident_before,
+        'total': float(total),
+    }))
+
+
+def run_child(mode, csv_path, snapshot):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--mesure', mode, csv_path, snapshot],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def replicate(source, target, copies):
+    with open(source, 'rb') as csv_file:
+        header = csv_file.readline()
+        body = csv_file.read()
+    if not body.endswith(b'\n'):
+        body += b'\n'
+    with open(target, 'wb') as replica:
+        replica.write(header)
+        for _ in range(copies):
+            replica.write(body)
+
+
+def main(copies=100):
+    directory = tempfile.mkdtemp(prefix='snapshot-bench-')
+    try:
+        for scale in (1, copies):
+            csv_path = os.path.join(directory, f"dataset-x{scale}.csv")
+            snapshot = os.path.join(directory, f"dataset-x{scale}.snap")
+            replicate(DATASET_PATH, csv_path, scale)
+
+            start = time.perf_counter()
+            build_snapshot(csv_path, snapshot)
+            build_time = time.perf_counter() - start
+            print(f"x{scale}: CSV {os.path.getsize(csv_path) / 2**20:.1f} Mo, instantané "
+                  f"{os.path.getsize(snapshot) / 2**20:.1f} Mo construit en {build_time:.2f} s (une fois)")
+            print(f"  {'mode':<38} | {'temps':>9} | {'pic RSS':>9} | {'résident':>9}")
+            for mode, label in MODES.items():
+                result = run_child(mode, csv_path, snapshot)
+                print(f"  {label:<38} | {result['time'] * 1000:>6.0f} ms | {result['peak']:>6.0f} Mo | "
+                      f"{result['resident']:>6.0f} Mo")
+
+            if scale == 1:
+                reference = pd.read_csv(csv_path, sep=';')
+                frame = DatasetSnapshot(snapshot).to_frame()
+                decoded = frame.astype({name: 'str' for name in frame.select_dtypes('category').columns})
+                pd.testing.assert_frame_equal(decoded, reference)
+                print("  Instantané identique à read_csv (colonnes texte décodées)")
+
+                # Nouveau contenu: l'instantané doit être reconstruit
+                digest = DatasetSnapshot(snapshot).source['sha256']
+                with open(csv_path, 'a', encoding='utf-8') as csv_file:
+                    csv_file.write("30;45000;RENT;3.0;EDUCATION;B;5000;11.5;0;0.11;N;4\n")
+                refreshed = load_snapshot(csv_path, snapshot)
+                assert len(refreshed) == len(reference) + 1
+                assert refreshed.source['sha256'] != digest
+                assert np.array_equal(refreshed['loan_amnt'].to_numpy()[:-1], reference['loan_amnt'].to_numpy())
+                print("  Reconstruction automatique après modification du CSV vérifiée")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--mesure':
+        measure(*sys.argv[2:5])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,75 @@
+"""Stress tests incrémentaux contre rescoring complet du portefeuille
+
+Pour chaque scénario de la grille (revenu, taux, montant), compare le
+rescoring complet (choc, encodage, predict_proba, calibration) au moteur
+incrémental qui ne rescore que les dossiers sortis de leurs intervalles de
+chemin. Vérifie l'égalité exacte des scores et affiche le gain.
+
+Usage: python benchmarks/bench_stress.py [multiplicateur_portefeuille]
+"""
+import os
+import sys
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings('ignore')
+
+from preprocessing import NUMERIC_FEATURES, load_dataset, fit_scaler, encode_features, to_model_frame
+from calibration import load_or_fit_calibrator, predict_default_proba
+from scoring import model_version, RISK_BAND_LABELS
+from stress import StressEngine, apply_scenario, scenario_grid
+
+
+def main(copies=4):
+    data = load_dataset()
+    model = joblib.load('tree_model.pkl')
+    scaler = fit_scaler(data)
+    fill_values = data[NUMERIC_FEATURES].median()
+    calibrator = load_or_fit_calibrator(model, data, scaler, model_version())
+    portfolio = pd.concat([data] * copies, ignore_index=True)
+    scenarios = scenario_grid()
+
+    start = time.perf_counter()
+    engine = StressEngine(model, portfolio, scaler, fill_values, calibrator)
+    build_time = time.perf_counter() - start
+    print(f"Portefeuille de {len(portfolio):,} dossiers, {len(scenarios)} scénarios; "
+          f"indexation des chemins {build_time * 1000:.0f} ms")
+
+    full_time = 0.0
+    incremental_time = 0.0
+    rescored = 0
+    results = []
+    for scenario in scenarios:
+        start = time.perf_counter()
+        shocked = apply_scenario(portfolio, scenario)
+        expected = calibrator.apply(predict_default_proba(
+            model, to_model_frame(encode_features(shocked, scaler, fill_values))))
+        full_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = engine.run(scenario)
+        incremental_time += time.perf_counter() - start
+
+        assert np.array_equal(result.scores, expected), f"écart sur le scénario {scenario.name}"
+        rescored += result.rescored
+        results.append(result)
+
+    print(f"Rescoring complet: {full_time:.2f} s ({full_time / len(scenarios) * 1000:.0f} ms/scénario)")
+    print(f"Incrémental: {incremental_time:.2f} s ({incremental_time / len(scenarios) * 1000:.0f} ms/scénario), "
+          f"{rescored / (len(portfolio) * len(scenarios)):.1%} des dossiers rescorés, "
+          f"scores identiques, x{full_time / incremental_time:.1f} "
+          f"(x{full_time / (incremental_time + build_time):.1f} indexation comprise)")
+
+    worst = max(results, key=lambda result: result.mean_delta)
+    print(f"Scénario le plus sévère: {worst.scenario}, score moyen {worst.mean_score:.1%} "
+          f"({worst.mean_delta * 100:+.1f} pts), migration des bandes:")
+    print(pd.DataFrame(worst.migration, index=RISK_BAND_LABELS, columns=RISK_BAND_LABELS).to_string())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
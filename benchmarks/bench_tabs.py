@@ -0,0 +1,85 @@
+"""Latence de rerun par changement de curseur, selon l'onglet ouvert
+
+Compare l'application courante à une révision git de référence (par défaut
+aucune): pour chaque onglet ouvert et chaque curseur de la barre latérale,
+mesure la médiane du temps de rerun via AppTest.
+
+Usage: python benchmarks/bench_tabs.py [révision_de_référence]
+"""
+import os
+import sys
+import time
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+SLIDERS = {0: (30, 31), 1: (5.0, 5.5), 2: (12.0, 12.5), 3: (5, 20), 4: (5, 6)}
+
+
+def app_tabs(app_path):
+    """Libellés des onglets de l'application, dans l'ordre d'affichage"""
+    return [tab.label for tab in AppTest.from_file(app_path, default_timeout=120).run().tabs]
+
+
+def slider_latencies(app_path, tab=None, analyse=True, repeat=5):
+    app = AppTest.from_file(app_path, default_timeout=120)
+    if tab is not None:
+        app.session_state["active_tab"] = tab
+    app.run()
+    if analyse:
+        app.button[0].click().run()
+
+    results = {}
+    for index, values in SLIDERS.items():
+        timings = []
+        for attempt in range(repeat):
+            app.sidebar.slider[index].set_value(values[attempt % 2])
+            start = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - start)
+        label = app.sidebar.slider[index].label.split(' ', 1)[1]
+        results[label] = np.median(timings) * 1000
+    return results
+
+
+def print_row(name, results):
+    print(f"  {name:<34}" + "".join(f"{value:>9.0f}" for value in results.values()))
+
+
+def main(reference=None):
+    app_path = os.path.join(ROOT, 'apps_premium.py')
+    header = None
+
+    if reference is not None:
+        before_path = os.path.join(ROOT, '.bench_app_reference.py')
+        source = subprocess.run(['git', 'show', f'{reference}:apps_premium.py'],
+                                check=True, capture_output=True).stdout
+        with open(before_path, 'wb') as before_file:
+            before_file.write(source)
+        try:
+            results = slider_latencies(before_path)
+        finally:
+            os.remove(before_path)
+        header = list(results)
+        print("Latence médiane de rerun (ms) par curseur modifié")
+        print(f"  {'':<34}" + "".join(f"{label[:8]:>9}" for label in header))
+        print_row(f"avant ({reference}, tous onglets)", results)
+
+    tabs = app_tabs(app_path)
+    for tab in tabs:
+        # L'analyse n'est lancée que sur le premier onglet, où se trouve son bouton
+        results = slider_latencies(app_path, tab, analyse=tab == tabs[0])
+        if header is None:
+            header = list(results)
+            print("Latence médiane de rerun (ms) par curseur modifié")
+            print(f"  {'':<34}" + "".join(f"{label[:8]:>9}" for label in header))
+        print_row(f"après, onglet {tab.split(' ', 1)[1]}", results)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,182 @@
+import os
+import weakref
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+from preprocessing import NUMERIC_FEATURES, TARGET, encode_features, to_model_frame
+from atomic_file import save_npz
+
+# Une calibration par version de modèle: l'application et batch_score.py
+# peuvent servir des versions différentes sans écraser la calibration de l'autre
+CALIBRATION_PATTERN = os.path.join('artifacts', 'calibration-{}.npz')
+
+# Découpage d'origine du modèle (80/20, random_state=42): les 20% restants
+# n'ont jamais été vus à l'entraînement et servent à la calibration
+HOLDOUT_SIZE = 0.2
+HOLDOUT_RANDOM_STATE = 42
+
+# Poids (en dossiers d'entraînement) du taux du parent dans le lissage des nœuds
+NODE_PRIOR_STRENGTH = 20
+# Nature des scores bruts calibrés: une calibration persistée d'une autre
+# nature (probabilités 0/1 des feuilles pures) est réajustée
+RAW_SCORE_KIND = f'node-rate-{NODE_PRIOR_STRENGTH}'
+
+_NODE_RATES = weakref.WeakKeyDictionary()
+
+
+def calibration_path(model_version):
+    return CALIBRATION_PATTERN.format(model_version or 'default')
+
+
+def node_default_rates(tree, prior_strength=NODE_PRIOR_STRENGTH):
+    """Taux de défaut d'entraînement de chaque nœud, lissé vers celui de son parent
+
+    L'arbre livré n'est pas élagué: ses feuilles sont pures et predict_proba
+    ne renvoie que 0 ou 1, ce qui ne laisse que deux niveaux à calibrer. Le
+    taux de chaque nœud est rétréci vers celui de son parent (déjà lissé),
+    avec un poids de `prior_strength` dossiers: une feuille de deux dossiers
+    hérite surtout du taux de ses ancêtres, une feuille peuplée garde le sien.
+
+    Les arbres picklés avec scikit-learn < 1.4 stockent des effectifs dans
+    leurs nœuds au lieu de proportions: les valeurs sont normalisées.
+    """
+    values = tree.value[:, 0, :]
+    rates = values[:, 1] / values.sum(axis=1)
+    weights = tree.weighted_n_node_samples
+    # scikit-learn numérote les nœuds en préordre: un parent précède ses enfants
+    for node, (left, right) in enumerate(zip(tree.children_left.tolist(), tree.children_right.tolist())):
+        for child in (left, right):
+            if child != -1:
+                rates[child] = ((rates[child] * weights[child] + prior_strength * rates[node])
+                                / (weights[child] + prior_strength))
+    return rates
+
+
+def predict_default_proba(model, features):
+    """Probabilité de défaut brute du modèle
+
+    Pour un arbre de décision, taux lissé de la feuille atteinte
+    (node_default_rates, calculé une fois par modèle); sinon predict_proba,
+    normalisé par ligne.
+    """
+    if hasattr(model, 'tree_'):
+        rates = _NODE_RATES.get(model)
+        if rates is None:
+            rates = _NODE_RATES[model] = node_default_rates(model.tree_)
+        return rates[model.apply(features)]
+    proba = model.predict_proba(features)
+    return proba[:, 1] / proba.sum(axis=1)
+
+
+class ScoreCalibrator:
+    """Calibration des scores sous forme de fonction linéaire par morceaux
+
+    La table (x, y) est appliquée par np.interp: coût négligeable par ligne et
+    identique pour un dossier unitaire ou un portefeuille. `raw_score` indique
+    la nature des scores bruts attendus (RAW_SCORE_KIND).
+    """
+
+    def __init__(self, x, y, method, model_version='', raw_score=RAW_SCORE_KIND):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.method = str(method)
+        self.model_version = str(model_version)
+        self.raw_score = str(raw_score)
+
+    @classmethod
+    def fit(cls, scores, labels, method='isotonic', model_version=''):
+        """Ajustement isotonique ou de Platt, converti en table par morceaux"""
+        scores = np.asarray(scores, dtype=np.float64)
+        labels = np.asarray(labels)
+        if method == 'isotonic':
+            regression = IsotonicRegression(y_min=0, y_max=1, out_of_bounds='clip')
+            regression.fit(scores, labels)
+            x, y = regression.X_thresholds_, regression.y_thresholds_
+        elif method == 'platt':
+            regression = LogisticRegression()
+            regression.fit(scores.reshape(-1, 1), labels)
+            x = np.linspace(0, 1, 257)
+            y = regression.predict_proba(x.reshape(-1, 1))[:, 1]
+        else:
+            raise ValueError(f"Méthode de calibration inconnue: {method}")
+        return cls(x, y, method, model_version)
+
+    def apply(self, scores):
+        """Scores calibrés (vectorisé)"""
+        return np.interp(scores, self.x, self.y)
+
+    def save(self, path=None):
+        save_npz(path or calibration_path(self.model_version), x=self.x, y=self.y, method=self.method,
+                 model_version=self.model_version, raw_score=self.raw_score)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            raw_score = archive['raw_score'].item() if 'raw_score' in archive.files else 'predict_proba'
+            return cls(archive['x'], archive['y'], archive['method'].item(),
+                       archive['model_version'].item(), raw_score)
+
+
+def expected_calibration_error(scores, labels, n_bins=10):
+    """Erreur de calibration attendue (ECE) sur des classes de score équidistantes"""
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    bins = np.minimum((scores * n_bins).astype(int), n_bins - 1)
+    counts = np.bincount(bins, minlength=n_bins)
+    score_sums = np.bincount(bins, weights=scores, minlength=n_bins)
+    label_sums = np.bincount(bins, weights=labels, minlength=n_bins)
+    filled = counts > 0
+    return float(np.abs(score_sums[filled] - label_sums[filled]).sum() / len(scores))
+
+
+def brier_score(scores, labels):
+    return float(np.mean((np.asarray(scores, dtype=np.float64) - np.asarray(labels)) ** 2))
+
+
+def holdout_split(data):
+    """Moitiés calibration / évaluation de l'échantillon non vu par le modèle"""
+    _, holdout = train_test_split(data, test_size=HOLDOUT_SIZE, random_state=HOLDOUT_RANDOM_STATE)
+    return train_test_split(holdout, test_size=0.5, random_state=HOLDOUT_RANDOM_STATE,
+                            stratify=holdout[TARGET])
+
+
+def fit_calibration(model, data, scaler, method='isotonic', model_version=''):
+    """Calibration sur l'échantillon réservé, avec métriques avant/après
+
+    Retourne (calibrateur, métriques) où les métriques sont mesurées sur la
+    moitié d'évaluation, distincte de celle utilisée pour l'ajustement.
+    """
+    fill_values = data[NUMERIC_FEATURES].median()
+    calibration_set, evaluation_set = holdout_split(data)
+
+    def raw_scores(frame):
+        return predict_default_proba(model, to_model_frame(encode_features(frame, scaler, fill_values)))
+
+    calibrator = ScoreCalibrator.fit(raw_scores(calibration_set), calibration_set[TARGET],
+                                     method=method, model_version=model_version)
+
+    raw = raw_scores(evaluation_set)
+    calibrated = calibrator.apply(raw)
+    labels = evaluation_set[TARGET].to_numpy()
+    metrics = {
+        'ece_raw': expected_calibration_error(raw, labels),
+        'ece_calibrated': expected_calibration_error(calibrated, labels),
+        'brier_raw': brier_score(raw, labels),
+        'brier_calibrated': brier_score(calibrated, labels),
+        'n_evaluation': len(labels),
+    }
+    return calibrator, metrics
+
+
+def load_or_fit_calibrator(model, data, scaler, model_version='', path=None):
+    """Charge la calibration persistée de cette version, ou l'ajuste si absente ou d'une autre nature de scores"""
+    path = path or calibration_path(model_version)
+    if os.path.exists(path):
+        calibrator = ScoreCalibrator.load(path)
+        if calibrator.model_version == model_version and calibrator.raw_score == RAW_SCORE_KIND:
+            return calibrator
+    calibrator, _ = fit_calibration(model, data, scaler, model_version=model_version)
+    calibrator.save(path)
+    return calibrator
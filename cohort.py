@@ -0,0 +1,276 @@
+import io
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+from preprocessing import CATEGORICAL_FEATURES, TARGET, DATASET_PATH
+from atomic_file import save_npz
+from refresh import DELTA_DIR, delta_paths
+
+CUBE_PATH = os.path.join('artifacts', 'cohort_cube.npz')
+
+# Tranches d'âge et de revenu: bornes inférieures des tranches suivant la première
+AGE_EDGES = [25, 35, 45, 55, 65]
+AGE_LABELS = ['18-24', '25-34', '35-44', '45-54', '55-64', '65+']
+INCOME_EDGES = [20000, 30000, 40000, 60000, 100000]
+INCOME_LABELS = ['<20k', '20-30k', '30-40k', '40-60k', '60-100k', '100k+']
+
+# Dimensions du cube, dans l'ordre des axes. La dernière modalité ('?')
+# regroupe les valeurs manquantes ou inconnues.
+DIMENSIONS = {
+    'loan_grade': CATEGORICAL_FEATURES['loan_grade'] + ['?'],
+    'loan_intent': CATEGORICAL_FEATURES['loan_intent'] + ['?'],
+    'person_home_ownership': CATEGORICAL_FEATURES['person_home_ownership'] + ['?'],
+    'age_band': AGE_LABELS + ['?'],
+    'income_band': INCOME_LABELS + ['?'],
+}
+CUBE_SHAPE = tuple(len(labels) for labels in DIMENSIONS.values())
+
+# Histogrammes par cellule pour les quantiles (fusionnables, donc
+# rafraîchissables par simple addition). Les valeurs hors bornes tombent dans
+# le premier ou le dernier intervalle; la précision est d'un intervalle.
+MEASURE_EDGES = {
+    'person_income': np.geomspace(4000, 6400000, 97),
+    'loan_amnt': np.linspace(0, 35000, 71),
+    'loan_int_rate': np.linspace(5, 25, 81),
+}
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _band_codes(values, edges):
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), len(edges) + 1, np.searchsorted(edges, values, side='right'))
+
+
+def _category_codes(values, categories):
+    codes = pd.Categorical(values, categories=categories).codes.astype(np.intp)
+    return np.where(codes < 0, len(categories), codes)
+
+
+def cell_indices(data):
+    """Indice (aplati) de la cellule du cube de chaque dossier"""
+    codes = [
+        _category_codes(data['loan_grade'], CATEGORICAL_FEATURES['loan_grade']),
+        _category_codes(data['loan_intent'], CATEGORICAL_FEATURES['loan_intent']),
+        _category_codes(data['person_home_ownership'], CATEGORICAL_FEATURES['person_home_ownership']),
+        _band_codes(data['person_age'], AGE_EDGES),
+        _band_codes(data['person_income'], INCOME_EDGES),
+    ]
+    return np.ravel_multi_index(codes, CUBE_SHAPE)
+
+
+def _histogram_quantiles(histograms, edges, quantiles):
+    """Quantiles interpolés linéairement dans l'intervalle qui les contient
+
+    `histograms` est de forme (..., n_intervalles); retourne un tableau de
+    forme (..., n_quantiles). Les groupes vides donnent NaN.
+    """
+    cumulative = np.cumsum(histograms, axis=-1, dtype=np.float64)
+    totals = cumulative[..., -1:]
+    targets = totals * np.asarray(quantiles, dtype=np.float64)
+    # Premier intervalle dont le cumul atteint la cible, pour chaque quantile
+    position = np.minimum((cumulative[..., None, :] < targets[..., None]).sum(axis=-1), histograms.shape[-1] - 1)
+    inside = np.take_along_axis(histograms, position, axis=-1).astype(np.float64)
+    below = np.take_along_axis(cumulative, position, axis=-1) - inside
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.clip(np.where(inside > 0, (targets - below) / inside, 0.0), 0.0, 1.0)
+    values = edges[position] + fraction * (edges[position + 1] - edges[position])
+    return np.where(totals > 0, values, np.nan)
+
+
+class CohortCube:
+    """Agrégats précalculés par grade × motif × logement × tranche d'âge × tranche de revenu
+
+    Chaque cellule stocke le nombre de dossiers, le nombre de défauts et un
+    histogramme par mesure (revenu, montant, taux). Toutes ces grandeurs
+    s'additionnent: de nouveaux dossiers sont intégrés en ajoutant leur
+    propre cube, et une requête somme les cellules sélectionnées.
+    """
+
+    def __init__(self, counts, defaults, histograms, source=None, deltas=()):
+        self.counts = counts
+        self.defaults = defaults
+        self.histograms = histograms
+        self.source = source or {}
+        self.deltas = list(deltas)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(CUBE_SHAPE, dtype=np.int64), np.zeros(CUBE_SHAPE, dtype=np.int64),
+                   {name: np.zeros(CUBE_SHAPE + (len(edges) - 1,), dtype=np.uint32)
+                    for name, edges in MEASURE_EDGES.items()})
+
+    @classmethod
+    def from_frame(cls, data):
+        cube = cls.empty()
+        cube.add(data)
+        return cube
+
+    @property
+    def n_rows(self):
+        return int(self.counts.sum())
+
+    def add(self, data):
+        """Intègre des dossiers en une passe vectorisée (bincount par cellule)"""
+        cells = cell_indices(data)
+        n_cells = self.counts.size
+        self.counts += np.bincount(cells, minlength=n_cells).reshape(CUBE_SHAPE)
+        status = data[TARGET].to_numpy(dtype=np.float64)
+        known = ~np.isnan(status)
+        self.defaults += np.bincount(cells[known], weights=status[known],
+                                     minlength=n_cells).astype(np.int64).reshape(CUBE_SHAPE)
+        for name, edges in MEASURE_EDGES.items():
+            values = data[name].to_numpy(dtype=np.float64)
+            known = ~np.isnan(values)
+            n_bins = len(edges) - 1
+            bins = np.clip(np.searchsorted(edges, values[known], side='right') - 1, 0, n_bins - 1)
+            counts = np.bincount(cells[known] * n_bins + bins, minlength=n_cells * n_bins)
+            self.histograms[name] += counts.astype(np.uint32).reshape(self.histograms[name].shape)
+
+    def query(self, by=(), where=None, quantiles=QUANTILES):
+        """Agrégats groupés selon les dimensions `by`, filtrés par `where`
+
+        `where` associe à une dimension la liste des modalités retenues, par
+        exemple {'person_home_ownership': ['RENT']}. Retourne un DataFrame
+        indexé par les modalités de `by` (une ligne « Total » sans `by`).
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        names = list(DIMENSIONS)
+        unknown = [name for name in list(by) + list(where or {}) if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Dimensions inconnues: {unknown}")
+
+        selection = [slice(None)] * len(names)
+        for name, values in (where or {}).items():
+            values = [values] if isinstance(values, str) else values
+            selection[names.index(name)] = [DIMENSIONS[name].index(value) for value in values]
+        # Filtre axe par axe (une indexation par liste à la fois)
+        def select(array):
+            for axis, index in enumerate(selection):
+                if not isinstance(index, slice):
+                    array = np.take(array, index, axis=axis)
+            return array
+
+        reduced = tuple(axis for axis, name in enumerate(names) if name not in by)
+        order = [names.index(name) for name in by]
+        order_sorted = sorted(order)
+
+        def reduce(array):
+            # Cumul dans le type stocké: moitié moins de mémoire parcourue qu'en uint64
+            array = select(array).sum(axis=reduced, dtype=array.dtype)
+            # Remet les axes restants dans l'ordre demandé par `by`
+            return np.moveaxis(array, [order_sorted.index(axis) for axis in order], list(range(len(order))))
+
+        counts = reduce(self.counts)
+        defaults = reduce(self.defaults)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = {'dossiers': counts.ravel(), 'défauts': defaults.ravel(),
+                      'taux_défaut': np.where(counts > 0, defaults / counts, np.nan).ravel()}
+        for name, edges in MEASURE_EDGES.items():
+            values = _histogram_quantiles(reduce(self.histograms[name]), edges, quantiles)
+            for i, quantile in enumerate(quantiles):
+                result[f"{name}_p{quantile * 100:g}"] = values[..., i].ravel()
+
+        if by:
+            labels = []
+            for axis, name in zip(order, by):
+                index = selection[axis]
+                labels.append(DIMENSIONS[name] if isinstance(index, slice) else [DIMENSIONS[name][i] for i in index])
+            index = pd.MultiIndex.from_product(labels, names=by) if len(by) > 1 else pd.Index(labels[0], name=by[0])
+        else:
+            index = pd.Index(['Total'])
+        return pd.DataFrame(result, index=index)
+
+    def cohort_of(self, applicant, quantiles=QUANTILES):
+        """Agrégats de la cellule d'un dossier (dict ou DataFrame d'une ligne)"""
+        frame = applicant if isinstance(applicant, pd.DataFrame) else pd.DataFrame([applicant])
+        codes = np.unravel_index(cell_indices(frame)[0], CUBE_SHAPE)
+        where = {name: [DIMENSIONS[name][code]] for name, code in zip(DIMENSIONS, codes)}
+        return self.query(where=where, quantiles=quantiles).iloc[0]
+
+    def save(self, path=CUBE_PATH):
+        save_npz(path, counts=self.counts, defaults=self.defaults,
+                 source_size=self.source.get('size', -1), source_digest=self.source.get('digest', ''),
+                 deltas=np.array(self.deltas, dtype=str), shape=np.array(CUBE_SHAPE),
+                 **{f"hist_{name}": values for name, values in self.histograms.items()})
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        with np.load(path) as archive:
+            if tuple(archive['shape']) != CUBE_SHAPE or any(
+                    archive[f"hist_{name}"].shape[-1] != len(edges) - 1 for name, edges in MEASURE_EDGES.items()):
+                raise ValueError("cube incompatible avec les dimensions définies")
+            source = {'size': int(archive['source_size']), 'digest': str(archive['source_digest'])}
+            return cls(archive['counts'], archive['defaults'],
+                       {name: archive[f"hist_{name}"] for name in MEASURE_EDGES},
+                       source, archive['deltas'].tolist())
+
+
+def _prefix_digest(path, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        remaining = size
+        while remaining > 0:
+            block = source.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _read_appended_rows(path, offset):
+    """Lignes ajoutées au CSV après `offset` (fin de la partie déjà intégrée)"""
+    with open(path, 'rb') as source:
+        header = source.readline().decode('utf-8').strip().split(';')
+        source.seek(offset)
+        tail = source.read()
+    return pd.read_csv(io.BytesIO(tail), sep=';', header=None, names=header)
+
+
+def refresh_cube(path=CUBE_PATH, dataset_path=DATASET_PATH, delta_dir=DELTA_DIR):
+    """Charge le cube persisté et y intègre seulement les nouveaux dossiers
+
+    Les lignes ajoutées en fin de CSV (préfixe inchangé, vérifié par
+    empreinte) et les lots étiquetés de `deltas/` pas encore intégrés sont
+    ajoutés au cube. Toute autre modification du CSV entraîne une
+    reconstruction complète. Le cube n'est réécrit que s'il a changé.
+    """
+    size = os.path.getsize(dataset_path)
+    cube = None
+    if os.path.exists(path):
+        try:
+            cube = CohortCube.load(path)
+        except (ValueError, KeyError):
+            cube = None
+    changed = False
+    if cube is not None:
+        offset = cube.source['size']
+        if offset > size or _prefix_digest(dataset_path, offset) != cube.source['digest']:
+            cube = None
+        elif offset < size:
+            with open(dataset_path, 'rb') as source:
+                source.seek(offset - 1)
+                aligned = source.read(1) == b'\n'
+            if aligned:
+                cube.add(_read_appended_rows(dataset_path, offset))
+                cube.source = {'size': size, 'digest': _prefix_digest(dataset_path, size)}
+                changed = True
+            else:
+                cube = None
+    if cube is None:
+        cube = CohortCube.from_frame(pd.read_csv(dataset_path, sep=';'))
+        cube.source = {'size': size, 'digest': _prefix_digest(dataset_path, size)}
+        changed = True
+
+    applied = set(cube.deltas)
+    for delta_path in delta_paths(delta_dir):
+        name = os.path.basename(delta_path)
+        if name not in applied:
+            cube.add(pd.read_csv(delta_path, sep=';'))
+            cube.deltas.append(name)
+            changed = True
+    if changed:
+        cube.save(path)
+    return cube
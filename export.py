@@ -0,0 +1,227 @@
+import os
+import sys
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Formats numériques Excel appliqués par colonne (les valeurs restent typées)
+EURO_FORMAT = '#,##0.00 "€"'
+NUMBER_FORMATS = {
+    'Mois': '0',
+    'Date': 'mm/yyyy',
+    'Paiement Total': EURO_FORMAT,
+    'Capital': EURO_FORMAT,
+    'Intérêts': EURO_FORMAT,
+    'Solde Restant': EURO_FORMAT,
+    'Capital Cumulé': EURO_FORMAT,
+    'Intérêts Cumulés': EURO_FORMAT,
+    '% Remboursé': '0.0"%"',
+    'person_income': EURO_FORMAT,
+    'loan_amnt': EURO_FORMAT,
+    'loan_int_rate': '0.00"%"',
+    'loan_percent_income': '0.0%',
+    'risk_score': '0.0%',
+}
+
+# Limite d'Excel: 1 048 576 lignes par feuille, en-tête compris
+MAX_EXCEL_ROWS = 1048575
+
+
+def amortization_schedule_frame(principal, annual_rate, years, start_date=None):
+    """Tableau d'amortissement vectorisé (mêmes colonnes que calculate_amortization_schedule)
+
+    Les montants sont des float64 et la date une vraie date (pas de texte).
+    """
+    frame = portfolio_schedule_frame(np.array([principal], dtype=np.float64),
+                                     np.array([annual_rate], dtype=np.float64),
+                                     years, start_date)
+    return frame.drop(columns='Dossier')
+
+
+def portfolio_schedule_frame(principals, annual_rates, years, start_date=None, loan_ids=None):
+    """Échéanciers de plusieurs prêts de même durée, calculés en une passe numpy"""
+    if start_date is None:
+        start_date = datetime.now()
+    principals = np.asarray(principals, dtype=np.float64)[:, None]
+    monthly_rates = (np.asarray(annual_rates, dtype=np.float64) / 100 / 12)[:, None]
+    num_payments = int(years * 12)
+    months = np.arange(1, num_payments + 1)
+
+    positive = monthly_rates > 0
+    safe_rates = np.where(positive, monthly_rates, 1.0)
+    growth = (1 + safe_rates) ** num_payments
+    monthly_payment = np.where(positive, principals * (safe_rates * growth) / (growth - 1),
+                               principals / num_payments)
+
+    # Solde avant chaque échéance (forme fermée de la récurrence)
+    compounded = (1 + safe_rates) ** (months - 1)
+    balance_before = np.where(positive,
+                              principals * compounded - monthly_payment * (compounded - 1) / safe_rates,
+                              principals - monthly_payment * (months - 1))
+    interest = np.where(positive, balance_before * monthly_rates, 0.0)
+    capital = monthly_payment - interest
+    remaining = np.maximum(0, balance_before - capital)
+    capital_paid = np.cumsum(capital, axis=1)
+
+    n_loans = principals.shape[0]
+    if loan_ids is None:
+        loan_ids = np.arange(n_loans)
+    dates = (np.datetime64(pd.Timestamp(start_date).normalize(), 'D')
+             + np.timedelta64(30, 'D') * (months - 1))
+
+    return pd.DataFrame({
+        'Dossier': np.repeat(np.asarray(loan_ids), num_payments),
+        'Mois': np.tile(months, n_loans),
+        'Date': np.tile(dates, n_loans).astype('datetime64[ns]'),
+        'Paiement Total': np.broadcast_to(monthly_payment, capital.shape).ravel(),
+        'Capital': capital.ravel(),
+        'Intérêts': interest.ravel(),
+        'Solde Restant': remaining.ravel(),
+        'Capital Cumulé': capital_paid.ravel(),
+        'Intérêts Cumulés': np.cumsum(interest, axis=1).ravel(),
+        '% Remboursé': (capital_paid / principals * 100).ravel(),
+    })
+
+
+def iter_portfolio_schedules(loans, years, start_date=None, rows_per_chunk=500000):
+    """Échéanciers d'un portefeuille produits par blocs de taille bornée
+
+    Les prêts sans taux renseigné sont ignorés (échéancier non calculable).
+    """
+    loans = loans[loans['loan_int_rate'].notna()]
+    loans_per_chunk = max(1, rows_per_chunk // int(years * 12))
+    for start in range(0, len(loans), loans_per_chunk):
+        chunk = loans.iloc[start:start + loans_per_chunk]
+        yield portfolio_schedule_frame(chunk['loan_amnt'].to_numpy(), chunk['loan_int_rate'].to_numpy(),
+                                       years, start_date, loan_ids=chunk.index.to_numpy())
+
+
+def _as_chunks(frames):
+    return [frames] if isinstance(frames, pd.DataFrame) else frames
+
+
+def write_csv(frames, destination, sep=';'):
+    """Export CSV par blocs (séparateur du jeu de données), retourne le nombre de lignes"""
+    rows = 0
+    header = True
+    close = False
+    if isinstance(destination, (str, os.PathLike)):
+        destination = open(destination, 'w', encoding='utf-8', newline='')
+        close = True
+    try:
+        for chunk in _as_chunks(frames):
+            chunk.to_csv(destination, sep=sep, index=False, header=header, date_format='%Y-%m-%d')
+            header = False
+            rows += len(chunk)
+    finally:
+        if close:
+            destination.close()
+    return rows
+
+
+def write_parquet(frames, destination, compression='snappy'):
+    """Export Parquet par groupes de lignes (nécessite pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("L'export Parquet nécessite pyarrow (pip install pyarrow)")
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in _as_chunks(frames):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(destination, table.schema, compression=compression)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_xlsx(frames, destination, sheet_name='Export', number_formats=None):
+    """Export Excel en mode streaming (openpyxl write_only)
+
+    Chaque colonne utilise une cellule modèle portant son format numérique:
+    la cellule est réécrite immédiatement à chaque ligne, sans formatage texte
+    ni objet de style par cellule. Au-delà de la limite d'Excel, les lignes
+    continuent sur une nouvelle feuille.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    formats = NUMBER_FORMATS if number_formats is None else number_formats
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = 0
+    rows = 0
+
+    def new_sheet(columns):
+        index = len(workbook.worksheets) + 1
+        sheet = workbook.create_sheet(sheet_name if index == 1 else f"{sheet_name} ({index})")
+        sheet.append(list(columns))
+        templates = []
+        for column in columns:
+            cell = WriteOnlyCell(sheet)
+            if column in formats:
+                cell.number_format = formats[column]
+            templates.append(cell)
+        return sheet, templates
+
+    for chunk in _as_chunks(frames):
+        columns = [chunk[column].astype(object).where(chunk[column].notna(), None).tolist()
+                   for column in chunk.columns]
+        for values in zip(*columns):
+            if sheet is None or sheet_rows >= MAX_EXCEL_ROWS:
+                sheet, templates = new_sheet(chunk.columns)
+                sheet_rows = 0
+            for cell, value in zip(templates, values):
+                cell.value = value
+            sheet.append(templates)
+            sheet_rows += 1
+        rows += len(chunk)
+
+    if sheet is None:
+        workbook.create_sheet(sheet_name)
+    workbook.save(destination)
+    return rows
+
+
+EXPORT_WRITERS = {
+    '.csv': write_csv,
+    '.parquet': write_parquet,
+    '.xlsx': write_xlsx,
+}
+
+
+def export_frames(frames, path):
+    """Export selon l'extension du fichier (.xlsx, .csv, .parquet)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_WRITERS:
+        raise ValueError(f"Format d'export non supporté: {extension}")
+    return EXPORT_WRITERS[extension](frames, path)
+
+
+def main(argv=None):
+    """Échéanciers d'un fichier de dossiers: python export.py dossiers.csv echeanciers.parquet [--years 5]"""
+    parser = argparse.ArgumentParser(description="Export des échéanciers de tous les prêts d'un fichier")
+    parser.add_argument('input', help="fichier CSV au schéma du jeu de données (séparateur ';')")
+    parser.add_argument('output', help="fichier de sortie (.parquet, .csv ou .xlsx)")
+    parser.add_argument('--years', type=float, default=5, help="durée des prêts en années (défaut: 5)")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="dossiers lus par bloc (défaut: 100000)")
+    args = parser.parse_args(argv)
+
+    # Lecture par blocs: l'index continu du lecteur sert d'identifiant de dossier
+    reader = pd.read_csv(args.input, sep=';', usecols=['loan_amnt', 'loan_int_rate'], chunksize=args.chunk_size)
+    frames = (frame for loans in reader for frame in iter_portfolio_schedules(loans, args.years))
+    rows = export_frames(frames, args.output)
+    print(f"{rows:,} échéances écrites dans {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
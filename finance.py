@@ -0,0 +1,52 @@
+import numpy as np
+
+from apr import solve_apr, monthly_payments
+
+# Rendement alternatif retenu pour le coût d'opportunité
+OPPORTUNITY_COST_RATE = 0.03
+
+
+def calculate_financial_indicators(principal, annual_rate, years, monthly_income, fees=0.0, insurance_rate=0.0):
+    """Calcul d'indicateurs financiers avancés (TAEG avec frais et assurance)
+
+    Accepte un dossier (scalaires, résultats float) ou un portefeuille
+    (tableaux de même forme, résultats numpy). Un taux manquant donne des
+    indicateurs manquants.
+    """
+    scalar = all(np.ndim(value) == 0
+                 for value in (principal, annual_rate, years, monthly_income, fees, insurance_rate))
+    principal = np.asarray(principal, dtype=np.float64)
+    annual_rate = np.asarray(annual_rate, dtype=np.float64)
+    monthly_income = np.asarray(monthly_income, dtype=np.float64)
+    num_payments = np.asarray(years, dtype=np.float64) * 12
+
+    monthly_payment = np.where(np.isnan(annual_rate), np.nan,
+                               monthly_payments(principal, annual_rate, num_payments))
+    total_payment = monthly_payment * num_payments
+    total_interest = total_payment - principal
+
+    # Ratios financiers
+    with np.errstate(divide='ignore', invalid='ignore'):
+        debt_to_income_ratio = np.where(monthly_income > 0, monthly_payment / monthly_income * 100, 0.0)
+        interest_rate_effectiveness = total_interest / principal * 100
+
+    # Coût d'opportunité (estimation)
+    opportunity_cost = principal * ((1 + OPPORTUNITY_COST_RATE) ** (num_payments / 12) - 1)
+
+    # Taux annuel effectif global: frais de dossier et assurance inclus
+    apr_result = solve_apr(principal, annual_rate, years, fees=fees, insurance_rate=insurance_rate)
+
+    indicators = {
+        'monthly_payment': monthly_payment,
+        'total_payment': total_payment,
+        'total_interest': total_interest,
+        'debt_to_income_ratio': debt_to_income_ratio,
+        'interest_rate_effectiveness': interest_rate_effectiveness,
+        'opportunity_cost': opportunity_cost,
+        'break_even_months': num_payments,
+        'apr': apr_result.apr,
+        'total_credit_cost': apr_result.total_cost,
+    }
+    if scalar:
+        return {name: float(value) for name, value in indicators.items()}
+    return {name: np.broadcast_to(value, apr_result.apr.shape) for name, value in indicators.items()}
@@ -0,0 +1,90 @@
+import os
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from snapshot import load_snapshot
+
+# Schéma des variables du jeu de données credit_risk_dataset.csv
+NUMERIC_FEATURES = ['person_age', 'person_income', 'person_emp_length',
+                    'loan_amnt', 'loan_int_rate', 'loan_percent_income',
+                    'cb_person_cred_hist_length']
+
+CATEGORICAL_FEATURES = {
+    'person_home_ownership': ['MORTGAGE', 'OTHER', 'OWN', 'RENT'],
+    'loan_intent': ['DEBTCONSOLIDATION', 'EDUCATION', 'HOMEIMPROVEMENT',
+                    'MEDICAL', 'PERSONAL', 'VENTURE'],
+    'loan_grade': ['A', 'B', 'C', 'D', 'E', 'F', 'G'],
+    'cb_person_default_on_file': ['N', 'Y'],
+}
+
+EXPECTED_COLUMNS = NUMERIC_FEATURES + [
+    f"{col}_{value}" for col, values in CATEGORICAL_FEATURES.items() for value in values
+]
+
+TARGET = 'loan_status'
+
+DATASET_PATH = 'credit_risk_dataset.csv'
+
+
+def load_dataset(path=DATASET_PATH):
+    """Chargement du jeu de données historique
+
+    Lu depuis l'instantané binaire projeté en mémoire (colonnes texte en
+    catégories), reconstruit automatiquement si le CSV change. Sans
+    répertoire d'artefacts accessible en écriture, le CSV est relu.
+    """
+    try:
+        return load_snapshot(path).to_frame()
+    except OSError:
+        if not os.path.exists(path):
+            raise
+        return pd.read_csv(path, sep=';')
+
+
+def fit_scaler(data):
+    """Ajustement du StandardScaler sur les variables numériques (médiane pour les manquants)"""
+    scaler = StandardScaler()
+    scaler.fit(data[NUMERIC_FEATURES].fillna(data[NUMERIC_FEATURES].median()))
+    return scaler
+
+
+def encode_features(data, scaler, fill_values=None):
+    """Encodage vectorisé d'un DataFrame au format attendu par le modèle
+
+    Les variables numériques sont standardisées avec le scaler fourni et les
+    catégorielles encodées en one-hot selon EXPECTED_COLUMNS. Retourne une
+    matrice float64 (n_lignes, 26).
+    """
+    matrix = np.zeros((len(data), len(EXPECTED_COLUMNS)), dtype=np.float64)
+    matrix[:, :len(NUMERIC_FEATURES)] = (numeric_matrix(data, fill_values) - scaler.mean_) / scaler.scale_
+    one_hot_categorical(data, out=matrix[:, len(NUMERIC_FEATURES):])
+    return matrix
+
+
+def numeric_matrix(data, fill_values=None):
+    """Variables numériques brutes (non standardisées), manquants remplacés"""
+    numeric = data[NUMERIC_FEATURES]
+    if fill_values is not None:
+        numeric = numeric.fillna(fill_values)
+    return numeric.to_numpy(dtype=np.float64)
+
+
+def one_hot_categorical(data, out=None):
+    """Encodage one-hot des variables catégorielles (colonnes de EXPECTED_COLUMNS)"""
+    n_columns = len(EXPECTED_COLUMNS) - len(NUMERIC_FEATURES)
+    if out is None:
+        out = np.zeros((len(data), n_columns), dtype=np.uint8)
+    offset = 0
+    rows = np.arange(len(data))
+    for col, values in CATEGORICAL_FEATURES.items():
+        codes = pd.Categorical(data[col], categories=values).codes
+        known = codes >= 0
+        out[rows[known], offset + codes[known]] = 1
+        offset += len(values)
+    return out
+
+
+def to_model_frame(matrix):
+    """Enveloppe une matrice encodée dans un DataFrame nommé pour le modèle"""
+    return pd.DataFrame(matrix, columns=EXPECTED_COLUMNS)
@@ -0,0 +1,191 @@
+import numpy as np
+
+# Seuils de score des conseils par profil
+LOW_RISK_THRESHOLD = 0.3
+HIGH_RISK_THRESHOLD = 0.6
+# Seuils des conseils spécifiques et de l'optimisation du montant (onglet recommandations)
+MAX_DEBT_RATIO = 0.4
+MIN_EMPLOYMENT_YEARS = 2
+OPTIMAL_DEBT_RATIO = 0.35
+MAX_SAFE_DEBT_RATIO = 0.4
+
+# Textes des recommandations; les montants sont calculés au rendu à partir du dossier
+MESSAGES = {
+    'excellent_taux': "✅ Profil excellent - Négociez un taux préférentiel",
+    'excellent_montant': "💰 Envisagez un montant légèrement supérieur si nécessaire",
+    'excellent_futur': "📈 Profitez de votre bon profil pour de futurs crédits",
+    'moyen_montant': "⚠️ Réduisez le montant demandé de 10-20%",
+    'moyen_emploi': "📊 Améliorez votre ancienneté dans l'emploi",
+    'moyen_dettes': "💳 Remboursez vos dettes existantes avant la demande",
+    'eleve_report': "🚨 Reportez votre demande de 6-12 mois",
+    'eleve_revenus': "💪 Augmentez vos revenus ou réduisez vos charges",
+    'eleve_conseiller': "🏦 Consultez un conseiller financier",
+    'eleve_apport': "📋 Constituez un apport personnel plus important",
+    'ratio': "📉 Réduisez le ratio dette/revenu sous 40%",
+    'emploi': "⏰ Stabilisez votre emploi (>2 ans recommandé)",
+    'montant_reduction': ("💡 Réduisez votre demande de {reduction:,.0f} € pour atteindre un ratio optimal "
+                          "de {optimal_ratio:.0%} (nouveau montant recommandé: {optimal_amount:,.0f} €)"),
+    'montant_capacite': ("💰 Vous pourriez emprunter jusqu'à {additional_capacity:,.0f} € de plus "
+                         "tout en restant dans les normes bancaires"),
+}
+
+# Bits du masque de recommandations, dans l'ordre d'affichage
+RECOMMENDATION_BITS = tuple(MESSAGES)
+
+LOW_RISK_IDS = ('excellent_taux', 'excellent_montant', 'excellent_futur')
+MEDIUM_RISK_IDS = ('moyen_montant', 'moyen_emploi', 'moyen_dettes')
+HIGH_RISK_IDS = ('eleve_report', 'eleve_revenus', 'eleve_conseiller', 'eleve_apport')
+AMOUNT_IDS = ('montant_reduction', 'montant_capacite')
+
+
+def _bits(names):
+    return sum(1 << RECOMMENDATION_BITS.index(name) for name in names)
+
+
+# Conseils de get_risk_recommendations (profil), sans l'optimisation du montant
+PROFILE_MASK = _bits(name for name in RECOMMENDATION_BITS if name not in AMOUNT_IDS)
+AMOUNT_MASK = _bits(AMOUNT_IDS)
+
+
+def get_risk_recommendations(risk_score, loan_data):
+    """Génère des recommandations personnalisées"""
+    recommendations = []
+
+    if risk_score < LOW_RISK_THRESHOLD:
+        recommendations.extend(MESSAGES[name] for name in LOW_RISK_IDS)
+    elif risk_score < HIGH_RISK_THRESHOLD:
+        recommendations.extend(MESSAGES[name] for name in MEDIUM_RISK_IDS)
+    else:
+        recommendations.extend(MESSAGES[name] for name in HIGH_RISK_IDS)
+
+    # Recommandations spécifiques
+    if loan_data['loan_percent_income'] > MAX_DEBT_RATIO:
+        recommendations.append(MESSAGES['ratio'])
+
+    if loan_data['person_emp_length'] < MIN_EMPLOYMENT_YEARS:
+        recommendations.append(MESSAGES['emploi'])
+
+    return recommendations
+
+
+def recommendation_mask(risk_scores, data):
+    """Masque uint16 des recommandations, vectorisé (dict ou DataFrame)
+
+    Bit i positionné <=> la recommandation RECOMMENDATION_BITS[i] s'applique.
+    Les règles reprennent exactement get_risk_recommendations et
+    l'optimisation du montant de l'onglet recommandations, y compris pour
+    les valeurs manquantes (toute comparaison avec NaN est fausse).
+    """
+    def column(name):
+        return np.asarray(data[name], dtype=np.float64)
+
+    scores = np.asarray(risk_scores, dtype=np.float64)
+    ratio = column('loan_percent_income')
+    low = scores < LOW_RISK_THRESHOLD
+    medium = ~low & (scores < HIGH_RISK_THRESHOLD)
+    reduce_amount = ratio > OPTIMAL_DEBT_RATIO
+    capacity = column('person_income') * MAX_SAFE_DEBT_RATIO - column('loan_amnt') > 0
+
+    mask = np.zeros(np.broadcast_shapes(scores.shape, ratio.shape), dtype=np.uint16)
+    for names, condition in (
+        (LOW_RISK_IDS, low),
+        (MEDIUM_RISK_IDS, medium),
+        (HIGH_RISK_IDS, ~(low | medium)),
+        (('ratio',), ratio > MAX_DEBT_RATIO),
+        (('emploi',), column('person_emp_length') < MIN_EMPLOYMENT_YEARS),
+        (('montant_reduction',), reduce_amount),
+        (('montant_capacite',), ~reduce_amount & capacity),
+    ):
+        mask |= np.where(condition, np.uint16(_bits(names)), np.uint16(0))
+    return mask
+
+
+def recommendation_ids(mask):
+    """Identifiants des recommandations d'un masque, dans l'ordre d'affichage"""
+    mask = int(mask)
+    return [name for bit, name in enumerate(RECOMMENDATION_BITS) if mask >> bit & 1]
+
+
+def amount_parameters(person_income, loan_amnt):
+    """Montants des textes d'optimisation, recalculés au rendu"""
+    optimal_amount = person_income * OPTIMAL_DEBT_RATIO
+    return {
+        'reduction': loan_amnt - optimal_amount,
+        'optimal_ratio': OPTIMAL_DEBT_RATIO,
+        'optimal_amount': optimal_amount,
+        'additional_capacity': person_income * MAX_SAFE_DEBT_RATIO - loan_amnt,
+    }
+
+
+class RecommendationBatch:
+    """Recommandations d'un portefeuille: un masque uint16 par dossier
+
+    Seuls les masques sont calculés et conservés; les textes sont produits à
+    la demande (lettre, export), à partir des quelques combinaisons
+    distinctes de conseils fixes mises en cache et des montants du dossier.
+    """
+
+    def __init__(self, masks, person_income, loan_amnt):
+        self.masks = masks
+        self.person_income = np.asarray(person_income, dtype=np.float64)
+        self.loan_amnt = np.asarray(loan_amnt, dtype=np.float64)
+        self._fixed_texts = {}
+
+    @classmethod
+    def from_portfolio(cls, risk_scores, data):
+        return cls(recommendation_mask(risk_scores, data), data['person_income'], data['loan_amnt'])
+
+    def __len__(self):
+        return len(self.masks)
+
+    def counts(self):
+        """Nombre de dossiers concernés par chaque recommandation"""
+        return {name: int(np.count_nonzero(self.masks & (1 << bit)))
+                for bit, name in enumerate(RECOMMENDATION_BITS)}
+
+    def _fixed(self, mask):
+        texts = self._fixed_texts.get(mask)
+        if texts is None:
+            texts = [MESSAGES[name] for name in recommendation_ids(mask & PROFILE_MASK)]
+            self._fixed_texts[mask] = texts
+        return texts
+
+    def texts(self, row):
+        """Textes des recommandations d'un dossier (position dans le portefeuille)"""
+        mask = int(self.masks[row])
+        texts = list(self._fixed(mask))
+        if mask & AMOUNT_MASK:
+            parameters = amount_parameters(float(self.person_income[row]), float(self.loan_amnt[row]))
+            texts.extend(MESSAGES[name].format(**parameters) for name in recommendation_ids(mask & AMOUNT_MASK))
+        return texts
+
+    def _template(self, mask, sep):
+        # Texte joint d'une combinaison: conseils fixes échappés, montants à formater
+        texts = [text.replace('{', '{{').replace('}', '}}') for text in self._fixed(mask)]
+        texts.extend(MESSAGES[name] for name in recommendation_ids(mask & AMOUNT_MASK))
+        return sep.join(texts)
+
+    def iter_texts(self, rows=None, sep='\n', block_size=65536):
+        """Textes joints par dossier, produits paresseusement (export en flux)
+
+        Les montants sont calculés par blocs vectorisés; chaque combinaison de
+        conseils n'est assemblée qu'une fois.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        templates = {}
+        for start in range(0, len(rows), block_size):
+            block = rows[start:start + block_size]
+            income = self.person_income[block]
+            amount = self.loan_amnt[block]
+            parameters = amount_parameters(income, amount)
+            for mask, reduction, optimal_amount, additional_capacity in zip(
+                    self.masks[block].tolist(), parameters['reduction'].tolist(),
+                    parameters['optimal_amount'].tolist(), parameters['additional_capacity'].tolist()):
+                template = templates.get(mask)
+                if template is None:
+                    template = templates[mask] = self._template(mask, sep)
+                if mask & AMOUNT_MASK:
+                    yield template.format(reduction=reduction, optimal_ratio=OPTIMAL_DEBT_RATIO,
+                                          optimal_amount=optimal_amount, additional_capacity=additional_capacity)
+                else:
+                    yield template
@@ -0,0 +1,258 @@
+import os
+import sys
+import glob
+import time
+import hashlib
+import pickle
+import argparse
+import tempfile
+import warnings
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from preprocessing import (NUMERIC_FEATURES, CATEGORICAL_FEATURES, TARGET, load_dataset, fit_scaler,
+                           numeric_matrix, one_hot_categorical, to_model_frame)
+from atomic_file import atomic_write, save_npz
+
+DELTA_DIR = 'deltas'
+DELTA_PATTERN = 'delta-{:06d}.csv'
+CACHE_PATH = os.path.join('artifacts', 'feature_cache.npz')
+BUNDLE_PATH = os.path.join('artifacts', 'model_bundle.pkl')
+
+# Découpage d'origine du modèle: l'échantillon réservé du jeu historique ne
+# sert jamais à l'entraînement (il reste disponible pour la calibration)
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+REQUIRED_COLUMNS = NUMERIC_FEATURES + list(CATEGORICAL_FEATURES) + [TARGET]
+
+
+def delta_paths(directory=DELTA_DIR):
+    return sorted(glob.glob(os.path.join(directory, DELTA_PATTERN.replace('{:06d}', '[0-9]' * 6))))
+
+
+def append_delta(rows, directory=DELTA_DIR):
+    """Dépose un lot de dossiers étiquetés (même schéma, loan_status renseigné)
+
+    Les lots sont en ajout seul: un nouveau fichier numéroté, écrit à part
+    puis publié par lien physique, n'est jamais modifié ensuite. La
+    publication échoue si le numéro est déjà pris (dépôt concurrent): le lot
+    est alors publié sous le numéro suivant, sans écraser l'autre.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in rows.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans le lot: {missing}")
+    if rows[TARGET].isna().any() or not rows[TARGET].isin([0, 1]).all():
+        raise ValueError("loan_status doit être renseigné (0 ou 1) pour chaque dossier")
+    os.makedirs(directory, exist_ok=True)
+    descriptor, tmp_path = tempfile.mkstemp(prefix='.delta-', suffix='.tmp', dir=directory)
+    os.close(descriptor)
+    try:
+        rows[REQUIRED_COLUMNS].to_csv(tmp_path, sep=';', index=False)
+        existing = delta_paths(directory)
+        number = int(os.path.basename(existing[-1])[6:12]) + 1 if existing else 1
+        while True:
+            path = os.path.join(directory, DELTA_PATTERN.format(number))
+            try:
+                os.link(tmp_path, path)
+                return path
+            except FileExistsError:
+                number += 1
+    finally:
+        os.remove(tmp_path)
+
+
+class FeatureCache:
+    """Matrice prétraitée de tout l'historique, étendue lot par lot
+
+    Les variables numériques sont conservées brutes (manquants remplacés par
+    les médianes du jeu historique, figées) et les catégorielles en one-hot:
+    la standardisation, seule étape dépendant du scaler, est appliquée à la
+    volée. Les statistiques du scaler sont mises à jour par partial_fit
+    (moyenne et variance glissantes) sans relire les anciens dossiers.
+    """
+
+    def __init__(self, numeric, categorical, labels, train_mask, fill_values, scaler, deltas=()):
+        self.numeric = numeric
+        self.categorical = categorical
+        self.labels = labels
+        self.train_mask = train_mask
+        self.fill_values = fill_values
+        self.scaler = scaler
+        self.deltas = list(deltas)
+
+    @classmethod
+    def from_dataset(cls, data):
+        fill_values = data[NUMERIC_FEATURES].median()
+        train, _ = train_test_split(data, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+        train_mask = np.zeros(len(data), dtype=bool)
+        train_mask[data.index.get_indexer(train.index)] = True
+        return cls(numeric_matrix(data, fill_values), one_hot_categorical(data),
+                   data[TARGET].to_numpy(dtype=np.int8), train_mask, fill_values, fit_scaler(data))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def extend(self, rows, name):
+        """Ajoute un lot: seules ses lignes sont encodées"""
+        numeric = numeric_matrix(rows, self.fill_values)
+        self.scaler.partial_fit(pd.DataFrame(numeric, columns=NUMERIC_FEATURES))
+        self.numeric = np.concatenate([self.numeric, numeric])
+        self.categorical = np.concatenate([self.categorical, one_hot_categorical(rows)])
+        self.labels = np.concatenate([self.labels, rows[TARGET].to_numpy(dtype=np.int8)])
+        self.train_mask = np.concatenate([self.train_mask, np.ones(len(rows), dtype=bool)])
+        self.deltas.append(name)
+
+    def matrix(self, mask=None):
+        """Matrice encodée (identique à encode_features avec le scaler courant)"""
+        numeric = self.numeric if mask is None else self.numeric[mask]
+        categorical = self.categorical if mask is None else self.categorical[mask]
+        matrix = np.empty((len(numeric), numeric.shape[1] + categorical.shape[1]), dtype=np.float64)
+        matrix[:, :numeric.shape[1]] = (numeric - self.scaler.mean_) / self.scaler.scale_
+        matrix[:, numeric.shape[1]:] = categorical
+        return matrix
+
+    def save(self, path=CACHE_PATH):
+        save_npz(path, numeric=self.numeric, categorical=self.categorical, labels=self.labels,
+                 train_mask=self.train_mask, fill_values=self.fill_values.to_numpy(),
+                 scaler_mean=self.scaler.mean_, scaler_var=self.scaler.var_,
+                 scaler_n=self.scaler.n_samples_seen_, deltas=np.array(self.deltas, dtype=str))
+
+    @classmethod
+    def load(cls, path=CACHE_PATH):
+        with np.load(path) as archive:
+            scaler = StandardScaler()
+            scaler.mean_ = archive['scaler_mean']
+            scaler.var_ = archive['scaler_var']
+            scaler.scale_ = np.sqrt(scaler.var_)
+            scaler.n_samples_seen_ = archive['scaler_n'][()]
+            scaler.n_features_in_ = len(NUMERIC_FEATURES)
+            scaler.feature_names_in_ = np.array(NUMERIC_FEATURES, dtype=object)
+            return cls(archive['numeric'], archive['categorical'], archive['labels'],
+                       archive['train_mask'], pd.Series(archive['fill_values'], index=NUMERIC_FEATURES),
+                       scaler, archive['deltas'].tolist())
+
+
+def load_or_build_cache(path=CACHE_PATH):
+    if os.path.exists(path):
+        return FeatureCache.load(path)
+    return FeatureCache.from_dataset(load_dataset())
+
+
+def publish_bundle(model, scaler, fill_values, n_rows, path=BUNDLE_PATH):
+    """Écrit le modèle et son prétraitement en un seul fichier, remplacé atomiquement
+
+    L'application lit soit l'ancien fichier soit le nouveau, jamais un mélange
+    d'un modèle et d'un scaler de générations différentes.
+    """
+    payload = pickle.dumps(model)
+    bundle = {
+        'model': model,
+        'scaler': scaler,
+        'fill_values': fill_values,
+        'version': hashlib.sha256(payload).hexdigest()[:12],
+        'n_rows': n_rows,
+        'created_at': time.time(),
+    }
+    atomic_write(path, lambda target: pickle.dump(bundle, target, protocol=pickle.HIGHEST_PROTOCOL))
+    return bundle['version']
+
+
+def load_bundle(path=BUNDLE_PATH):
+    """Dernier modèle rafraîchi publié, ou None"""
+    try:
+        with open(path, 'rb') as bundle_file:
+            return pickle.load(bundle_file)
+    except FileNotFoundError:
+        return None
+
+
+def untrained_copy(model):
+    """Estimateur vierge avec les hyperparamètres du modèle fourni
+
+    Un modèle picklé avec une ancienne version de scikit-learn n'a pas
+    forcément les hyperparamètres récents: leur valeur par défaut est prise.
+    """
+    template = type(model)()
+    params = {key: getattr(model, key, default) for key, default in template.get_params().items()}
+    return template.set_params(**params)
+
+
+class RefreshResult(NamedTuple):
+    version: str
+    n_rows: int
+    n_new_rows: int
+    n_deltas: int
+    ingest_time: float
+    train_time: float
+    publish_time: float
+
+    @property
+    def total_time(self):
+        return self.ingest_time + self.train_time + self.publish_time
+
+
+def refresh_model(base_model, delta_dir=DELTA_DIR, cache_path=CACHE_PATH, bundle_path=BUNDLE_PATH):
+    """Intègre les nouveaux lots, réentraîne et publie le modèle
+
+    Le réentraînement reprend les hyperparamètres du modèle de base et porte
+    sur l'ensemble d'entraînement d'origine plus tous les lots étiquetés.
+    Retourne None, sans rien publier, si aucun nouveau lot n'est à intégrer:
+    sans lot, le modèle livré (tree_model.pkl) reste celui de l'application.
+    """
+    start = time.perf_counter()
+    cache = load_or_build_cache(cache_path)
+    applied = set(cache.deltas)
+    new_paths = [path for path in delta_paths(delta_dir) if os.path.basename(path) not in applied]
+    n_before = len(cache)
+    for path in new_paths:
+        cache.extend(pd.read_csv(path, sep=';'), os.path.basename(path))
+    if new_paths or not os.path.exists(cache_path):
+        cache.save(cache_path)
+    ingest_time = time.perf_counter() - start
+
+    if not new_paths:
+        # Un modèle publié qui aurait disparu est republié à partir des lots déjà intégrés
+        bundle = load_bundle(bundle_path) if cache.deltas else None
+        if not cache.deltas or (bundle is not None and bundle['n_rows'] == len(cache)):
+            return None
+
+    start = time.perf_counter()
+    model = untrained_copy(base_model)
+    model.fit(to_model_frame(cache.matrix(cache.train_mask)), cache.labels[cache.train_mask])
+    train_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    version = publish_bundle(model, cache.scaler, cache.fill_values, len(cache), bundle_path)
+    publish_time = time.perf_counter() - start
+
+    return RefreshResult(version, len(cache), len(cache) - n_before, len(new_paths),
+                         ingest_time, train_time, publish_time)
+
+
+def main(argv=None):
+    """Rafraîchissement en ligne de commande: python refresh.py [--deltas deltas/]"""
+    import joblib
+    from scoring import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Intègre les lots étiquetés et publie le modèle rafraîchi")
+    parser.add_argument('--deltas', default=DELTA_DIR, help=f"répertoire des lots (défaut: {DELTA_DIR})")
+    parser.add_argument('--base-model', default=MODEL_PATH,
+                        help=f"modèle dont les hyperparamètres sont repris (défaut: {MODEL_PATH})")
+    args = parser.parse_args(argv)
+    warnings.filterwarnings('ignore')
+
+    result = refresh_model(joblib.load(args.base_model), delta_dir=args.deltas)
+    if result is None:
+        print("Aucun nouveau lot: modèle publié inchangé", file=sys.stderr)
+        return 0
+    print(f"Modèle {result.version} publié: {result.n_rows:,} dossiers dont {result.n_new_rows:,} nouveaux "
+          f"({result.n_deltas} lots) en {result.total_time:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import time
+from typing import NamedTuple, Tuple
+import numpy as np
+
+# Clé de la dernière analyse dans st.session_state (propre à chaque session)
+SESSION_KEY = 'last_analysis'
+
+
+class RiskAnalysis(NamedTuple):
+    """Résultat compact d'une analyse de risque, conservé par session
+
+    Le modèle et le scaler ne sont jamais copiés ici: ils restent partagés en
+    lecture seule entre les sessions via st.cache_resource.
+    """
+    inputs: dict
+    risk_score: float
+    factors: Tuple[Tuple[str, float], ...]
+    source: str
+    created_at: float
+
+    @property
+    def factor_labels(self):
+        return [label for label, _ in self.factors]
+
+    @property
+    def factor_impacts(self):
+        return [impact for _, impact in self.factors]
+
+    def matches(self, input_data):
+        """Indique si l'analyse correspond encore aux paramètres saisis"""
+        return self.inputs == input_data
+
+
+def identify_risk_factors(input_data):
+    """Facteurs de risque affichés et leur impact estimé"""
+    factors = []
+
+    if input_data['person_age'] < 25:
+        factors.append(("👶 Âge jeune - Manque d'expérience financière", 0.12))
+    elif input_data['person_age'] > 65:
+        factors.append(("👴 Âge avancé - Revenus potentiellement décroissants", 0.08))
+
+    if input_data['person_income'] < 30000:
+        factors.append(("💸 Revenus insuffisants pour le montant demandé", 0.2))
+
+    if input_data['loan_percent_income'] > 0.4:
+        factors.append(("📊 Ratio dette/revenu critique (>40%)", 0.25))
+
+    if input_data['loan_grade'] in ['E', 'F', 'G']:
+        factors.append((f"⚠️ Grade de crédit défavorable ({input_data['loan_grade']})", 0.2))
+
+    if input_data['cb_person_default_on_file'] == 'Y':
+        factors.append(("🚨 Historique de défaut de paiement", 0.35))
+
+    if input_data['loan_int_rate'] > 15:
+        factors.append((f"📈 Taux d'intérêt élevé ({input_data['loan_int_rate']}%)", 0.15))
+
+    if input_data['person_emp_length'] < 2:
+        factors.append(("⏰ Ancienneté emploi insuffisante", 0.1))
+
+    return tuple(factors)
+
+
+# Bits du masque de facteurs, dans l'ordre d'affichage de identify_risk_factors
+FACTOR_BITS = ('age_jeune', 'age_avance', 'revenus', 'ratio', 'grade', 'defaut', 'taux', 'emploi')
+
+
+def risk_factor_mask(data):
+    """Masque uint8 des facteurs de risque, vectorisé (dict ou DataFrame)
+
+    Bit i positionné <=> le facteur FACTOR_BITS[i] est affiché par
+    identify_risk_factors pour ce dossier.
+    """
+    def column(name):
+        return np.asarray(data[name], dtype=np.float64)
+
+    age = column('person_age')
+    conditions = (
+        age < 25,
+        age > 65,
+        column('person_income') < 30000,
+        column('loan_percent_income') > 0.4,
+        np.isin(np.asarray(data['loan_grade'], dtype=object), ['E', 'F', 'G']),
+        np.asarray(data['cb_person_default_on_file'], dtype=object) == 'Y',
+        column('loan_int_rate') > 15,
+        column('person_emp_length') < 2,
+    )
+    mask = np.zeros(np.shape(age), dtype=np.uint8)
+    for bit, condition in enumerate(conditions):
+        mask |= condition.astype(np.uint8) << bit
+    return mask
+
+
+def build_analysis(input_data, risk_score, source):
+    """Construit l'objet de session pour une analyse terminée"""
+    return RiskAnalysis(
+        inputs=dict(input_data),
+        risk_score=float(risk_score),
+        factors=identify_risk_factors(input_data),
+        source=source,
+        created_at=time.time(),
+    )
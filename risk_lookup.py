@@ -0,0 +1,210 @@
+import os
+import json
+import inspect
+import hashlib
+import itertools
+import operator
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
+
+from atomic_file import save_npz
+
+LOOKUP_PATH = os.path.join('artifacts', 'risk_lookup.npz')
+
+GRADE_RISK = {'A': 0, 'B': 0.05, 'C': 0.1, 'D': 0.15, 'E': 0.2, 'F': 0.25, 'G': 0.3}
+INTENT_RISK = {'VENTURE': 0.1, 'MEDICAL': 0.05, 'PERSONAL': 0.02}
+
+GRADES = list(GRADE_RISK)
+INTENTS = list(INTENT_RISK)
+
+# Valeur représentative de chaque tranche, dans l'ordre des indices de tranche
+BUCKET_REPRESENTATIVES = {
+    'person_age': [20, 45, 70],
+    'person_income': [10000, 25000, 35000, 50000],
+    'loan_percent_income': [0.6, 0.45, 0.35, 0.1],
+    'loan_grade': GRADES + ['?'],
+    'cb_person_default_on_file': ['N', 'Y'],
+    'loan_int_rate': [20.0, 16.0, 10.0],
+    'person_emp_length': [0.5, 1.5, 5.0],
+    'cb_person_cred_hist_length': [1, 5],
+    'loan_intent': INTENTS + ['?'],
+}
+
+TABLE_SHAPE = tuple(len(values) for values in BUCKET_REPRESENTATIVES.values())
+
+GRADE_CODES = {grade: code for code, grade in enumerate(GRADES)}
+INTENT_CODES = {intent: code for code, intent in enumerate(INTENTS)}
+# Pas de chaque tranche dans l'indice aplati (ordre C, comme np.ravel_multi_index)
+TABLE_STRIDES = tuple(int(np.prod(TABLE_SHAPE[i + 1:])) for i in range(len(TABLE_SHAPE)))
+
+
+def simulate_risk_score(input_data):
+    """Score de risque du mode simulation (règles métier, sans modèle)"""
+    risk_factors = 0
+    if input_data['person_age'] < 25: risk_factors += 0.12
+    elif input_data['person_age'] > 65: risk_factors += 0.08
+
+    if input_data['person_income'] < 20000: risk_factors += 0.25
+    elif input_data['person_income'] < 30000: risk_factors += 0.15
+    elif input_data['person_income'] < 40000: risk_factors += 0.05
+
+    if input_data['loan_percent_income'] > 0.5: risk_factors += 0.3
+    elif input_data['loan_percent_income'] > 0.4: risk_factors += 0.2
+    elif input_data['loan_percent_income'] > 0.3: risk_factors += 0.1
+
+    risk_factors += GRADE_RISK.get(input_data['loan_grade'], 0.15)
+
+    if input_data['cb_person_default_on_file'] == 'Y': risk_factors += 0.35
+    if input_data['loan_int_rate'] > 18: risk_factors += 0.2
+    elif input_data['loan_int_rate'] > 15: risk_factors += 0.1
+
+    if input_data['person_emp_length'] < 1: risk_factors += 0.15
+    elif input_data['person_emp_length'] < 2: risk_factors += 0.08
+
+    if input_data['cb_person_cred_hist_length'] < 2: risk_factors += 0.1
+
+    # Facteurs par motif de crédit
+    risk_factors += INTENT_RISK.get(input_data['loan_intent'], 0)
+
+    return min(risk_factors, 0.98)
+
+
+def _category_codes(values, categories):
+    # Les modalités inconnues tombent dans la dernière tranche ("autre")
+    if np.isscalar(values):
+        return np.intp(categories.index(values) if values in categories else len(categories))
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    # Les codes -1 (valeurs manquantes) pointent sur le dernier élément: "autre"
+    unique_codes = [categories.index(u) if u in categories else len(categories) for u in uniques]
+    return np.array(unique_codes + [len(categories)], dtype=np.intp)[codes]
+
+
+def bucket_indices(data):
+    """Indices de tranche (aplatis) pour un dict ou un DataFrame de dossiers
+
+    Les comparaisons reprennent exactement celles de simulate_risk_score,
+    y compris pour les valeurs manquantes (toute comparaison avec NaN est fausse).
+    """
+    def column(name):
+        return np.asarray(data[name], dtype=np.float64)
+
+    age = column('person_age')
+    income = column('person_income')
+    ratio = column('loan_percent_income')
+    rate = column('loan_int_rate')
+    emp = column('person_emp_length')
+    history = column('cb_person_cred_hist_length')
+
+    indices = (
+        np.where(age < 25, 0, np.where(age > 65, 2, 1)),
+        np.where(income < 20000, 0, np.where(income < 30000, 1, np.where(income < 40000, 2, 3))),
+        np.where(ratio > 0.5, 0, np.where(ratio > 0.4, 1, np.where(ratio > 0.3, 2, 3))),
+        _category_codes(data['loan_grade'], GRADES),
+        1 - _category_codes(data['cb_person_default_on_file'], ['Y']),
+        np.where(rate > 18, 0, np.where(rate > 15, 1, 2)),
+        np.where(emp < 1, 0, np.where(emp < 2, 1, 2)),
+        np.where(history < 2, 0, 1),
+        _category_codes(data['loan_intent'], INTENTS),
+    )
+    return np.ravel_multi_index(np.broadcast_arrays(*indices), TABLE_SHAPE)
+
+
+def bucket_index_one(input_data):
+    """Indice de tranche (aplati) d'un seul dossier, en Python pur
+
+    Mêmes comparaisons que bucket_indices, par bisection sur les seuils: une
+    comparaison avec NaN étant fausse, bisect_right renvoie alors la dernière
+    tranche et bisect_left la première, comme les np.where vectorisés.
+    """
+    age = float(input_data['person_age'])
+    indices = (
+        bisect_right((25,), age) + bisect_left((65,), age),
+        bisect_right((20000, 30000, 40000), float(input_data['person_income'])),
+        3 - bisect_left((0.3, 0.4, 0.5), float(input_data['loan_percent_income'])),
+        GRADE_CODES.get(input_data['loan_grade'], len(GRADES)),
+        1 if input_data['cb_person_default_on_file'] == 'Y' else 0,
+        2 - bisect_left((15, 18), float(input_data['loan_int_rate'])),
+        bisect_right((1, 2), float(input_data['person_emp_length'])),
+        bisect_right((2,), float(input_data['cb_person_cred_hist_length'])),
+        INTENT_CODES.get(input_data['loan_intent'], len(INTENTS)),
+    )
+    return sum(map(operator.mul, indices, TABLE_STRIDES))
+
+
+def build_lookup_table():
+    """Précalcul du score pour chaque combinaison de tranches
+
+    Les scores sont évalués par simulate_risk_score sur une valeur représentative
+    de chaque tranche, puis stockés sous forme de palette float64 (valeurs
+    distinctes) et de codes uint8 indexés par combinaison.
+    """
+    names = list(BUCKET_REPRESENTATIVES)
+    scores = np.array([
+        simulate_risk_score(dict(zip(names, combination)))
+        for combination in itertools.product(*BUCKET_REPRESENTATIVES.values())
+    ])
+    palette, codes = np.unique(scores, return_inverse=True)
+    if len(palette) > 256:
+        raise ValueError("palette de scores trop grande pour un codage uint8")
+    return codes.astype(np.uint8), palette
+
+
+def rules_digest():
+    """Empreinte des règles de la table: constantes, tranches et seuils
+
+    Les seuils étant écrits dans simulate_risk_score, bucket_indices et
+    bucket_index_one, leur code source fait partie de l'empreinte.
+    """
+    rules = json.dumps([GRADE_RISK, INTENT_RISK, BUCKET_REPRESENTATIVES, TABLE_SHAPE,
+                        inspect.getsource(simulate_risk_score), inspect.getsource(bucket_indices),
+                        inspect.getsource(bucket_index_one)])
+    return hashlib.sha256(rules.encode('utf-8')).hexdigest()
+
+
+class RiskLookupTable:
+    """Scoreur par table du mode simulation (équivalent exact de simulate_risk_score)"""
+
+    def __init__(self, codes, palette, digest=None):
+        self.codes = np.asarray(codes, dtype=np.uint8)
+        self.palette = np.asarray(palette, dtype=np.float64)
+        self.digest = digest  # Empreinte des règles ayant produit la table
+        if self.codes.size != int(np.prod(TABLE_SHAPE)):
+            raise ValueError("table de correspondance incompatible avec les tranches définies")
+        # Scores en flottants Python pour le chemin unitaire (sans numpy ni pandas)
+        self._scores = self.palette[self.codes].tolist()
+
+    @classmethod
+    def build(cls):
+        return cls(*build_lookup_table(), digest=rules_digest())
+
+    def score(self, data):
+        """Scores vectorisés pour un DataFrame (ou un dict) de dossiers"""
+        return self.palette[self.codes[bucket_indices(data)]]
+
+    def score_one(self, input_data):
+        """Score d'un seul dossier (dict), sans passer par le chemin vectorisé"""
+        return self._scores[bucket_index_one(input_data)]
+
+    def save(self, path=LOOKUP_PATH):
+        save_npz(path, compressed=True, codes=self.codes, palette=self.palette, digest=self.digest or '')
+
+    @classmethod
+    def load(cls, path=LOOKUP_PATH):
+        with np.load(path) as archive:
+            digest = str(archive['digest']) if 'digest' in archive.files else None
+            return cls(archive['codes'], archive['palette'], digest or None)
+
+
+def load_or_build_lookup_table(path=LOOKUP_PATH):
+    """Charge la table exportée, ou la reconstruit si absente, incompatible ou si les règles ont changé"""
+    if os.path.exists(path):
+        try:
+            table = RiskLookupTable.load(path)
+            if table.digest == rules_digest():
+                return table
+        except ValueError:
+            pass
+    table = RiskLookupTable.build()
+    table.save(path)
+    return table
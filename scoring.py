@@ -0,0 +1,106 @@
+import os
+import hashlib
+import numpy as np
+
+from preprocessing import encode_features, load_dataset, to_model_frame
+from risk_lookup import load_or_build_lookup_table
+from calibration import load_or_fit_calibrator, predict_default_proba
+from risk_analysis import risk_factor_mask
+from audit_log import audit_frame
+
+MODEL_PATH = 'tree_model.pkl'
+
+# Seuils des bandes de risque affichées dans l'onglet analyse
+RISK_BAND_THRESHOLDS = (0.25, 0.4, 0.65)
+RISK_BAND_LABELS = ('Très faible', 'Faible', 'Modéré', 'Élevé')
+
+
+_LOOKUP_TABLE = None
+_CALIBRATORS = {}
+_MODEL_DIGESTS = {}  # chemin -> ((st_mtime_ns, st_size), empreinte)
+
+
+def _lookup_table():
+    # Table du mode simulation chargée une seule fois par processus
+    global _LOOKUP_TABLE
+    if _LOOKUP_TABLE is None:
+        _LOOKUP_TABLE = load_or_build_lookup_table()
+    return _LOOKUP_TABLE
+
+
+def persisted_calibrator(model, scaler, version):
+    """Calibration persistée du modèle (ajustée si absente), chargée une fois par processus et par version"""
+    if version not in _CALIBRATORS:
+        _CALIBRATORS[version] = load_or_fit_calibrator(model, load_dataset(), scaler, version)
+    return _CALIBRATORS[version]
+
+
+def model_version(path=MODEL_PATH):
+    """Empreinte courte (sha256) du fichier modèle, ou 'simulation' s'il est absent
+
+    L'empreinte n'est recalculée que si le chemin, la date de modification ou
+    la taille du fichier changent.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 'simulation'
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _MODEL_DIGESTS.get(path)
+    if cached is None or cached[0] != stamp:
+        try:
+            with open(path, 'rb') as model_file:
+                cached = _MODEL_DIGESTS[path] = (stamp, hashlib.sha256(model_file.read()).hexdigest()[:12])
+        except FileNotFoundError:
+            return 'simulation'
+    return cached[1]
+
+
+def risk_band(scores):
+    """Indice de bande de risque (0 = très faible ... 3 = élevé), vectorisé"""
+    return np.searchsorted(RISK_BAND_THRESHOLDS, scores, side='right')
+
+
+def score_batch(data, model=None, scaler=None, fill_values=None, calibrator=None, calibrate=True, version=None):
+    """Scores de risque d'un portefeuille (modèle si disponible, sinon simulation)
+
+    Les probabilités du modèle sont calibrées après predict_default_proba: par le
+    calibrateur fourni, sinon par la calibration persistée de `version`
+    (model_version() par défaut). calibrate=False renvoie les scores bruts;
+    le mode simulation n'est pas calibré.
+    """
+    if model is not None and scaler is not None:
+        features = encode_features(data, scaler, fill_values=fill_values)
+        scores = predict_default_proba(model, to_model_frame(features))
+        if not calibrate:
+            return scores
+        if calibrator is None:
+            calibrator = persisted_calibrator(model, scaler, version or model_version())
+        return calibrator.apply(scores)
+    return _lookup_table().score(data)
+
+
+def iter_scored_portfolio(data, model=None, scaler=None, chunk_size=100000, fill_values=None,
+                          calibrator=None, audit_log=None, calibrate=True, version=None):
+    """Score un portefeuille par blocs et produit des DataFrames (score, bande)
+
+    `version` identifie le modèle fourni (version du modèle rafraîchi publié,
+    ou model_version() pour tree_model.pkl): elle estampille l'audit et
+    désigne la calibration persistée. Avec un journal d'audit, chaque score
+    est enregistré (un lot par bloc); la version est alors obligatoire.
+    """
+    if model is None:
+        version = 'simulation'
+    elif audit_log is not None and version is None:
+        raise ValueError("version du modèle requise pour auditer ses scores")
+    source = 'model' if model is not None else 'simulation'
+    for start in range(0, len(data), chunk_size):
+        chunk = data.iloc[start:start + chunk_size].copy()
+        scores = score_batch(chunk, model, scaler, fill_values=fill_values, calibrator=calibrator,
+                             calibrate=calibrate, version=version)
+        bands = risk_band(scores)
+        if audit_log is not None:
+            audit_log.append_frame(audit_frame(chunk, scores, bands, risk_factor_mask(chunk), version, source))
+        chunk['risk_score'] = scores
+        chunk['risk_band'] = np.asarray(RISK_BAND_LABELS)[bands]
+        yield chunk
@@ -0,0 +1,247 @@
+import os
+import glob
+import time
+import queue
+import threading
+import numpy as np
+
+from preprocessing import to_model_frame
+from calibration import predict_default_proba
+from scoring import risk_band, RISK_BAND_LABELS
+
+CHALLENGER_DIR = 'challengers'
+
+# Nombre de demandes en attente au-delà duquel les nouvelles sont abandonnées
+SHADOW_QUEUE_SIZE = 1024
+# Lignes regroupées au plus par appel aux challengers, et délai d'accumulation
+# d'un lot (s): le coût fixe d'un appel au modèle est payé une fois par lot
+SHADOW_MAX_BATCH = 4096
+SHADOW_LINGER = 0.05
+# Gentillesse du processus de score fantôme (19 = priorité la plus basse)
+SHADOW_NICENESS = 19
+
+N_BANDS = len(RISK_BAND_LABELS)
+
+
+class ShadowStats:
+    """Agrégats incrémentaux champion / challenger
+
+    Accord = même bande de risque. Moyenne et variance des écarts de score
+    (challenger - champion, sur l'échelle des scores reçus) sont fusionnées
+    lot par lot (Chan et al.), la
+    matrice des bandes (champion en ligne, challenger en colonne) compte les
+    basculements.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean_delta = 0.0
+        self._m2 = 0.0
+        self.max_abs_delta = 0.0
+        self.band_matrix = np.zeros((N_BANDS, N_BANDS), dtype=np.int64)
+
+    def update(self, champion_scores, challenger_scores):
+        champion_scores = np.asarray(champion_scores, dtype=np.float64)
+        deltas = np.asarray(challenger_scores, dtype=np.float64) - champion_scores
+        n = deltas.size
+        if n == 0:
+            return
+        batch_mean = deltas.mean()
+        batch_m2 = ((deltas - batch_mean) ** 2).sum()
+        total = self.count + n
+        shift = batch_mean - self.mean_delta
+        self._m2 += batch_m2 + shift ** 2 * self.count * n / total
+        self.mean_delta += shift * n / total
+        self.count = total
+        self.max_abs_delta = max(self.max_abs_delta, float(np.abs(deltas).max()))
+        bands = risk_band(champion_scores) * N_BANDS + risk_band(champion_scores + deltas)
+        self.band_matrix += np.bincount(bands, minlength=N_BANDS * N_BANDS).reshape(N_BANDS, N_BANDS)
+
+    @property
+    def agreement(self):
+        return np.trace(self.band_matrix) / self.count if self.count else float('nan')
+
+    @property
+    def band_flips(self):
+        return int(self.count - np.trace(self.band_matrix))
+
+    @property
+    def std_delta(self):
+        return (self._m2 / self.count) ** 0.5 if self.count else float('nan')
+
+    def summary(self):
+        return {
+            'dossiers': self.count,
+            'accord': self.agreement,
+            'basculements de bande': self.band_flips,
+            'écart moyen': self.mean_delta,
+            'écart type': self.std_delta,
+            'écart max': self.max_abs_delta,
+        }
+
+
+def load_challengers(directory=CHALLENGER_DIR):
+    """Challengers déposés dans `directory` (nom.pkl); retourne {nom: modèle}
+
+    Les challengers sont scorés bruts (predict_default_proba), puis passés par
+    la calibration du champion (ShadowScorer): une calibration propre à chaque
+    modèle fausserait l'accord et les écarts.
+    """
+    import joblib
+
+    return {os.path.splitext(os.path.basename(path))[0]: joblib.load(path)
+            for path in sorted(glob.glob(os.path.join(directory, '*.pkl')))}
+
+
+def score_challengers(challengers, features):
+    """Scores bruts de chaque challenger sur une matrice encodée (None si le challenger échoue)"""
+    frame = to_model_frame(features)
+    results = {}
+    for name, model in challengers.items():
+        try:
+            results[name] = predict_default_proba(model, frame)
+        except Exception:
+            # Un challenger défaillant ne doit jamais perturber le service
+            results[name] = None
+    return results
+
+
+# Challengers du processus de score fantôme (chargés une fois à son démarrage)
+_WORKER_CHALLENGERS = None
+
+
+def _init_worker(challengers):
+    global _WORKER_CHALLENGERS
+    _WORKER_CHALLENGERS = challengers
+    # Priorité minimale: l'ordonnanceur sert d'abord le processus du champion
+    if hasattr(os, 'nice'):
+        os.nice(SHADOW_NICENESS)
+
+
+def _score_in_worker(features):
+    return score_challengers(_WORKER_CHALLENGERS, features)
+
+
+class ShadowScorer:
+    """Score fantôme de challengers, sans effet sur la décision du champion
+
+    submit() ne fait que déposer la matrice de variables déjà encodée pour le
+    champion et ses scores bruts (avant calibration) dans une file bornée (put_nowait): en cas de
+    surcharge, la demande est abandonnée et comptée. Un thread de fond vide la
+    file par lots (accumulés pendant au plus `linger` secondes) et met à jour
+    les agrégats. Les challengers sont scorés dans un processus séparé
+    (`isolated=True`): le calcul ne dispute pas le GIL au champion, le thread
+    local ne fait qu'attendre le résultat.
+
+    Les bandes de risque sont des seuils de décision sur scores calibrés: avec
+    `calibrator` (celui du champion), scores du champion et des challengers
+    passent par cette même fonction monotone avant les bandes et les écarts.
+    Sans calibrateur, la comparaison porte sur les scores bruts.
+    """
+
+    def __init__(self, challengers, calibrator=None, max_queue=SHADOW_QUEUE_SIZE, max_batch=SHADOW_MAX_BATCH,
+                 linger=SHADOW_LINGER, isolated=True):
+        self.challengers = dict(challengers)
+        self.calibrator = calibrator
+        self.scale = 'calibrée' if calibrator is not None else 'brute'
+        self.max_batch = max_batch
+        self.linger = linger
+        self._executor = None
+        if isolated:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                                 initargs=(self.challengers,))
+        self.stats = {name: ShadowStats() for name in self.challengers}
+        self.submitted = 0
+        self.dropped = 0
+        self.processed = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+        self._thread.start()
+
+    def submit(self, features, champion_scores):
+        """Dépose une demande de score fantôme (scores bruts du champion); False si elle a été abandonnée"""
+        try:
+            self._queue.put_nowait((features, champion_scores))
+            accepted = True
+        except queue.Full:
+            accepted = False
+        with self._lock:
+            self.submitted += 1
+            self.dropped += not accepted
+        return accepted
+
+    def _drain(self):
+        # Bloque jusqu'à la première demande, puis laisse le lot s'accumuler
+        # sans se réveiller à chaque dépôt (aucune contention avec le champion)
+        items = [self._queue.get()]
+        if items[0] is not None and self.linger > 0:
+            time.sleep(self.linger)
+        rows = 0
+        while items[-1] is not None:
+            rows += len(items[-1][0])
+            if rows >= self.max_batch:
+                break
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._drain()
+            stop = items[-1] is None
+            items = [item for item in items if item is not None]
+            if items:
+                self._score(items)
+            for _ in range(len(items) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _score(self, items):
+        features = np.vstack([np.asarray(item[0], dtype=np.float64) for item in items])
+        champion_scores = self._calibrated(np.concatenate([np.ravel(item[1]) for item in items]))
+        try:
+            if self._executor is not None:
+                results = self._executor.submit(_score_in_worker, features).result()
+            else:
+                results = score_challengers(self.challengers, features)
+        except Exception:
+            # Processus de score indisponible: le lot est compté en erreur
+            results = dict.fromkeys(self.challengers)
+        with self._lock:
+            for name, challenger_scores in results.items():
+                if challenger_scores is None:
+                    self.errors += 1
+                else:
+                    self.stats[name].update(champion_scores, self._calibrated(challenger_scores))
+            self.processed += len(champion_scores)
+
+    def _calibrated(self, scores):
+        return self.calibrator.apply(scores) if self.calibrator is not None else scores
+
+    def wait(self):
+        """Attend le traitement de toutes les demandes déposées"""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'soumis': self.submitted,
+                'abandonnés': self.dropped,
+                'traités': self.processed,
+                'erreurs': self.errors,
+                'échelle': self.scale,
+                'challengers': {name: stats.summary() for name, stats in self.stats.items()},
+            }
@@ -0,0 +1,190 @@
+import os
+import numpy as np
+import pandas as pd
+
+from preprocessing import NUMERIC_FEATURES, TARGET, encode_features
+from atomic_file import save_npz
+from refresh import DELTA_DIR, delta_paths
+
+INDEX_PATH = os.path.join('artifacts', 'similarity_index.npz')
+
+
+def _kmeans(vectors, n_clusters, n_iter=15, seed=0):
+    """K-means (Lloyd) minimal en numpy pour le quantificateur grossier"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = _nearest_centroid(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def _nearest_centroid(vectors, centroids):
+    # ||x - c||² = ||x||² - 2 x·c + ||c||², le terme ||x||² est constant par ligne
+    scores = vectors @ centroids.T
+    scores *= -2
+    scores += (centroids ** 2).sum(axis=1)
+    return scores.argmin(axis=1).astype(np.int32)
+
+
+class SimilarityIndex:
+    """Index approximatif des plus proches voisins (IVF) sur les profils historiques
+
+    Les vecteurs sont répartis en listes inversées autour de centroïdes k-means;
+    une requête ne parcourt que les `n_probe` listes les plus proches. Les
+    insertions sont tamponnées (coût proportionnel au lot inséré, pas à
+    l'index), puis consolidées en fin de tableau en une seule copie quand
+    l'ordre des listes est reconstruit, paresseusement, à la requête suivante.
+    """
+
+    def __init__(self, centroids, vectors, labels, assignments, scaler_mean, scaler_scale, deltas=()):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int8)
+        self.assignments = np.asarray(assignments, dtype=np.int32)
+        self.scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+        # Lots étiquetés de deltas/ déjà insérés
+        self.deltas = list(deltas)
+        self._order = None
+        self._offsets = None
+        # Insertions pas encore consolidées: blocs (vecteurs, labels, listes)
+        self._pending = []
+        self._pending_rows = 0
+
+    @classmethod
+    def build(cls, features, labels, scaler, n_lists=None, seed=0):
+        """Construction de l'index à partir d'une matrice encodée"""
+        vectors = np.asarray(features, dtype=np.float32)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(vectors))))
+        sample = vectors
+        if len(vectors) > 20000:
+            sample = vectors[np.random.default_rng(seed).choice(len(vectors), 20000, replace=False)]
+        centroids = _kmeans(sample, n_lists, seed=seed)
+        assignments = _nearest_centroid(vectors, centroids)
+        return cls(centroids, vectors, labels, assignments, scaler.mean_, scaler.scale_)
+
+    def __len__(self):
+        return len(self.vectors) + self._pending_rows
+
+    def matches_scaler(self, scaler):
+        """Vérifie que l'index a été construit avec le même scaler"""
+        return (self.scaler_mean.shape == scaler.mean_.shape
+                and np.allclose(self.scaler_mean, scaler.mean_)
+                and np.allclose(self.scaler_scale, scaler.scale_))
+
+    def add(self, features, labels):
+        """Insertion incrémentale de nouveaux dossiers étiquetés"""
+        vectors = np.atleast_2d(np.asarray(features, dtype=np.float32))
+        labels = np.atleast_1d(np.asarray(labels, dtype=np.int8))
+        if len(vectors) != len(labels):
+            raise ValueError("features et labels doivent avoir la même longueur")
+        self._pending.append((vectors, labels, _nearest_centroid(vectors, self.centroids)))
+        self._pending_rows += len(vectors)
+        self._order = None
+
+    def _consolidate(self):
+        # Une seule copie des tableaux pour toutes les insertions tamponnées
+        if self._pending:
+            vectors, labels, assignments = zip(*self._pending)
+            self.vectors = np.concatenate([self.vectors, *vectors])
+            self.labels = np.concatenate([self.labels, *labels])
+            self.assignments = np.concatenate([self.assignments, *assignments])
+            self._pending = []
+            self._pending_rows = 0
+
+    def _inverted_lists(self):
+        if self._order is None:
+            self._consolidate()
+            self._order = np.argsort(self.assignments, kind='stable')
+            counts = np.bincount(self.assignments, minlength=len(self.centroids))
+            self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        return self._order, self._offsets
+
+    def query(self, features, k=10, n_probe=8):
+        """Recherche des k plus proches voisins d'un profil encodé
+
+        Retourne (indices, distances, labels) triés par distance croissante.
+        """
+        x = np.asarray(features, dtype=np.float32).reshape(-1)
+        order, offsets = self._inverted_lists()
+
+        n_probe = min(n_probe, len(self.centroids))
+        centroid_dist = ((self.centroids - x) ** 2).sum(axis=1)
+        probed = np.argpartition(centroid_dist, n_probe - 1)[:n_probe]
+        candidates = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probed])
+        if len(candidates) == 0 or k <= 0:
+            # Toutes les listes sondées sont vides: aucun voisin
+            return (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32),
+                    np.empty(0, dtype=self.labels.dtype))
+
+        distances = ((self.vectors[candidates] - x) ** 2).sum(axis=1)
+        k = min(k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+
+        indices = candidates[nearest]
+        return indices, np.sqrt(distances[nearest]), self.labels[indices]
+
+    def save(self, path=INDEX_PATH):
+        """Sauvegarde compacte de l'index (npz)"""
+        self._consolidate()
+        save_npz(path, centroids=self.centroids, vectors=self.vectors, labels=self.labels,
+                 assignments=self.assignments, scaler_mean=self.scaler_mean,
+                 scaler_scale=self.scaler_scale, deltas=np.array(self.deltas, dtype=str))
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path) as archive:
+            deltas = archive['deltas'].tolist() if 'deltas' in archive.files else []
+            return cls(archive['centroids'], archive['vectors'], archive['labels'],
+                       archive['assignments'], archive['scaler_mean'], archive['scaler_scale'], deltas)
+
+
+def build_index_from_dataset(data, scaler, n_lists=None):
+    """Construction de l'index sur le jeu de données historique"""
+    features = encode_features(data, scaler, fill_values=data[NUMERIC_FEATURES].median())
+    return SimilarityIndex.build(features, data[TARGET].to_numpy(), scaler, n_lists=n_lists)
+
+
+def add_deltas(index, scaler, fill_values, delta_dir=DELTA_DIR):
+    """Insère les lots étiquetés de `delta_dir` pas encore indexés
+
+    Retourne le nombre de lots insérés.
+    """
+    applied = set(index.deltas)
+    added = 0
+    for path in delta_paths(delta_dir):
+        name = os.path.basename(path)
+        if name in applied:
+            continue
+        rows = pd.read_csv(path, sep=';')
+        index.add(encode_features(rows, scaler, fill_values=fill_values), rows[TARGET].to_numpy())
+        index.deltas.append(name)
+        added += 1
+    return added
+
+
+def load_or_build_index(data, scaler, path=INDEX_PATH, delta_dir=DELTA_DIR):
+    """Charge l'index persisté, ou le reconstruit si absent ou obsolète
+
+    Les nouveaux lots étiquetés (refresh.append_delta) sont insérés puis
+    l'index est réenregistré.
+    """
+    index = None
+    if os.path.exists(path):
+        index = SimilarityIndex.load(path)
+        if not index.matches_scaler(scaler):
+            index = None
+    rebuilt = index is None
+    if rebuilt:
+        index = build_index_from_dataset(data, scaler)
+    added = add_deltas(index, scaler, data[NUMERIC_FEATURES].median(), delta_dir)
+    if rebuilt or added:
+        index.save(path)
+    return index
@@ -0,0 +1,178 @@
+import os
+import mmap
+import json
+import struct
+import hashlib
+import numpy as np
+import pandas as pd
+
+from atomic_file import atomic_write
+
+SNAPSHOT_DIR = 'artifacts'
+SNAPSHOT_MAGIC = b'CRSNAP01'
+SNAPSHOT_FORMAT = 1
+# Alignement des blocs de colonnes (lecture vectorisée sans copie)
+ALIGNMENT = 64
+_HEADER_LENGTH = struct.Struct('<Q')
+
+
+def snapshot_path(csv_path, directory=SNAPSHOT_DIR):
+    return os.path.join(directory, os.path.basename(csv_path) + '.snap')
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _padding(offset):
+    return -offset % ALIGNMENT
+
+
+def _write_snapshot(path, header, blocks):
+    """Écrit l'en-tête puis les blocs (bytes) alignés, dans un fichier remplacé atomiquement"""
+    payload = json.dumps(header).encode('utf-8')
+    prefix = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + len(payload)
+
+    def write(target):
+        target.write(SNAPSHOT_MAGIC + _HEADER_LENGTH.pack(len(payload)) + payload + b'\0' * _padding(prefix))
+        for block in blocks:
+            target.write(block)
+
+    atomic_write(path, write)
+
+
+def build_snapshot(csv_path, path=None):
+    """Convertit le CSV (séparateur ';') en colonnes binaires typées
+
+    Les colonnes numériques gardent le type inféré par read_csv; les colonnes
+    texte sont codées en dictionnaire (codes entiers + modalités triées).
+    """
+    path = path or snapshot_path(csv_path)
+    stamp = _source_stamp(csv_path)
+    data = pd.read_csv(csv_path, sep=';')
+    columns = []
+    blocks = []
+    offset = 0
+    for name in data.columns:
+        values = data[name]
+        entry = {'name': name}
+        if pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+            array = np.ascontiguousarray(values.to_numpy())
+        else:
+            categorical = pd.Categorical(values)
+            array = np.ascontiguousarray(categorical.codes)
+            entry['categories'] = [str(value) for value in categorical.categories]
+        entry.update(dtype=array.dtype.str, offset=offset)
+        columns.append(entry)
+        blocks.append(array.tobytes() + b'\0' * _padding(array.nbytes))
+        offset += array.nbytes + _padding(array.nbytes)
+    header = {
+        'format': SNAPSHOT_FORMAT,
+        'source': dict(stamp, sha256=file_digest(csv_path)),
+        'n_rows': len(data),
+        'columns': columns,
+    }
+    _write_snapshot(path, header, blocks)
+    return path
+
+
+class DatasetSnapshot:
+    """Jeu de données projeté en mémoire, colonne par colonne
+
+    Le fichier est projeté en copie privée (MAP_PRIVATE): les colonnes sont
+    des vues sans copie sur le cache de pages, chargées à la première lecture,
+    et restent modifiables sans jamais altérer le fichier.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as source:
+            if source.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path}: format d'instantané inconnu")
+            (length,) = _HEADER_LENGTH.unpack(source.read(_HEADER_LENGTH.size))
+            self.header = json.loads(source.read(length))
+            if self.header.get('format') != SNAPSHOT_FORMAT:
+                raise ValueError(f"{path}: version d'instantané incompatible")
+            prefix = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + length
+            self._data_offset = prefix + _padding(prefix)
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_COPY) if self.header['n_rows'] else None
+        self._columns = {column['name']: column for column in self.header['columns']}
+        self._cache = {}
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    @property
+    def source(self):
+        return self.header['source']
+
+    def __len__(self):
+        return self.header['n_rows']
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def array(self, name):
+        """Codes ou valeurs bruts d'une colonne (vue numpy sur le fichier)"""
+        column = self._columns[name]
+        if self._map is None:
+            return np.empty(0, dtype=column['dtype'])
+        return np.frombuffer(self._map, dtype=column['dtype'], count=len(self),
+                             offset=self._data_offset + column['offset'])
+
+    def __getitem__(self, name):
+        if name not in self._cache:
+            column = self._columns[name]
+            values = self.array(name)
+            if 'categories' in column:
+                values = pd.Categorical.from_codes(values, categories=pd.Index(column['categories']), validate=False)
+            self._cache[name] = pd.Series(values, name=name, copy=False)
+        return self._cache[name]
+
+    def to_frame(self, columns=None):
+        """DataFrame des colonnes demandées (toutes par défaut), sans copie des données"""
+        columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame({name: self[name] for name in columns}, copy=False)
+
+
+def _restamp(snapshot, stamp):
+    """Réécrit l'en-tête d'un instantané dont la source a été touchée sans être modifiée"""
+    header = dict(snapshot.header, source=dict(snapshot.source, **stamp))
+    with open(snapshot.path, 'rb') as source:
+        source.seek(snapshot._data_offset)
+        data = source.read()
+    _write_snapshot(snapshot.path, header, [data])
+
+
+def load_snapshot(csv_path, path=None):
+    """Instantané à jour du CSV, reconstruit si le contenu de la source a changé
+
+    La taille et la date de modification servent de contrôle rapide; en cas
+    d'écart, l'empreinte sha256 du CSV tranche entre une simple modification
+    de date (en-tête mis à jour) et un nouveau contenu (reconstruction).
+    """
+    path = path or snapshot_path(csv_path)
+    stamp = _source_stamp(csv_path)
+    snapshot = None
+    if os.path.exists(path):
+        try:
+            snapshot = DatasetSnapshot(path)
+        except (ValueError, KeyError):
+            snapshot = None
+    if snapshot is not None and all(snapshot.source.get(key) == value for key, value in stamp.items()):
+        return snapshot
+    if snapshot is not None and snapshot.source.get('sha256') == file_digest(csv_path):
+        _restamp(snapshot, stamp)
+    else:
+        build_snapshot(csv_path, path)
+    return DatasetSnapshot(path)
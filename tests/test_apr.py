@@ -0,0 +1,26 @@
+"""TAEG: frais et assurance par prêt (tableaux) ou communs (scalaires)"""
+import numpy as np
+
+from apr import solve_apr
+from finance import calculate_financial_indicators
+
+
+def test_array_fees_and_insurance_broadcast():
+    fees = np.array([0.0, 100.0, 500.0])
+    insurance = np.array([0.0, 0.3, 0.0])
+    result = solve_apr(15000, 12.0, 5, fees=fees, insurance_rate=insurance)
+    assert result.apr.shape == (3,)
+    for i in range(3):
+        single = solve_apr(15000, 12.0, 5, fees=fees[i], insurance_rate=insurance[i])
+        assert np.isclose(result.apr[i], single.apr)
+        assert np.isclose(result.total_cost[i], single.total_cost)
+
+
+def test_financial_indicators_with_array_fees():
+    indicators = calculate_financial_indicators(15000, 12.0, 5, 4166.67, fees=np.array([0, 100]))
+    assert indicators['apr'].shape == (2,)
+    assert indicators['apr'][1] > indicators['apr'][0]
+    assert indicators['total_credit_cost'][1] - indicators['total_credit_cost'][0] == 100
+
+    scalar = calculate_financial_indicators(15000, 12.0, 5, 4166.67, fees=100)
+    assert isinstance(scalar['apr'], float) and np.isclose(scalar['apr'], indicators['apr'][1])
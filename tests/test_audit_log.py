@@ -0,0 +1,22 @@
+"""Journal d'audit: deux écrivains sur le même répertoire"""
+from audit_log import AuditLog, AuditReader
+
+
+def test_two_writers_rotating_in_same_directory(tmp_path):
+    # Segments minuscules: chaque commit groupé force une rotation
+    first = AuditLog(str(tmp_path), segment_bytes=256, commit_interval=0.001)
+    second = AuditLog(str(tmp_path), segment_bytes=256, commit_interval=0.001)
+    try:
+        for i in range(60):
+            first.append({'writer': 'app', 'i': i}, wait=True)
+            second.append({'writer': 'batch', 'i': i}, wait=True)
+    finally:
+        first.close()
+        second.close()
+
+    reader = AuditReader(str(tmp_path))
+    assert len(reader.segments()) > 2
+    records = list(reader.replay())
+    assert len(records) == len(reader) == 120
+    for writer in ('app', 'batch'):
+        assert [r['i'] for r in records if r['writer'] == writer] == list(range(60))
@@ -0,0 +1,45 @@
+"""Scoring par lot: reprise après un arrêt entre le journal d'audit et le point de contrôle"""
+import os
+
+import pandas as pd
+import pytest
+
+import batch_score
+from audit_log import AuditReader
+from preprocessing import load_dataset
+
+
+def test_resume_after_audit_flush_does_not_duplicate(tmp_path, monkeypatch):
+    input_path = str(tmp_path / 'dossiers.csv')
+    load_dataset().head(3000).to_csv(input_path, sep=';', index=False)
+    output, audit_dir = str(tmp_path / 'out'), str(tmp_path / 'audit')
+    argv = [input_path, output, '--chunk-size', '1000', '--format', 'csv', '--audit-dir', audit_dir]
+    write_atomic = batch_score._write_atomic
+
+    def killed_before_third_checkpoint(path, payload):
+        # Le premier bloc est validé, puis l'arrêt survient après le fsync des trames du deuxième
+        if path.endswith(batch_score.CHECKPOINT_FILE) and payload['next_chunk'] == 2:
+            raise KeyboardInterrupt
+        write_atomic(path, payload)
+
+    monkeypatch.setattr(batch_score, '_write_atomic', killed_before_third_checkpoint)
+    with pytest.raises(KeyboardInterrupt):
+        batch_score.run(batch_score.parse_args(argv))
+    assert len(AuditReader(audit_dir)) == 2000
+
+    monkeypatch.setattr(batch_score, '_write_atomic', write_atomic)
+    state = batch_score.run(batch_score.parse_args(argv))
+    assert state['completed'] and state['rows_done'] == 3000
+    audit = AuditReader(audit_dir).to_frame()
+    assert len(audit) == 3000
+    assert sorted(audit['chunk'].unique().tolist()) == [0, 1, 2]
+    assert os.path.exists(os.path.join(output, batch_score.SUCCESS_FILE))
+
+    # La reprise à la position enregistrée relit exactement les lignes suivantes
+    reference = str(tmp_path / 'reference')
+    batch_score.run(batch_score.parse_args([input_path, reference, '--chunk-size', '1000', '--format', 'csv',
+                                            '--audit-dir', str(tmp_path / 'audit-reference')]))
+    for number in range(3):
+        name = batch_score.PART_PATTERN.format(number) + '.csv'
+        pd.testing.assert_frame_equal(pd.read_csv(os.path.join(output, name), sep=';'),
+                                      pd.read_csv(os.path.join(reference, name), sep=';'))
@@ -0,0 +1,55 @@
+"""Calibration: bandes atteignables, fichiers par version et sauvegardes concurrentes"""
+import threading
+import warnings
+
+import joblib
+import numpy as np
+
+import calibration
+from calibration import ScoreCalibrator, fit_calibration, predict_default_proba
+from preprocessing import NUMERIC_FEATURES, encode_features, fit_scaler, load_dataset, to_model_frame
+from scoring import MODEL_PATH, RISK_BAND_LABELS, risk_band
+
+
+def test_calibrated_tree_scores_reach_every_band():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = joblib.load(MODEL_PATH)
+    data = load_dataset()
+    scaler = fit_scaler(data)
+    calibrator, metrics = fit_calibration(model, data, scaler)
+    assert len(calibrator.x) > 2
+    assert metrics['brier_calibrated'] < metrics['brier_raw']
+
+    features = to_model_frame(encode_features(data, scaler, data[NUMERIC_FEATURES].median()))
+    bands = risk_band(calibrator.apply(predict_default_proba(model, features)))
+    assert (np.bincount(bands, minlength=len(RISK_BAND_LABELS)) > 0).all()
+
+
+def test_calibrations_are_kept_per_model_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(calibration, 'CALIBRATION_PATTERN', str(tmp_path / 'calibration-{}.npz'))
+    ScoreCalibrator([0.0, 1.0], [0.1, 0.6], 'isotonic', model_version='a').save()
+    ScoreCalibrator([0.0, 1.0], [0.2, 0.9], 'isotonic', model_version='b').save()
+    assert ScoreCalibrator.load(calibration.calibration_path('a')).y.tolist() == [0.1, 0.6]
+    assert ScoreCalibrator.load(calibration.calibration_path('b')).y.tolist() == [0.2, 0.9]
+
+
+def test_concurrent_saves_do_not_collide(tmp_path):
+    path = str(tmp_path / 'calibration.npz')
+    errors = []
+
+    def save_repeatedly(version):
+        try:
+            for _ in range(20):
+                ScoreCalibrator([0.0, 1.0], [0.0, 1.0], 'isotonic', model_version=version).save(path)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save_repeatedly, args=(str(i),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert ScoreCalibrator.load(path).model_version in {'0', '1', '2', '3'}
+    assert [p.name for p in tmp_path.iterdir()] == ['calibration.npz']
@@ -0,0 +1,20 @@
+"""Lots étiquetés: dépôts concurrents"""
+import pandas as pd
+
+import refresh
+from preprocessing import load_dataset
+
+
+def test_concurrent_deposits_never_overwrite(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    data = load_dataset()
+    first, second = data.head(10), data.iloc[10:25]
+    # Les deux déposants listent le répertoire avant toute publication
+    monkeypatch.setattr(refresh, 'delta_paths', lambda directory=refresh.DELTA_DIR: [])
+    first_path = refresh.append_delta(first, directory)
+    second_path = refresh.append_delta(second, directory)
+
+    assert first_path != second_path
+    assert len(pd.read_csv(first_path, sep=';')) == len(first)
+    assert len(pd.read_csv(second_path, sep=';')) == len(second)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['delta-000001.csv', 'delta-000002.csv']
@@ -0,0 +1,50 @@
+"""Table du mode simulation: parité exacte avec simulate_risk_score"""
+import numpy as np
+import pandas as pd
+
+import risk_lookup
+from preprocessing import load_dataset
+from risk_lookup import GRADES, INTENTS, RiskLookupTable, load_or_build_lookup_table, simulate_risk_score
+
+
+def threshold_portfolio(n, seed=0):
+    """Dossiers aléatoires concentrés autour des seuils des règles, valeurs manquantes comprises"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'person_age': rng.choice([18, 24, 25, 26, 64, 65, 66, 80, np.nan], n),
+        'person_income': rng.choice([0, 19999, 20000, 29999, 30000, 39999.5, 40000, 90000, np.nan], n),
+        'loan_percent_income': rng.choice([0.0, 0.3, 0.30001, 0.4, 0.41, 0.5, 0.5000001, 0.9, np.nan], n),
+        'loan_grade': rng.choice(GRADES + ['Z'], n),
+        'cb_person_default_on_file': rng.choice(['N', 'Y'], n),
+        'loan_int_rate': rng.choice([1.0, 15.0, 15.01, 18.0, 18.5, np.nan], n),
+        'person_emp_length': rng.choice([0, 0.99, 1, 1.5, 2, np.nan], n),
+        'cb_person_cred_hist_length': rng.choice([0, 1, 2, 30, np.nan], n),
+        'loan_intent': rng.choice(INTENTS + ['EDUCATION', 'DEBTCONSOLIDATION'], n),
+    })
+
+
+def test_table_matches_rules():
+    table = RiskLookupTable.build()
+    for frame in (load_dataset(), threshold_portfolio(20000)):
+        records = frame.to_dict('records')
+        expected = np.array([simulate_risk_score(record) for record in records])
+        assert (table.score(frame) == expected).all()
+        assert [table.score_one(record) for record in records] == expected.tolist()
+
+
+def test_score_one_returns_python_float():
+    table = RiskLookupTable.build()
+    record = load_dataset().iloc[0].to_dict()
+    assert type(table.score_one(record)) is float
+
+
+def test_exported_table_rebuilt_when_rules_change(tmp_path, monkeypatch):
+    path = str(tmp_path / 'risk_lookup.npz')
+    original = load_or_build_lookup_table(path)
+    assert load_or_build_lookup_table(path).digest == risk_lookup.rules_digest()
+
+    monkeypatch.setitem(risk_lookup.GRADE_RISK, 'G', 0.4)
+    rebuilt = load_or_build_lookup_table(path)
+    record = {**load_dataset().iloc[0].to_dict(), 'loan_grade': 'G'}
+    assert rebuilt.score_one(record) == simulate_risk_score(record)
+    assert RiskLookupTable.load(path).digest == rebuilt.digest != original.digest
@@ -0,0 +1,32 @@
+"""Score fantôme: bandes comparées après la calibration du champion"""
+import numpy as np
+
+from calibration import ScoreCalibrator
+from preprocessing import EXPECTED_COLUMNS
+from shadow import ShadowScorer
+
+
+class _ConstantModel:
+    def __init__(self, score):
+        self.score = score
+
+    def predict_proba(self, features):
+        return np.tile([1 - self.score, self.score], (len(features), 1))
+
+
+def _agreement(calibrator):
+    shadow = ShadowScorer({'challenger': _ConstantModel(0.5)}, calibrator=calibrator, linger=0, isolated=False)
+    shadow.submit(np.zeros((4, len(EXPECTED_COLUMNS))), np.full(4, 0.1))
+    shadow.wait()
+    snapshot = shadow.snapshot()
+    shadow.close()
+    return snapshot['challengers']['challenger'], snapshot['échelle']
+
+
+def test_bands_compared_on_calibrated_scale():
+    # Bruts 0.1 et 0.5: bandes différentes; calibrés 0.02 et 0.1: même bande (très faible)
+    raw, scale = _agreement(None)
+    assert scale == 'brute' and raw['accord'] == 0.0
+    calibrated, scale = _agreement(ScoreCalibrator([0.0, 1.0], [0.0, 0.2], 'isotonic'))
+    assert scale == 'calibrée' and calibrated['accord'] == 1.0
+    assert np.isclose(calibrated['écart moyen'], 0.08)
@@ -0,0 +1,28 @@
+"""Index des profils similaires: insertions tamponnées"""
+import numpy as np
+
+from similarity_index import SimilarityIndex
+
+
+class _Scaler:
+    mean_ = np.zeros(3)
+    scale_ = np.ones(3)
+
+
+def test_buffered_inserts_are_found_and_saved(tmp_path):
+    rng = np.random.default_rng(0)
+    index = SimilarityIndex.build(rng.normal(size=(500, 3)), rng.integers(0, 2, 500), _Scaler(), n_lists=8)
+    far = np.array([50.0, 50.0, 50.0])
+    index.add(far, 1)
+    index.add(far + 1, 0)
+    assert len(index) == 502
+
+    indices, distances, labels = index.query(far, k=2, n_probe=8)
+    assert indices.tolist() == [500, 501] and labels.tolist() == [1, 0]
+
+    index.add(far + 2, 1)
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    reloaded = SimilarityIndex.load(path)
+    assert len(reloaded) == 503
+    assert reloaded.query(far + 2, k=1, n_probe=8)[0].tolist() == [502]